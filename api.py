@@ -1,9 +1,20 @@
 import httpx
+import asyncio
+import gc
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict
+from typing import AsyncIterator, Iterator, List, Optional, Dict
 
 from models import Paper, EconBizResponse, SearchHits
+from client import borrow_client
+from cache import ResponseCache
+from streaming import SearchStream
+from ratelimit import RateLimiter, RetryPolicy, DEFAULT_RETRY, with_retries
+from metrics import Metrics, track_request
+from utils import index_saved_response
+from layout import layout_for
+import storage
 import logging 
 
 logger = logging.getLogger(__name__)
@@ -11,9 +22,10 @@ logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.econbiz.de/v1/search"
 DEFAULT_SIZE = 10
+DEFAULT_PAGE_SIZE = 100
 
 
-async def search(query: str, highlight: bool =True, sort: str ="date desc",  from_result: int=1, size: int=DEFAULT_SIZE, facets: str="language person subject type_genre isPartOf", save_response: bool=True) -> Optional[EconBizResponse]:
+async def search(query: str, highlight: bool =True, sort: str ="date desc",  from_result: int=1, size: int=DEFAULT_SIZE, facets: str="language person subject type_genre isPartOf", save_response: bool=True, client: Optional[httpx.AsyncClient]=None, cache: Optional[ResponseCache]=None, strict: bool=False, rate_limiter: Optional[RateLimiter]=None, metrics: Optional[Metrics]=None, filters: Optional[List[str]]=None) -> Optional[EconBizResponse]:
     logger.info(f"Searching for: {query}")
     logger.info(f"From position: {from_result}, Size: {size}")
   
@@ -24,20 +36,32 @@ async def search(query: str, highlight: bool =True, sort: str ="date desc",  fro
         sort=sort, 
         from_result=from_result,
         size=size,
-        facets=facets
+        facets=facets,
+        filters=filters
     )
 
+    # Answer from the cache when a fresh copy of this exact request exists
+    if cache is not None:
+        cached = await cache.get(params)
+        if cached is not None:
+            logger.info(f"Cache hit for: {query}")
+            log_search_results(cached)
+            return cached
+
     # Fetch data from API
-    raw_data = await fetch_from_api(BASE_URL, params)
+    raw_data = await fetch_from_api(BASE_URL, params, client=client, rate_limiter=rate_limiter, metrics=metrics)
     if raw_data is None: 
         return None
     
     try:
-        response = parse_api_response(raw_data, query, params)
+        response = parse_api_response(raw_data, query, params, strict=strict)
     except Exception as e: 
         logger.error(f"Failed to parse API response: {e}")
         return None
 
+    if cache is not None:
+        await cache.put(params, response)
+
     if save_response:
         await _save_response(response, query)
 
@@ -46,30 +70,132 @@ async def search(query: str, highlight: bool =True, sort: str ="date desc",  fro
     return response
 
 
-def build_search_params(query: str, highlight: bool =True, sort: str ="date desc",  from_result: int=1, size: int=DEFAULT_SIZE, facets: str="language person subject type_genre isPartOf") -> Dict[str, any]:
+async def iter_search(query: str, page_size: int=DEFAULT_PAGE_SIZE, max_results: Optional[int]=None, highlight: bool =True, sort: str ="date desc", from_result: int=1, facets: str="language person subject type_genre isPartOf", client: Optional[httpx.AsyncClient]=None) -> AsyncIterator[Paper]:
+
+    """
+        Yield every Paper matching query, page by page, prefetching the next page while the current one is consumed
+
+        At most two pages are held at once, so memory stays constant however many hits the query has.
+
+        Args:
+            page_size: Hits requested per API call
+            max_results: Stop after this many papers (all results when None)
+            from_result: Position of the first result to yield
+    """
+
+    async def fetch_page(start: int, size: int) -> Optional[EconBizResponse]:
+        return await search(query, highlight=highlight, sort=sort, from_result=start, size=size, facets=facets, save_response=False, client=client)
+
+    start = from_result
+    yielded = 0
+    next_page = asyncio.ensure_future(fetch_page(start, page_size if max_results is None else min(page_size, max_results)))
+
+    try:
+        while next_page is not None:
+            response = await next_page
+            next_page = None
+
+            if response is None:
+                logger.error(f"Stopping pagination for '{query}' after {yielded} papers: page at {start} failed")
+                return
+
+            papers = response.get_papers()
+            if not papers:
+                return
+
+            # Results still available from the first requested position, capped by max_results
+            wanted = response.hits.total - (from_result - 1)
+            if max_results is not None:
+                wanted = min(wanted, max_results)
+
+            papers = papers[:wanted - yielded]
+            start += len(papers)
+            remaining = wanted - yielded - len(papers)
+
+            # Fire the next request before handing out this page
+            if remaining > 0:
+                next_page = asyncio.ensure_future(fetch_page(start, min(page_size, remaining)))
+
+            for paper in papers:
+                yield paper
+                yielded += 1
+
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+@asynccontextmanager
+async def stream_search(query: str, highlight: bool =True, sort: str ="date desc",  from_result: int=1, size: int=DEFAULT_SIZE, facets: str="language person subject type_genre isPartOf", client: Optional[httpx.AsyncClient]=None, timeout: float = 30.0) -> AsyncIterator[SearchStream]:
+
+    """
+        Open a search whose hits are decoded straight off the response byte stream
+
+        Unlike search(), the body is never held whole in memory and no EconBizResponse is built:
+
+            async with stream_search("labour economics", size=1000) as results:
+                async for paper in results:
+                    ...
+                total, facets = results.total, results.facets
+
+        HTTP and decoding errors are raised rather than logged, since the caller is mid-iteration.
+    """
+
+    params = build_search_params(
+        query=query,
+        highlight=highlight,
+        sort=sort,
+        from_result=from_result,
+        size=size,
+        facets=facets
+    )
+
+    async with borrow_client(client) as client:
+        async with client.stream("GET", BASE_URL, params=params, timeout=timeout) as response:
+            response.raise_for_status()
+            yield SearchStream(response.aiter_bytes())
+
+
+def build_search_params(query: str, highlight: bool =True, sort: str ="date desc",  from_result: int=1, size: int=DEFAULT_SIZE, facets: str="language person subject type_genre isPartOf", filters: Optional[List[str]]=None) -> Dict[str, any]:
+
+    """
+        Construct API request params: transform function arguments into the dictionary format expected by the EconBiz API
 
-    """ Construct API request params: transform function arguments into the dictionary format expected by the EconBiz API """
+        filters are extra facet filters ('field:"value"') ANDed with the econstor source filter, sent as repeated ff params.
+    """
 
     return {
         "q": query,
         "highlight": highlight,
         "sort": sort,
-        "ff": 'source:"econstor"',
+        "ff": ['source:"econstor"', *filters] if filters else 'source:"econstor"',
         "from": from_result,
         "size": size,
         "facets": facets
     }
 
 
-async def fetch_from_api(BASE_URL: str, params: Dict[str, any], timeout: float = 30.0) -> Optional[Dict[str, any]]:
+async def fetch_from_api(BASE_URL: str, params: Dict[str, any], timeout: float = 30.0, client: Optional[httpx.AsyncClient] = None, rate_limiter: Optional[RateLimiter] = None, retry: RetryPolicy = DEFAULT_RETRY, metrics: Optional[Metrics] = None) -> Optional[Dict[str, any]]:
 
-    """ Execute HTTP request and return raw JSON response """
+    """
+        Execute HTTP request and return raw JSON response. Reuses the given pooled client when one is passed
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(BASE_URL, params = params, timeout = 30)
+        Timeouts, connection errors, 429 and 5xx responses are retried with backoff (honouring Retry-After)
+        before giving up; a shared rate_limiter paces every attempt and slows down when the server pushes back.
+        With metrics, each attempt's phase timings, bytes and status are recorded under kind "search".
+    """
+
+    async with borrow_client(client) as client:
+
+        async def get_json() -> Dict[str, any]:
+            with track_request(metrics, "search") as timer:
+                response = await client.get(BASE_URL, params = params, timeout = timeout, extensions = timer.extensions)
+                timer.response_received(response)
             response.raise_for_status()
             return response.json()
+
+        try:
+            return await with_retries(get_json, retry, rate_limiter, description=f"search '{params.get('q')}'")
         
         except httpx.RequestError as e:
             logger.error(f"Error making API request: {e}")
@@ -79,21 +205,69 @@ async def fetch_from_api(BASE_URL: str, params: Dict[str, any], timeout: float =
             return None
         
 
-def parse_api_response(raw_data: Dict[str, any], query: str, search_params: Dict[str, any]) -> EconBizResponse:
+def parse_api_response(raw_data: Dict[str, any], query: str, search_params: Dict[str, any], strict: bool = False, pause_gc: bool = False) -> EconBizResponse:
+
+    """
+        Transfroms raw JSON into a validated EconBizResponse model
+
+        The default fast path validates the whole payload in a single pydantic pass. strict=True builds and
+        validates each Paper on its own first, which is slower but names the exact hit that failed.
 
-    """ Transfroms raw JSON into a validated EconBizResponse model """
+        pause_gc=True switches the garbage collector off while the payload is validated, which roughly halves
+        the time for pages of 10,000+ hits (python -m benchmarks.bench_parse). The switch is process-wide, so
+        it is meant for one-off bulk loads, never for parses that overlap with other coroutines or threads.
+    """
 
     # Extract hits section 
-    hits_data = raw_data.get('hits', {})
+    hits_data = raw_data.get('hits')
+    if not isinstance(hits_data, dict):
+        raise ValueError("API response has no 'hits' section")
+
+    if strict:
+        return _parse_api_response_strict(hits_data, raw_data, query, search_params)
+
+    payload = {
+        "hits": {"total": hits_data.get('total', 0), "hits": hits_data.get('hits') or []},
+        "facets": raw_data.get('facets'),
+        "query": query,
+        "search_params": search_params
+    }
+
+    if not pause_gc:
+        return EconBizResponse.model_validate(payload)
+
+    # Thousands of short-lived allocations would otherwise trigger repeated full GC passes
+    with _gc_paused():
+        return EconBizResponse.model_validate(payload)
+
+
+def _parse_api_response_strict(hits_data: Dict[str, any], raw_data: Dict[str, any], query: str, search_params: Dict[str, any]) -> EconBizResponse:
 
     # Parse individual papers
-    papers = [Paper(**paper_data) for paper_data in hits_data.get('hits', [])]
+    papers = []
+    for position, paper_data in enumerate(hits_data.get('hits') or []):
+        try:
+            papers.append(Paper(**paper_data))
+        except Exception as e:
+            paper_id = paper_data.get('id') if isinstance(paper_data, dict) else None
+            raise ValueError(f"Invalid hit at position {position} (id={paper_id!r}): {e}") from e
 
     search_hits = SearchHits(total = hits_data.get('total', 0), hits = papers)
 
     return EconBizResponse(hits=search_hits, facets=raw_data.get('facets'), query=query, search_params=search_params)
 
 
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
 def log_search_results(response: EconBizResponse) -> None:
 
     papers = response.get_papers()
@@ -107,13 +281,15 @@ def log_search_results(response: EconBizResponse) -> None:
         logger.debug(f"  PDF: {paper_id} → {url}")
 
 
-async def _save_response(response: EconBizResponse, query: str)-> None:
+async def _save_response(response: EconBizResponse, query: str, format: str = storage.DEFAULT_FORMAT)-> None:
 
     safe_query = query.replace(" ", "_").replace("/", "_")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"response_{safe_query}_{timestamp}.json"
-    filepath = Path("saved_responses")/filename
+    filename = f"response_{safe_query}_{timestamp}{storage.suffix_for(format)}"
+    directory = Path("saved_responses")
+    filepath = layout_for(directory).path(directory, filename)
 
     # Await the async method from EconBizResponse 
-    await response.save(filepath)
+    await response.save(filepath, format=format)
+    await index_saved_response(filepath, response, directory)
     logger.info(f"Response saved to: {filepath}")     
\ No newline at end of file
@@ -0,0 +1,403 @@
+""" Headless batch harvest: every query in a file, its PDFs, and a JSON run report, with no prompts
+
+    python batch.py queries.txt --output-dir runs/2024-06 --page-size 100 --concurrency 4 --extract-text
+    python batch.py queries.txt --output-dir runs/daily --incremental        # e.g. from cron: new papers only
+
+    Exit codes:
+        0  every query harvested and every PDF downloaded
+        1  finished, but some queries or PDFs failed (see the report)
+        2  bad arguments or an unreadable / empty queries file
+        3  every query failed
+        4  the run itself crashed (no report is written)
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import aiofiles
+import httpx
+
+from api import DEFAULT_PAGE_SIZE
+from breaker import CircuitBreaker
+from client import create_client
+from extract import extract_pdfs, require_pypdf, DEFAULT_TEXT_CACHE
+from harvest import harvest_to_file, harvest_new, load_sync_state, save_sync_state, DEFAULT_PAGE_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND
+from metrics import Metrics
+from layout import FLAT, LAYOUT_MARKER, Layout, layout_for
+from models import Paper, SyncState
+from pdfstore import PdfStore
+from progress import TerminalProgress
+from ratelimit import RateLimiter, RETRY_STATUSES
+from resolver import PdfUrlResolver, DEFAULT_RESOLVER_CACHE
+from scheduler import DEFAULT_MAX_CONCURRENCY
+from utils import download_pdfs_batch, pdf_filename, query_slug
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_USAGE = 2
+EXIT_FAILED = 3
+EXIT_CRASHED = 4
+
+REPORT_NAME = "run_report.json"
+
+# URLs raced for one paper when hedging (its primary plus alternates); the shared pool is sized for all of them
+MAX_HEDGED_URLS = 3
+
+# Download failures an incremental run carries over to the next one (plus retryable http_<status>)
+TRANSIENT_FAILURES = frozenset({"timeout", "connection", "circuit_open"})
+
+
+def read_queries(filepath: Path) -> List[str]:
+
+    """ One query per line; blank lines, '#' comments and repeated queries are skipped """
+
+    queries = []
+
+    for line in filepath.read_text(encoding="utf-8").splitlines():
+        query = line.strip()
+        if not query or query.startswith("#"):
+            continue
+        if query in queries:
+            logger.warning(f"Skipping repeated query: {query}")
+            continue
+        queries.append(query)
+
+    return queries
+
+
+def read_pdf_links(corpus: Path) -> Iterator[Tuple[str, List[str]]]:
+
+    """ (paper_id, identifier URLs) of every paper in a corpus file, one line at a time, so a large corpus is never held as Papers """
+
+    with open(corpus, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                paper = Paper.model_validate_json(line)
+                yield paper.id, paper.identifier_url or []
+
+
+def corpus_ids(corpus: Path) -> Set[str]:
+    if not corpus.exists():
+        return set()
+
+    with open(corpus, encoding="utf-8") as f:
+        return {json.loads(line)["id"] for line in f if line.strip()}
+
+
+async def find_pdf_candidates(links: List[Tuple[str, List[str]]], resolver: Optional[PdfUrlResolver] = None) -> Dict[str, List[str]]:
+
+    """ paper_id -> URLs its PDF can be fetched from, best first: the identifier URLs as listed, or the PDF links resolver finds behind them """
+
+    if resolver is not None:
+        resolved = await asyncio.gather(*(resolver.candidates(urls) for _, urls in links))
+        logger.info(f"Resolved PDF links for {sum(bool(urls) for urls in resolved)} of {len(links)} papers")
+    else:
+        resolved = [[url for url in urls if url] for _, urls in links]
+
+    return {paper_id: urls for (paper_id, _), urls in zip(links, resolved) if urls}
+
+
+async def run_query(query: str, args: argparse.Namespace, client: httpx.AsyncClient, rate_limiter: RateLimiter, breaker: CircuitBreaker, metrics: Metrics, store: Optional[PdfStore] = None, resolver: Optional[PdfUrlResolver] = None) -> dict:
+
+    """
+        Harvest one query to <output-dir>/corpus/<query>.jsonl, download its PDFs to <output-dir>/pdfs/<query>/
+        and optionally extract their text to <output-dir>/text/<query>/; returns the query's report entry
+
+        With --incremental only papers the query's saved sync state has not seen are appended to the
+        corpus, and only their PDFs (plus any that failed transiently on an earlier run) are downloaded.
+    """
+
+    slug = query_slug(query)
+    corpus = args.output_dir / "corpus" / f"{slug}.jsonl"
+    entry = {"query": query, "corpus": str(corpus), "papers": None, "status": "failed"}
+    started = time.monotonic()
+
+    state = load_sync_state(query, args.state_dir) if args.incremental else None
+
+    if state is None:
+        papers = await harvest_to_file(query, corpus, page_size=args.page_size, max_results=args.max_results, max_concurrency=args.concurrency,
+                                       client=client, rate_limiter=rate_limiter, metrics=metrics)
+        # Only ids and links are held, not whole Papers with their abstracts and subjects
+        links = list(read_pdf_links(corpus)) if papers is not None else []
+        candidates = await find_pdf_candidates(links, resolver)
+    else:
+        new_papers = await append_new_papers(query, corpus, state, args, client, rate_limiter, metrics)
+        papers = len(new_papers) if new_papers is not None else None
+        links = [(paper.id, paper.identifier_url or []) for paper in new_papers or []]
+        found = await find_pdf_candidates(links, resolver)
+        # Retries first, with every URL they had, so they are hedged and fall back like new papers
+        candidates = {**state.pending_pdfs, **{paper_id: urls for paper_id, urls in found.items() if paper_id not in state.pending_pdfs}}
+
+    pdf_urls = [(paper_id, urls[0]) for paper_id, urls in candidates.items()]
+
+    # Papers that list identifier URLs but none led to a PDF (only possible when resolving landing pages)
+    unresolved = [paper_id for paper_id, urls in links if urls and paper_id not in candidates]
+
+    if papers is None:
+        entry["duration"] = round(time.monotonic() - started, 3)
+        return entry
+
+    entry["papers"] = papers
+    entry["status"] = "ok"
+
+    if not args.no_pdfs:
+        progress = TerminalProgress(sys.stderr) if args.progress else None
+
+        results = await download_pdfs_batch(pdf_urls, output_dir=args.output_dir / "pdfs" / slug, client=client, max_concurrency=args.pdf_concurrency,
+                                            breaker=breaker, metrics=metrics, progress=progress, store=store,
+                                            layout=pdf_layout(args.output_dir / "pdfs" / slug, args.shard_depth),
+                                            alternates={paper_id: urls[1:MAX_HEDGED_URLS] for paper_id, urls in candidates.items() if len(urls) > 1}, hedge_after=args.hedge_after)
+
+        failure_reasons = {**results['failure_reasons'], **{paper_id: "no_pdf_link" for paper_id in unresolved}}
+        entry["pdfs"] = {"requested": len(pdf_urls) + len(unresolved), "successful": len(results['successful']), "failed": results['failed'] + unresolved,
+                         "failure_reasons": failure_reasons, "latency": results['latency']}
+        if entry["pdfs"]["failed"]:
+            entry["status"] = "partial"
+
+        if state is not None:
+            # A PDF that is missing or not a PDF would fail the same way on every later run
+            reasons = results['failure_reasons']
+            state.pending_pdfs = {paper_id: urls for paper_id, urls in candidates.items() if paper_id in reasons and is_transient(reasons[paper_id])}
+
+        if args.extract_text and results['successful']:
+            entry["text"] = await extract_query_text(results['successful'], args.output_dir / "pdfs" / slug, args.output_dir / "text" / slug, args.text_cache)
+
+    if state is not None:
+        # Saved only once the run's downloads are settled, so a crash re-fetches rather than skips papers
+        save_sync_state(state, args.state_dir)
+        entry["newest_date"] = state.newest_date
+
+    entry["duration"] = round(time.monotonic() - started, 3)
+    return entry
+
+
+def is_transient(reason: str) -> bool:
+
+    """ True for a download failure reason (see download_pdf) that may not recur on a later run """
+
+    if reason.startswith("http_"):
+        status = reason[len("http_"):]
+        return status.isdigit() and int(status) in RETRY_STATUSES
+    return reason in TRANSIENT_FAILURES
+
+
+def pdf_layout(pdf_dir: Path, shard_depth: int) -> Optional[Layout]:
+
+    """
+        Layout to write a query's PDFs with: shard_depth levels for a new directory, the one already in use otherwise
+
+        A directory holding files but no layout marker is flat (it predates sharding). It is kept flat,
+        with a warning, rather than failing the run the way resolve_layout does for direct callers.
+    """
+
+    if not shard_depth:
+        return None
+
+    requested = Layout(depth=shard_depth)
+    if not (pdf_dir / LAYOUT_MARKER).exists() and not any(FLAT.glob(pdf_dir)):
+        return requested
+
+    current = layout_for(pdf_dir)
+    if current != requested:
+        logger.warning(f"{pdf_dir} already uses {current}, keeping it; run 'python layout.py {pdf_dir} --depth {shard_depth}' to migrate it")
+
+    return current
+
+
+async def append_new_papers(query: str, corpus: Path, state: SyncState, args: argparse.Namespace, client: httpx.AsyncClient, rate_limiter: RateLimiter, metrics: Metrics) -> Optional[List[Paper]]:
+
+    """
+        Fetch the papers of query that state has not seen and append them to the corpus file
+
+        State is saved only after the query's downloads, so a run that crashed in between finds the same
+        papers again; those already in the corpus are returned but not written a second time.
+    """
+
+    new_papers = await harvest_new(query, state, page_size=args.page_size, max_results=args.max_results, max_concurrency=args.concurrency,
+                                   client=client, rate_limiter=rate_limiter, metrics=metrics)
+
+    if new_papers:
+        written = corpus_ids(corpus)
+        lines = [paper.model_dump_json() + "\n" for paper in new_papers if paper.id not in written]
+
+        corpus.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(corpus, "a", encoding="utf-8") as f:
+            await f.write("".join(lines))
+
+    return new_papers
+
+
+async def extract_query_text(paper_ids: List[str], pdf_dir: Path, text_dir: Path, cache_dir: Path) -> dict:
+
+    """ Extract the downloaded PDFs of one query to <paper>.txt files; returns the report entry's 'text' section """
+
+    text_dir.mkdir(parents=True, exist_ok=True)
+    layout = layout_for(pdf_dir)
+    paths = [layout.locate(pdf_dir, pdf_filename(paper_id)) or layout.path(pdf_dir, pdf_filename(paper_id)) for paper_id in paper_ids]
+    extracted = await extract_pdfs(paths, cache_dir=cache_dir)
+
+    failed = []
+    for paper_id, result in zip(paper_ids, extracted):
+        if result.ok:
+            (text_dir / f"{result.path.stem}.txt").write_text(result.text, encoding="utf-8")
+        else:
+            failed.append(paper_id)
+
+    return {"extracted": len(extracted) - len(failed), "pages": sum(result.pages for result in extracted), "failed": failed}
+
+
+async def run_batch(queries: List[str], args: argparse.Namespace) -> dict:
+
+    """ Harvest every query in turn over one shared connection pool, rate limiter, circuit breaker and PDF store """
+
+    started_at = datetime.now().isoformat()
+    started = time.monotonic()
+
+    rate_limiter = RateLimiter(args.requests_per_second, burst=args.concurrency)
+    breaker = CircuitBreaker()
+    metrics = Metrics()
+    store = PdfStore(args.pdf_store) if args.pdf_store else None
+    entries = []
+
+    # Pages of a query and PDFs of a query are in flight together, so size the pool for both. A hedged
+    # download can hold a connection per URL raced while its primary stalls, so leave room for those too
+    pdf_connections = args.pdf_concurrency * (MAX_HEDGED_URLS if args.hedge_after is not None else 1)
+    async with create_client(max_connections=args.concurrency + pdf_connections) as client:
+        resolver = PdfUrlResolver(args.resolve_cache, client=client, max_concurrency=args.pdf_concurrency, metrics=metrics) if args.resolve_pdf_links and not args.no_pdfs else None
+
+        for i, query in enumerate(queries, 1):
+            logger.info(f"[{i}/{len(queries)}] Harvesting '{query}'")
+            try:
+                entries.append(await run_query(query, args, client, rate_limiter, breaker, metrics, store, resolver))
+            except Exception as e:
+                # One broken query must not cost the others their run or the report
+                logger.exception(f"Query '{query}' crashed")
+                entries.append({"query": query, "papers": None, "status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+    if args.metrics:
+        metrics.export(args.metrics)
+
+    statuses = [entry["status"] for entry in entries]
+    if all(status == "ok" for status in statuses):
+        exit_code = EXIT_OK
+    elif all(status == "failed" for status in statuses):
+        exit_code = EXIT_FAILED
+    else:
+        exit_code = EXIT_PARTIAL
+
+    return {
+        "started_at": started_at,
+        "finished_at": datetime.now().isoformat(),
+        "duration": round(time.monotonic() - started, 3),
+        "exit_code": exit_code,
+        "settings": {
+            "queries_file": str(args.queries),
+            "page_size": args.page_size,
+            "max_results": args.max_results,
+            "concurrency": args.concurrency,
+            "requests_per_second": args.requests_per_second,
+            "pdfs": not args.no_pdfs,
+            "pdf_concurrency": args.pdf_concurrency,
+            "pdf_store": str(args.pdf_store) if args.pdf_store else None,
+            "resolve_pdf_links": args.resolve_pdf_links,
+            "hedge_after": args.hedge_after,
+            "extract_text": args.extract_text,
+            "incremental": args.incremental
+        },
+        "totals": {
+            "queries": len(entries),
+            "failed_queries": statuses.count("failed"),
+            "papers": sum(entry["papers"] or 0 for entry in entries),
+            "pdfs_successful": sum(entry.get("pdfs", {}).get("successful", 0) for entry in entries),
+            "pdfs_failed": sum(len(entry.get("pdfs", {}).get("failed", [])) for entry in entries),
+            "texts_extracted": sum(entry.get("text", {}).get("extracted", 0) for entry in entries)
+        },
+        "queries": entries
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Harvest every query in a file from EconBiz without prompts")
+    parser.add_argument("queries", type=Path, help="text file with one query per line ('#' starts a comment)")
+    parser.add_argument("--output-dir", type=Path, default=Path("harvest_output"), help="where corpora, PDFs and the report go")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="results per API page")
+    parser.add_argument("--max-results", type=int, default=None, help="stop each query after this many results")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_PAGE_CONCURRENCY, help="result pages in flight per query")
+    parser.add_argument("--requests-per-second", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="API request rate shared by all queries")
+    parser.add_argument("--pdf-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="PDF downloads in flight")
+    parser.add_argument("--pdf-store", type=Path, default=None, help="content-addressed PDF store shared across runs; stored papers are linked, not re-downloaded")
+    parser.add_argument("--shard-depth", type=int, default=0, help="levels of hash-prefix subdirectories for new PDF directories (existing ones keep their recorded layout)")
+    parser.add_argument("--resolve-pdf-links", action="store_true", help="follow handles and landing pages in identifier URLs to the actual PDF link")
+    parser.add_argument("--resolve-cache", type=Path, default=DEFAULT_RESOLVER_CACHE, help="resolved landing pages, kept across runs")
+    parser.add_argument("--hedge-after", type=float, default=None, help=f"seconds without a first byte before a paper's next identifier URL is also tried, up to {MAX_HEDGED_URLS} per paper (off by default)")
+    parser.add_argument("--no-pdfs", action="store_true", help="harvest metadata only")
+    parser.add_argument("--incremental", action="store_true", help="only fetch papers not seen by each query's last sync")
+    parser.add_argument("--state-dir", type=Path, default=None, help="incremental sync state (default <output-dir>/sync_state)")
+    parser.add_argument("--extract-text", action="store_true", help="extract plain text from the downloaded PDFs (needs pypdf)")
+    parser.add_argument("--text-cache", type=Path, default=DEFAULT_TEXT_CACHE, help="extracted text cache, keyed by PDF hash")
+    parser.add_argument("--report", type=Path, default=None, help=f"run report path (default <output-dir>/{REPORT_NAME})")
+    parser.add_argument("--metrics", type=Path, default=None, help="also export request metrics (.json, or .prom for Prometheus text)")
+    parser.add_argument("--progress", action="store_true", help="show download progress on stderr")
+    parser.add_argument("--log-level", default="INFO", type=str.upper, choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="logging level (case-insensitive)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    try:
+        args = parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.state_dir is None:
+        args.state_dir = args.output_dir / "sync_state"
+
+    try:
+        queries = read_queries(args.queries)
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error(f"Cannot read queries file {args.queries}: {e}")
+        return EXIT_USAGE
+
+    if not queries:
+        logger.error(f"No queries in {args.queries}")
+        return EXIT_USAGE
+
+    if args.extract_text:
+        # Find out before any PDF is downloaded, not after the first query's
+        try:
+            require_pypdf()
+        except ImportError as e:
+            logger.error(str(e))
+            return EXIT_USAGE
+
+    try:
+        report = asyncio.run(run_batch(queries, args))
+    except Exception:
+        logger.exception("Batch run crashed")
+        return EXIT_CRASHED
+
+    report_path = args.report or args.output_dir / REPORT_NAME
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2))
+
+    totals = report["totals"]
+    logger.info(f"Harvested {totals['papers']} papers for {totals['queries'] - totals['failed_queries']}/{totals['queries']} queries, "
+                f"{totals['pdfs_successful']} PDFs downloaded, {totals['pdfs_failed']} failed")
+    logger.info(f"Report written to {report_path}")
+
+    return report["exit_code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
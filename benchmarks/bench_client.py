@@ -0,0 +1,62 @@
+""" Per-call clients vs one shared pooled client against the local mock server
+
+    Run from the repo root:  python -m benchmarks.bench_client [n_downloads]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_server import MockEconBizServer
+from client import create_client
+from utils import download_pdf
+from api import fetch_from_api, build_search_params
+
+
+CONCURRENCY = 20
+
+
+async def run_downloads(base_url: str, n: int, output_dir: Path, client=None) -> None:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await download_pdf(f"{base_url}/pdf/{i}", str(output_dir / f"{i}.pdf"), client=client)
+
+    await asyncio.gather(*[one(i) for i in range(n)])
+
+
+async def run_searches(base_url: str, n: int, client=None) -> None:
+    for i in range(n):
+        params = build_search_params("benchmark", from_result=i * 10 + 1)
+        await fetch_from_api(f"{base_url}/v1/search", params, client=client)
+
+
+async def measure(label: str, n: int, shared: bool) -> None:
+    with MockEconBizServer() as server, tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+
+        if shared:
+            async with create_client() as client:
+                await run_downloads(server.base_url, n, Path(tmp), client)
+                await run_searches(server.base_url, n // 10, client)
+        else:
+            await run_downloads(server.base_url, n, Path(tmp))
+            await run_searches(server.base_url, n // 10)
+
+        elapsed = time.perf_counter() - start
+        requests = n + n // 10
+
+        print(f"{label:<12} requests={requests:<6} connections={server.connections:<6} "
+              f"elapsed={elapsed:6.2f}s  throughput={requests / elapsed:8.1f} req/s")
+
+
+async def main(n: int) -> None:
+    await measure("per-call", n, shared=False)
+    await measure("shared", n, shared=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
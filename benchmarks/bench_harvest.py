@@ -0,0 +1,46 @@
+""" Sequential pagination (iter_search) vs concurrent page fan-out (harvest) against the local mock server
+
+    Run from the repo root:  python -m benchmarks.bench_harvest [total_hits] [latency_seconds]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+
+import api
+from api import iter_search
+from benchmarks.mock_server import MockEconBizServer
+from benchmarks.run import quiet_logging
+from client import create_client
+from harvest import harvest
+
+
+PAGE_SIZE = 100
+
+
+async def main(total_hits: int, latency: float) -> None:
+    with quiet_logging(logging.WARNING), MockEconBizServer(total_hits=total_hits, latency=latency) as server:
+        base_url, api.BASE_URL = api.BASE_URL, f"{server.base_url}/v1/search"
+
+        try:
+            async with create_client() as client:
+                start = time.perf_counter()
+                count = 0
+                async for _ in iter_search("benchmark", page_size=PAGE_SIZE, client=client):
+                    count += 1
+                sequential = time.perf_counter() - start
+                print(f"sequential  papers={count:<7} elapsed={sequential:6.2f}s")
+
+                start = time.perf_counter()
+                response = await harvest("benchmark", page_size=PAGE_SIZE, max_concurrency=8, requests_per_second=50, client=client)
+                parallel = time.perf_counter() - start
+                print(f"fan-out     papers={len(response.get_papers()):<7} elapsed={parallel:6.2f}s  speedup={sequential / parallel:4.1f}x")
+        finally:
+            api.BASE_URL = base_url
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    asyncio.run(main(total, latency))
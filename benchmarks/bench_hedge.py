@@ -0,0 +1,43 @@
+""" Tail latency of a batch with one long-tailed mirror, with and without hedging to a second mirror
+
+    Run from the repo root:  python -m benchmarks.bench_hedge [n_downloads] [hedge_after]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_server import MockEconBizServer
+from utils import download_pdfs_batch
+
+
+SLOW_RATE = 0.1
+SLOW_LATENCY = 1.0
+
+
+async def measure(label: str, n: int, hedge_after) -> None:
+    with MockEconBizServer(slow_rate=SLOW_RATE, slow_latency=SLOW_LATENCY, seed=1) as primary, \
+            MockEconBizServer(slow_rate=SLOW_RATE, slow_latency=SLOW_LATENCY, seed=2) as mirror, \
+            tempfile.TemporaryDirectory() as tmp:
+
+        pdf_urls = [(f"paper{i}", f"{primary.base_url}/pdf/{i}") for i in range(n)]
+        alternates = {f"paper{i}": [f"{mirror.base_url}/pdf/{i}"] for i in range(n)}
+
+        start = time.perf_counter()
+        results = await download_pdfs_batch(pdf_urls, output_dir=Path(tmp), alternates=alternates, hedge_after=hedge_after)
+        elapsed = time.perf_counter() - start
+
+        latency = results['latency']
+        print(f"{label:<10} downloads={latency['count']:<5} p50={latency['p50']:.3f}s  p95={latency['p95']:.3f}s  "
+              f"p99={latency['p99']:.3f}s  max={latency['max']:.3f}s  elapsed={elapsed:6.2f}s")
+
+
+async def main(n: int, hedge_after: float) -> None:
+    await measure("primary", n, hedge_after=None)
+    await measure("hedged", n, hedge_after=hedge_after)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, float(sys.argv[2]) if len(sys.argv) > 2 else 0.1))
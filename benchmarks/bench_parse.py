@@ -0,0 +1,36 @@
+""" Strict per-paper parsing vs the single-pass fast path in parse_api_response, with and without pause_gc
+
+    Run from the repo root:  python -m benchmarks.bench_parse
+"""
+
+import time
+
+from api import parse_api_response
+from benchmarks.mock_server import make_search_page
+
+
+REPEATS = 5
+
+
+def measure(raw: dict, strict: bool, pause_gc: bool = False) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        parse_api_response(raw, "benchmark", {}, strict=strict, pause_gc=pause_gc)
+    return (time.perf_counter() - start) / REPEATS
+
+
+def main() -> None:
+    for n_hits in (1000, 10000, 50000):
+        raw = make_search_page("benchmark", 1, n_hits, n_hits)
+
+        strict = measure(raw, strict=True)
+        fast = measure(raw, strict=False)
+        paused = measure(raw, strict=False, pause_gc=True)
+
+        print(f"hits={n_hits:<6} strict={strict * 1000:7.1f}ms  fast={fast * 1000:7.1f}ms  "
+              f"per-hit={fast / n_hits * 1e6:5.1f}us  speedup={strict / fast:4.1f}x  "
+              f"pause_gc={paused * 1000:7.1f}ms ({fast / paused:3.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+""" Bytes on disk and save/load time for each saved-response storage format
+
+    Run from the repo root:  python -m benchmarks.bench_storage [n_papers]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import storage
+from api import parse_api_response
+from benchmarks.mock_server import make_search_page
+from models import EconBizResponse
+
+
+REPEATS = 5
+
+
+async def measure(response: EconBizResponse, format: str, directory: Path) -> None:
+    filepath = directory / f"response{storage.suffix_for(format)}"
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        await response.save(filepath, format=format)
+    save_time = (time.perf_counter() - start) / REPEATS
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        await EconBizResponse.load(filepath)
+    load_time = (time.perf_counter() - start) / REPEATS
+
+    print(f"{format:<10} bytes={filepath.stat().st_size:<10} save={save_time * 1000:7.1f}ms  load={load_time * 1000:7.1f}ms")
+
+
+async def main(n_papers: int) -> None:
+    response = parse_api_response(make_search_page("benchmark", 1, n_papers, n_papers), "benchmark", {})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for format in storage.FORMATS:
+            try:
+                await measure(response, format, Path(tmp))
+            except ImportError as e:
+                print(f"{format:<10} skipped: {e}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,182 @@
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+
+DEFAULT_PDF_SIZE = 64 * 1024
+WRITE_SLICE = 16 * 1024
+
+
+def make_pdf_body(size: int = DEFAULT_PDF_SIZE) -> bytes:
+    header, trailer = b"%PDF-1.4\n", b"\n%%EOF"
+    return header + b"0" * max(0, size - len(header) - len(trailer)) + trailer
+
+
+PDF_BODY = make_pdf_body()
+
+
+def make_search_page(query: str, from_result: int, size: int, total: int, pdf_base: str = "") -> dict:
+
+    """ Synthetic EconBiz search payload shaped like the real API """
+
+    start = max(from_result, 1)
+    stop = min(start + size, total + 1)
+
+    hits = [
+        {
+            "id": f"10419/{i}",
+            "title": [f"Synthetic paper {i} about {query}"],
+            "creator_name": ["Doe, Jane", "Roe, Richard"],
+            "identifier_url": [f"{pdf_base}/pdf/{i}"],
+            "date": [str(2000 + i % 25)],
+            "abstract": ["Lorem ipsum dolor sit amet. " * 8],
+            "subject": ["Economics", "Synthetic"]
+        }
+        for i in range(start, stop)
+    ]
+
+    return {"hits": {"total": total, "hits": hits}, "facets": {"language": ["en"]}}
+
+
+def make_landing_page(paper: str) -> bytes:
+
+    """ Repository landing page of one paper, linking its PDF the way DSpace/econstor pages do """
+
+    return (
+        f'<html><head><title>Synthetic paper {paper}</title>'
+        f'<meta name="citation_pdf_url" content="/pdf/{paper}"></head>'
+        f'<body><a href="/pdf/{paper}">Download</a></body></html>'
+    ).encode()
+
+
+class MockEconBizHandler(BaseHTTPRequestHandler):
+
+    """ Serves /v1/search pages, /hdl/<id> redirects, /handle/<id> landing pages and /pdf/<id> files over keep-alive HTTP/1.1 """
+
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body go out as separate writes; without TCP_NODELAY each response stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        server = self.server
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.slow_rate and server.random.random() < server.slow_rate:
+            time.sleep(server.slow_latency)
+
+        if server.error_rate and server.random.random() < server.error_rate:
+            self._send(503, b"service unavailable", "text/plain")
+            return
+
+        if url.path == "/v1/search":
+            params = parse_qs(url.query)
+            body = json.dumps(make_search_page(
+                query=params.get("q", [""])[0],
+                from_result=int(params.get("from", ["1"])[0]),
+                size=int(params.get("size", ["10"])[0]),
+                total=server.total_hits,
+                pdf_base=server.base_url
+            )).encode()
+            self._send(200, body, "application/json")
+
+        elif url.path.startswith("/hdl/"):
+            # Persistent identifier redirecting to the landing page, like hdl.handle.net
+            self._send(302, b"", "text/plain", {"Location": "/handle/" + url.path[len("/hdl/"):]})
+
+        elif url.path.startswith("/handle/"):
+            self._send(200, make_landing_page(url.path[len("/handle/"):]), "text/html; charset=utf-8")
+
+        elif url.path.startswith("/pdf/"):
+            self._send(200, server.pdf_body, "application/pdf")
+
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        bandwidth = self.server.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+
+        # Throttle each connection to roughly 'bandwidth' bytes per second
+        for offset in range(0, len(body), WRITE_SLICE):
+            piece = body[offset:offset + WRITE_SLICE]
+            self.wfile.write(piece)
+            time.sleep(len(piece) / bandwidth)
+
+
+class MockEconBizServer(ThreadingHTTPServer):
+
+    """
+        Local stand-in for api.econbiz.de / econstor that counts accepted TCP connections
+
+        Args:
+            total_hits: Size of the synthetic result set every query matches
+            latency: Seconds added before every response
+            bandwidth: Bytes per second per connection (unthrottled when None)
+            error_rate: Fraction of requests answered with 503
+            pdf_size: Size in bytes of every served PDF
+            slow_rate: Fraction of requests held back a further slow_latency seconds, a mirror with a long tail
+            slow_latency: Extra seconds for the slow requests
+            seed: Seed for the error-rate and slow-request dice, for repeatable runs
+    """
+
+    daemon_threads = True
+
+    def __init__(self, total_hits: int = 100, latency: float = 0.0, bandwidth: Optional[float] = None, error_rate: float = 0.0, pdf_size: int = DEFAULT_PDF_SIZE, slow_rate: float = 0.0, slow_latency: float = 0.0, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), MockEconBizHandler)
+        self.total_hits = total_hits
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.pdf_body = make_pdf_body(pdf_size)
+        self.random = random.Random(seed)
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-body (cancelled or hedged downloads) are expected, not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def get_request(self):
+        request = super().get_request()
+        with self._lock:
+            self.connections += 1
+        return request
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
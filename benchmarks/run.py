@@ -0,0 +1,210 @@
+""" Offline benchmark suite for search, parse_api_response and download_pdfs_batch against the local mock server
+
+    Run from the repo root:
+        python -m benchmarks.run                                  # print a report
+        python -m benchmarks.run --json bench.json                # also save the results
+        python -m benchmarks.run --baseline bench.json            # exit 1 if anything regressed
+
+    Server behaviour is configurable (--latency, --bandwidth, --error-rate, --pdf-size), so the same suite can
+    model a fast LAN or a slow, flaky mirror.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+import api
+from api import search, parse_api_response
+from benchmarks.mock_server import MockEconBizServer, make_search_page
+from client import create_client
+from ratelimit import RetryPolicy
+from utils import download_pdfs_batch
+
+
+# metric -> True when higher is better
+METRICS = {
+    "searches_per_sec": True,
+    "search_peak_mb": False,
+    "parse_us_per_hit": False,
+    "parse_peak_mb": False,
+    "download_mb_per_sec": True,
+    "download_peak_mb": False,
+}
+
+
+# Modules whose per-request logging would drown the report (and slow the timed loops down)
+BENCHMARKED_LOGGERS = ("api", "utils", "harvest", "scheduler", "ratelimit", "breaker", "client", "streaming", "storage")
+
+
+@contextmanager
+def quiet_logging(level: int = logging.ERROR) -> Iterator[None]:
+
+    """ Raise the benchmarked modules' loggers to level inside the block, leaving every other logger alone """
+
+    loggers = [logging.getLogger(name) for name in BENCHMARKED_LOGGERS]
+    previous = [logger.level for logger in loggers]
+
+    for logger in loggers:
+        logger.setLevel(level)
+
+    try:
+        yield
+    finally:
+        for logger, old in zip(loggers, previous):
+            logger.setLevel(old)
+
+
+class PeakMemory:
+
+    """ Peak Python heap allocated inside the block, in MB. Tracing slows code down, so never time inside it """
+
+    def __enter__(self):
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+
+async def bench_search(server: MockEconBizServer, n_searches: int, page_size: int) -> Dict[str, float]:
+
+    async def run(n: int) -> None:
+        for i in range(n):
+            await search("benchmark", from_result=i * page_size + 1, size=page_size, save_response=False, client=client)
+
+    # search() reads the module-level URL; put it back so callers in the same process keep the real API
+    base_url, api.BASE_URL = api.BASE_URL, f"{server.base_url}/v1/search"
+
+    try:
+        async with create_client() as client:
+            start = time.perf_counter()
+            await run(n_searches)
+            elapsed = time.perf_counter() - start
+
+            with PeakMemory() as memory:
+                await run(min(n_searches, 5))
+    finally:
+        api.BASE_URL = base_url
+
+    return {"searches_per_sec": n_searches / elapsed, "search_peak_mb": memory.peak_mb}
+
+
+def bench_parse(n_hits: int, repeats: int = 3) -> Dict[str, float]:
+    raw = make_search_page("benchmark", 1, n_hits, n_hits)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parse_api_response(raw, "benchmark", {})
+    elapsed = (time.perf_counter() - start) / repeats
+
+    with PeakMemory() as memory:
+        parse_api_response(raw, "benchmark", {})
+
+    return {"parse_us_per_hit": elapsed / n_hits * 1e6, "parse_peak_mb": memory.peak_mb}
+
+
+async def bench_download(server: MockEconBizServer, n_pdfs: int, concurrency: int) -> Dict[str, float]:
+
+    async def run(n: int) -> dict:
+        pdf_urls = [(f"paper{i}", f"{server.base_url}/pdf/{i}") for i in range(n)]
+        with tempfile.TemporaryDirectory() as tmp:
+            return await download_pdfs_batch(pdf_urls, output_dir=Path(tmp), max_concurrency=concurrency,
+                                             max_per_host=concurrency, retry=RetryPolicy(base_delay=0.05))
+
+    start = time.perf_counter()
+    results = await run(n_pdfs)
+    elapsed = time.perf_counter() - start
+
+    # Peak memory is set by concurrency x chunk size, not batch length, so a short batch shows it
+    with PeakMemory() as memory:
+        await run(min(n_pdfs, concurrency * 3))
+
+    downloaded = len(results['successful']) * len(server.pdf_body)
+
+    return {
+        "download_mb_per_sec": downloaded / elapsed / 1e6,
+        "download_peak_mb": memory.peak_mb,
+        "download_failed": len(results['failed'])
+    }
+
+
+async def run_suite(args: argparse.Namespace) -> Dict[str, float]:
+    results = {}
+
+    with MockEconBizServer(total_hits=args.searches * args.page_size, latency=args.latency, bandwidth=args.bandwidth,
+                           error_rate=args.error_rate, pdf_size=args.pdf_size) as server:
+        results.update(await bench_search(server, args.searches, args.page_size))
+        results.update(bench_parse(args.hits))
+        results.update(await bench_download(server, args.pdfs, args.concurrency))
+
+    return results
+
+
+def find_regressions(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> Dict[str, str]:
+
+    """ Metrics that moved the wrong way by more than tolerance (a fraction) relative to the baseline """
+
+    regressions = {}
+
+    for metric, higher_is_better in METRICS.items():
+        old, new = baseline.get(metric), results.get(metric)
+        if not old or new is None:
+            continue
+
+        change = (new - old) / old
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions[metric] = f"{old:.3f} -> {new:.3f} ({change:+.0%})"
+
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock EconBiz/econstor server")
+    parser.add_argument("--searches", type=int, default=50, help="search() calls to time")
+    parser.add_argument("--page-size", type=int, default=100, help="hits per search page")
+    parser.add_argument("--hits", type=int, default=10000, help="hits in the synthetic parse payload")
+    parser.add_argument("--pdfs", type=int, default=200, help="PDFs in the download batch")
+    parser.add_argument("--pdf-size", type=int, default=256 * 1024, help="bytes per served PDF")
+    parser.add_argument("--concurrency", type=int, default=10, help="download_pdfs_batch concurrency")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes/s per connection (unlimited by default)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before a regression is reported")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    with quiet_logging():
+        results = asyncio.run(run_suite(args))
+
+    for metric, value in results.items():
+        print(f"{metric:<22} {value:12.3f}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for metric, detail in regressions.items():
+            print(f"REGRESSION {metric}: {detail}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+T = TypeVar("T")
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+
+    """ Raised instead of contacting a host whose circuit is open """
+
+    def __init__(self, host: str):
+        super().__init__(f"Circuit open for {host}")
+        self.host = host
+
+
+class _HostState:
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+
+class CircuitBreaker:
+
+    """
+        Per-host circuit breaker
+
+        After failure_threshold consecutive failures (connection errors, timeouts, 5xx) a host's circuit opens
+        and requests to it fail fast. Once reset_timeout has passed, a single probe request is let through
+        (half-open): success closes the circuit, failure opens it for another reset_timeout.
+
+        Args:
+            failure_threshold: Consecutive failures that trip the circuit
+            reset_timeout: Seconds a tripped circuit stays open before probing
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts: Dict[str, _HostState] = {}
+
+
+    def state(self, host: str) -> str:
+        return self._host(host).state
+
+
+    def allow(self, host: str) -> bool:
+
+        """ Whether a request to host may go out now; moves an expired open circuit to half-open """
+
+        host_state = self._host(host)
+
+        if host_state.state == CLOSED:
+            return True
+
+        if host_state.state == OPEN and time.monotonic() - host_state.opened_at >= self.reset_timeout:
+            logger.info(f"Probing {host} after {self.reset_timeout:.0f}s open circuit")
+            host_state.state = HALF_OPEN
+            host_state.probing = False
+
+        if host_state.state == HALF_OPEN and not host_state.probing:
+            host_state.probing = True
+            return True
+
+        return False
+
+
+    def record_success(self, host: str) -> None:
+        host_state = self._host(host)
+
+        if host_state.state != CLOSED:
+            logger.info(f"Circuit for {host} closed")
+
+        host_state.state = CLOSED
+        host_state.failures = 0
+        host_state.probing = False
+
+
+    def record_failure(self, host: str) -> None:
+        host_state = self._host(host)
+        host_state.failures += 1
+
+        if host_state.state == HALF_OPEN or host_state.failures >= self.failure_threshold:
+            if host_state.state != OPEN:
+                logger.warning(f"Circuit for {host} opened after {host_state.failures} failures")
+            host_state.state = OPEN
+            host_state.opened_at = time.monotonic()
+            host_state.probing = False
+
+
+    async def call(self, url: str, operation: Callable[[], Awaitable[T]]) -> T:
+
+        """
+            Run operation against url's host, failing fast with CircuitOpenError while its circuit is open
+
+            Transport errors and 5xx responses count as host failures. Any other HTTP status means
+            the host is up, so it counts as a success even though the error is re-raised.
+        """
+
+        host = host_of(url)
+
+        if not self.allow(host):
+            raise CircuitOpenError(host)
+
+        try:
+            result = await operation()
+        except httpx.TransportError:
+            self.record_failure(host)
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                self.record_failure(host)
+            else:
+                self.record_success(host)
+            raise
+        except BaseException:
+            # Cancelled or failed for a reason unrelated to the host - release a half-open probe slot
+            self._host(host).probing = False
+            raise
+
+        self.record_success(host)
+        return result
+
+
+    def _host(self, host: str) -> _HostState:
+        if host not in self._hosts:
+            self._hosts[host] = _HostState()
+        return self._hosts[host]
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc
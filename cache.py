@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from models import EconBizResponse
+import storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_DIR = Path("search_cache")
+DEFAULT_TTL = 3600.0
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+class ResponseCache:
+
+    """
+        On-disk cache of search responses keyed on the normalized build_search_params dict
+
+        Entries older than ttl seconds are treated as misses. When the directory grows past max_bytes,
+        the least recently used entries are evicted (file mtime records the last hit).
+
+        Args:
+            directory: Where cached responses are stored
+            ttl: Seconds a response stays fresh, measured from when it was fetched
+            max_bytes: Total size the cache directory may reach before eviction
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> size in bytes, least recently used first; loaded from disk on first use
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+
+        """ Stable hash of the request params, insensitive to key order and whitespace in the query """
+
+        normalized = dict(params)
+        if isinstance(normalized.get("q"), str):
+            normalized["q"] = " ".join(normalized["q"].split())
+
+        encoded = json.dumps(normalized, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+    async def get(self, params: Dict[str, Any]) -> Optional[EconBizResponse]:
+
+        """ Cached response for params, or None when absent, expired or unreadable """
+
+        key = self.make_key(params)
+        entries = self._load_entries()
+        path = self._path(key)
+
+        if key not in entries:
+            self.misses += 1
+            return None
+
+        try:
+            response = await EconBizResponse.load(path)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache entry {path.name}: {e}")
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        if (datetime.now() - response.timestamp).total_seconds() > self.ttl:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        # Mark as most recently used, on disk and in memory
+        os.utime(path)
+        entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+
+    async def put(self, params: Dict[str, Any], response: EconBizResponse) -> None:
+
+        """ Store response for params, then evict least recently used entries over max_bytes """
+
+        key = self.make_key(params)
+        entries = self._load_entries()
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + ".tmp")
+
+        # Write then rename so a concurrent reader never sees a half-written entry
+        await response.save(tmp_path, format=storage.DEFAULT_FORMAT)
+        os.replace(tmp_path, path)
+
+        if key in entries:
+            self._total_bytes -= entries.pop(key)
+
+        size = path.stat().st_size
+        entries[key] = size
+        self._total_bytes += size
+
+        while self._total_bytes > self.max_bytes and len(entries) > 1:
+            oldest = next(iter(entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._load_entries()
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": self._total_bytes
+        }
+
+
+    def clear(self) -> None:
+        for key in list(self._load_entries()):
+            self._remove(key)
+
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{storage.suffix_for(storage.DEFAULT_FORMAT)}"
+
+
+    def _load_entries(self) -> "OrderedDict[str, int]":
+
+        """ Build the LRU order from the directory once, using mtime as last access """
+
+        if self._entries is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            suffix = storage.suffix_for(storage.DEFAULT_FORMAT)
+
+            for stale in self.directory.glob("*.json"):
+                # Entries from before the cache was compressed; refetching them is cheaper than keeping two formats
+                stale.unlink(missing_ok=True)
+
+            files = sorted(self.directory.glob(f"*{suffix}"), key=lambda p: p.stat().st_mtime)
+
+            self._entries = OrderedDict((p.name[:-len(suffix)], p.stat().st_size) for p in files)
+            self._total_bytes = sum(self._entries.values())
+
+        return self._entries
+
+
+    def _remove(self, key: str) -> None:
+        size = self._load_entries().pop(key, 0)
+        self._total_bytes -= size
+        self._path(key).unlink(missing_ok=True)
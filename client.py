@@ -0,0 +1,52 @@
+import httpx
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+
+def create_client(max_connections: int = DEFAULT_MAX_CONNECTIONS, max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS, keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY, http2: bool = False, timeout: float = DEFAULT_TIMEOUT) -> httpx.AsyncClient:
+
+    """
+        Build a pooled AsyncClient meant to live for a whole process or harvest run
+
+        Args:
+            max_connections: Upper bound on open connections across all hosts
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection stays in the pool
+            http2: Negotiate HTTP/2 where the server supports it (needs the 'h2' package)
+            timeout: Default request timeout in seconds
+
+        Returns:
+            httpx.AsyncClient - use as 'async with create_client() as client:'
+    """
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry
+    )
+
+    logger.debug(f"Creating shared client (max_connections={max_connections}, keepalive={max_keepalive_connections}, http2={http2})")
+
+    return httpx.AsyncClient(limits=limits, http2=http2, timeout=timeout, follow_redirects=True)
+
+
+@asynccontextmanager
+async def borrow_client(client: Optional[httpx.AsyncClient] = None, timeout: float = DEFAULT_TIMEOUT) -> AsyncIterator[httpx.AsyncClient]:
+
+    """ Yield the caller's shared client, or a throwaway one (following redirects, like create_client's) that is closed on exit when none was given """
+
+    if client is not None:
+        yield client
+        return
+
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as owned_client:
+        yield owned_client
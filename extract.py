@@ -0,0 +1,209 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from models import ExtractedText
+from pdfstore import file_sha256
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TEXT_CACHE = Path("text_cache")
+DEFAULT_TIMEOUT = 120.0
+PAGE_SEPARATOR = "\f"
+
+
+class ExtractionTimeout(BaseException):
+
+    """ Raised inside a worker when one PDF takes longer than the timeout (a BaseException, so pypdf's own 'except Exception' recovery cannot swallow it) """
+
+
+async def extract_pdfs(paths: Iterable[Path], cache_dir: Path = DEFAULT_TEXT_CACHE, max_workers: Optional[int] = None, timeout: float = DEFAULT_TIMEOUT) -> List[ExtractedText]:
+
+    """
+        Extract plain text and page counts from PDFs on a process pool, one worker per core by default
+
+        Results are cached under cache_dir by SHA-256 of the file, so a re-run only parses new or changed
+        files. A PDF that fails to parse comes back with 'error' set instead of raising, and its failure is
+        cached too. A PDF that runs past timeout seconds is abandoned in its worker (Unix only), and one
+        that kills its worker outright is retried once on a fresh pool; neither outcome is cached.
+        Results come back in input order; pages of a result are separated by form feeds.
+    """
+
+    _pypdf()
+
+    paths = [Path(p) for p in paths]
+    workers = max_workers or os.cpu_count() or 1
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    loop = asyncio.get_running_loop()
+    pool = _WorkerPool(workers)
+
+    # Keep every worker busy while the next files are hashed, without queueing the whole corpus
+    slots = asyncio.Semaphore(workers * 2)
+
+    async def extract_one(path: Path) -> ExtractedText:
+        async with slots:
+            try:
+                digest = await loop.run_in_executor(None, file_sha256, path)
+            except OSError as e:
+                logger.error(f"Cannot read {path}: {e}")
+                return ExtractedText(path=path, sha256="", error=f"{type(e).__name__}: {e}")
+
+            cached = _read_cache(cache_dir, digest, path)
+            if cached is not None:
+                return cached
+
+            try:
+                pages, text = await pool.run(path, timeout)
+            except (ExtractionTimeout, BrokenProcessPool) as e:
+                logger.error(f"Giving up on {path}: {type(e).__name__}: {e}")
+                return ExtractedText(path=path, sha256=digest, error=f"{type(e).__name__}: {e}")
+            except Exception as e:
+                logger.warning(f"Cannot extract text from {path}: {type(e).__name__}: {e}")
+                result = ExtractedText(path=path, sha256=digest, error=f"{type(e).__name__}: {e}")
+            else:
+                result = ExtractedText(path=path, sha256=digest, pages=pages, text=text)
+
+            _write_cache(cache_dir, result)
+            return result
+
+    try:
+        results = await asyncio.gather(*(extract_one(path) for path in paths))
+    finally:
+        await pool.shutdown()
+
+    cached = sum(result.cached for result in results)
+    failed = sum(not result.ok for result in results)
+    logger.info(f"Extracted text from {len(results) - failed} of {len(results)} PDFs ({cached} from cache, {failed} failed)")
+
+    return results
+
+
+class _WorkerPool:
+
+    """ Process pool that replaces itself when a worker dies, instead of failing every later job """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+
+
+    async def run(self, path: Path, timeout: float) -> Tuple[int, str]:
+        loop = asyncio.get_running_loop()
+
+        for attempt in (1, 2):
+            executor, generation = self._current()
+            try:
+                return await loop.run_in_executor(executor, _extract_worker, str(path), timeout)
+            except BrokenProcessPool:
+                # Every job in flight on a broken pool fails with it, so the culprit is unknown - retry once
+                logger.warning(f"Worker pool broke while extracting {path} (attempt {attempt}/2)")
+                self._discard(generation)
+
+        raise BrokenProcessPool(f"worker died twice while extracting {path}")
+
+
+    async def shutdown(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+
+    def _current(self) -> Tuple[ProcessPoolExecutor, int]:
+        if self._executor is None:
+            # Forking a process that runs an event loop and helper threads is unsafe, so start workers fresh
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor, self._generation
+
+
+    def _discard(self, generation: int) -> None:
+        # Only the first job to notice a broken pool replaces it
+        if generation == self._generation and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._generation += 1
+
+
+def _extract_worker(path: str, timeout: float) -> Tuple[int, str]:
+    pypdf = _pypdf()
+
+    with _time_limit(timeout):
+        reader = pypdf.PdfReader(path)
+        pages = [page.extract_text() or "" for page in reader.pages]
+
+    return len(pages), PAGE_SEPARATOR.join(pages)
+
+
+@contextmanager
+def _time_limit(seconds: float) -> Iterator[None]:
+
+    """ Raise ExtractionTimeout in this (worker) process after seconds; a no-op where SIGALRM does not exist """
+
+    if not seconds or not hasattr(signal, "SIGALRM"):
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise ExtractionTimeout(f"extraction took longer than {seconds:.0f}s")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _cache_path(cache_dir: Path, digest: str) -> Path:
+    return cache_dir / f"{digest}.json"
+
+
+def _read_cache(cache_dir: Path, digest: str, path: Path) -> Optional[ExtractedText]:
+    cache_file = _cache_path(cache_dir, digest)
+    if not cache_file.exists():
+        return None
+
+    try:
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+        return ExtractedText.model_validate({**data, "path": path, "cached": True})
+    except Exception as e:
+        logger.warning(f"Dropping unreadable text cache entry {cache_file.name}: {e}")
+        cache_file.unlink()
+        return None
+
+
+def _write_cache(cache_dir: Path, result: ExtractedText) -> None:
+    cache_file = _cache_path(cache_dir, result.sha256)
+    tmp = cache_file.with_name(cache_file.name + ".tmp")
+
+    try:
+        tmp.write_text(result.model_dump_json(exclude={"path", "cached"}), encoding="utf-8")
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        logger.warning(f"Could not cache text for {result.path}: {e}")
+
+
+def require_pypdf() -> None:
+
+    """ Raise ImportError with install instructions when pypdf is missing, e.g. before a run that will need it """
+
+    _pypdf()
+
+
+def _pypdf():
+    try:
+        import pypdf
+    except ImportError:
+        raise ImportError("PDF text extraction requires the 'pypdf' package (pip install pypdf)")
+    return pypdf
@@ -0,0 +1,238 @@
+import httpx
+import asyncio
+import aiofiles
+import os
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from models import EconBizResponse, SearchHits, Paper, SyncState
+from api import search, DEFAULT_PAGE_SIZE
+from ratelimit import RateLimiter
+from metrics import Metrics
+from utils import query_slug
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PAGE_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+DEFAULT_STATE_DIR = Path("sync_state")
+
+# Consecutive already-seen papers that prove the rest of a date-sorted result set is known
+DEFAULT_OVERLAP = 50
+
+
+async def harvest(query: str, page_size: int = DEFAULT_PAGE_SIZE, max_results: Optional[int] = None, max_concurrency: int = DEFAULT_PAGE_CONCURRENCY, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, sort: str = "date desc", client: Optional[httpx.AsyncClient] = None, rate_limiter: Optional[RateLimiter] = None, metrics: Optional[Metrics] = None, filters: Optional[List[str]] = None) -> Optional[EconBizResponse]:
+
+    """
+        Fetch every page of a query concurrently and merge them, in sort order, into one EconBizResponse
+
+        filters narrow the query with extra facet filters (see build_search_params).
+        Returns None if the first page or any later page could not be fetched, rather than a response with holes.
+    """
+
+    first_page = None
+    papers = []
+    pages = _fetch_pages(query, page_size, max_results, max_concurrency, requests_per_second, sort, client, rate_limiter, metrics, filters)
+
+    try:
+        async for page in pages:
+            if page is None:
+                logger.error(f"Harvest of '{query}' failed after {len(papers)} papers")
+                return None
+
+            if first_page is None:
+                first_page = page
+            papers.extend(page.get_papers())
+
+    finally:
+        # Cancel pages still in flight straight away rather than when the generator is collected
+        await pages.aclose()
+
+    if first_page is None:
+        return None
+
+    logger.info(f"Harvested {len(papers)} of {first_page.hits.total} papers for '{query}'")
+
+    return EconBizResponse(
+        hits=SearchHits(total=first_page.hits.total, hits=papers),
+        facets=first_page.facets,
+        query=query,
+        search_params={**first_page.search_params, "size": len(papers)}
+    )
+
+
+async def harvest_to_file(query: str, filepath: Path, page_size: int = DEFAULT_PAGE_SIZE, max_results: Optional[int] = None, max_concurrency: int = DEFAULT_PAGE_CONCURRENCY, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, sort: str = "date desc", client: Optional[httpx.AsyncClient] = None, rate_limiter: Optional[RateLimiter] = None, metrics: Optional[Metrics] = None) -> Optional[int]:
+
+    """
+        Stream every paper of a query to a JSON Lines corpus file, one Paper per line in sort order
+
+        Only max_concurrency pages are held in memory at once. Returns the number of papers written,
+        or None if a page failed (the file then holds everything up to the failed page).
+    """
+
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+
+    pages = _fetch_pages(query, page_size, max_results, max_concurrency, requests_per_second, sort, client, rate_limiter, metrics)
+
+    try:
+        async with aiofiles.open(filepath, "w", encoding="utf-8") as f:
+            async for page in pages:
+                if page is None:
+                    logger.error(f"Harvest of '{query}' to {filepath} failed after {written} papers")
+                    return None
+
+                for paper in page.get_papers():
+                    await f.write(paper.model_dump_json() + "\n")
+                    written += 1
+
+    finally:
+        await pages.aclose()
+
+    logger.info(f"Wrote {written} papers for '{query}' to {filepath}")
+    return written
+
+
+async def harvest_new(query: str, state: SyncState, page_size: int = DEFAULT_PAGE_SIZE, max_results: Optional[int] = None, max_concurrency: int = DEFAULT_PAGE_CONCURRENCY, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, overlap: int = DEFAULT_OVERLAP, client: Optional[httpx.AsyncClient] = None, rate_limiter: Optional[RateLimiter] = None, metrics: Optional[Metrics] = None) -> Optional[List[Paper]]:
+
+    """
+        Papers of a query that are not in state yet, newest first, advancing state's high-water mark
+
+        Results are read in "date desc" order, one page at a time, and paging stops after 'overlap' consecutive
+        papers that were already seen, so a daily sync costs a request or two. Dates alone never end paging:
+        EconBiz dates are years, so a paper indexed late can sort below state.newest_date and still be new.
+        The first sync of a query (empty state) is a full concurrent harvest.
+        Returns None if a page could not be fetched; state is then left untouched so the next run retries.
+    """
+
+    known = set(state.seen_ids)
+    first_sync = not known
+
+    # Fetching ahead only pays off when every page is going to be read
+    concurrency = max_concurrency if first_sync else 1
+    pages = _fetch_pages(query, page_size, max_results, concurrency, requests_per_second, "date desc", client, rate_limiter, metrics)
+
+    new_papers = []
+    run_of_known = 0
+    caught_up = False
+
+    try:
+        async for page in pages:
+            if page is None:
+                logger.error(f"Incremental harvest of '{query}' failed after {len(new_papers)} new papers")
+                return None
+
+            for paper in page.get_papers():
+                if paper.id in known:
+                    run_of_known += 1
+                    if run_of_known >= overlap:
+                        caught_up = True
+                        break
+                    continue
+
+                run_of_known = 0
+                known.add(paper.id)
+                new_papers.append(paper)
+
+            if caught_up:
+                break
+
+    finally:
+        await pages.aclose()
+
+    dates = [date for date in map(_paper_date, new_papers) if date is not None]
+    if dates:
+        state.newest_date = max(dates + ([state.newest_date] if state.newest_date else []))
+
+    state.seen_ids.extend(paper.id for paper in new_papers)
+    state.last_sync = datetime.now()
+
+    logger.info(f"Found {len(new_papers)} new papers for '{query}'")
+    return new_papers
+
+
+def load_sync_state(query: str, state_dir: Path = DEFAULT_STATE_DIR) -> SyncState:
+
+    """ Saved high-water mark of a query, or an empty state (meaning a full harvest) when there is none """
+
+    filepath = _sync_state_path(query, state_dir)
+
+    if not filepath.exists():
+        return SyncState(query=query)
+
+    try:
+        return SyncState.model_validate_json(filepath.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable sync state {filepath}, re-harvesting '{query}' in full: {e}")
+        return SyncState(query=query)
+
+
+def save_sync_state(state: SyncState, state_dir: Path = DEFAULT_STATE_DIR) -> None:
+    filepath = _sync_state_path(state.query, state_dir)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write then rename, so a crash never leaves a truncated state that would trigger a full re-harvest
+    tmp = filepath.with_name(filepath.name + ".tmp")
+    tmp.write_text(state.model_dump_json(), encoding="utf-8")
+    os.replace(tmp, filepath)
+
+
+def _sync_state_path(query: str, state_dir: Path) -> Path:
+    return state_dir / f"{query_slug(query)}.json"
+
+
+def _paper_date(paper: Paper) -> Optional[str]:
+    return paper.date[0] if paper.date else None
+
+
+async def _fetch_pages(query: str, page_size: int, max_results: Optional[int], max_concurrency: int, requests_per_second: float, sort: str, client: Optional[httpx.AsyncClient], rate_limiter: Optional[RateLimiter], metrics: Optional[Metrics], filters: Optional[List[str]] = None) -> AsyncIterator[Optional[EconBizResponse]]:
+
+    """
+        Yield result pages in order. The first page reveals hits.total; the remaining pages are then
+        fetched with at most max_concurrency in flight. A failed page is yielded as None and ends iteration.
+    """
+
+    limiter = rate_limiter or RateLimiter(requests_per_second, burst=max_concurrency)
+
+    async def fetch_page(start: int, size: int) -> Optional[EconBizResponse]:
+        return await search(query, sort=sort, from_result=start, size=size, save_response=False, client=client, rate_limiter=limiter, metrics=metrics, filters=filters)
+
+    first_size = page_size if max_results is None else min(page_size, max_results)
+    first_page = await fetch_page(1, first_size)
+    yield first_page
+
+    if first_page is None or not first_page.get_papers():
+        return
+
+    wanted = first_page.hits.total if max_results is None else min(first_page.hits.total, max_results)
+    starts = iter(range(1 + len(first_page.get_papers()), wanted + 1, page_size))
+    logger.info(f"Fetching {wanted} results for '{query}' in pages of {page_size}")
+
+    # Sliding window: pages complete in any order but are handed out in sort order
+    in_flight = deque()
+
+    def launch_next() -> None:
+        start = next(starts, None)
+        if start is not None:
+            in_flight.append(asyncio.ensure_future(fetch_page(start, min(page_size, wanted - start + 1))))
+
+    try:
+        for _ in range(max_concurrency):
+            launch_next()
+
+        while in_flight:
+            page = await in_flight.popleft()
+            yield page
+
+            if page is None:
+                return
+
+            launch_next()
+
+    finally:
+        for task in in_flight:
+            task.cancel()
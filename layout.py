@@ -0,0 +1,211 @@
+""" Sharded directory layouts for large output directories (PDFs, saved responses)
+
+    A directory's layout is recorded in a small marker file inside it, so every writer and reader of the
+    directory agrees on it without being told. Directories without a marker are flat.
+
+    One-time migration of an existing flat directory:
+        python layout.py pdfs/ --depth 1 --width 2
+        python layout.py saved_responses/ --pattern "response_*"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+LAYOUT_MARKER = ".layout.json"
+
+# Files that belong to the directory itself and never move into shards
+RESERVED_NAMES = frozenset({LAYOUT_MARKER, "index.jsonl", "manifest.jsonl"})
+
+# Suffixes that mark one file's siblings (.part, .part.validator, .altN, temp files) and saved formats, all
+# stripped from the end of a name before hashing. Dots earlier in the name (DOIs, "U.S. trade") are kept
+SIBLING_SUFFIXES = re.compile(r"(\.(pdf|part|validator|alt\d+|tmp|link|json|gz|zst))+$")
+
+
+def shard_key(name: str) -> str:
+    return SIBLING_SUFFIXES.sub("", name) or name
+
+
+class Layout:
+
+    """
+        Where a file named 'name' lives under a root directory
+
+        depth=0 is the flat layout: root/name. Otherwise the file goes into depth levels of subdirectories
+        named by consecutive width-character slices of a hash of the name's key, the name without its known
+        suffixes (see SIBLING_SUFFIXES), so "123.pdf" and "123.pdf.part" share a shard while "10.1234_5.pdf"
+        and "10.1234_6.pdf" need not. Hashing spreads ids with a common prefix evenly.
+
+        Args:
+            depth: Levels of shard directories
+            width: Hex characters per level (16 ** width directories per level)
+    """
+
+    def __init__(self, depth: int = 0, width: int = 2):
+        if depth < 0 or width < 1 or depth * width > 32:
+            raise ValueError("depth must be non-negative, width at least 1 and depth * width at most 32")
+
+        self.depth = depth
+        self.width = width
+
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Layout) and (self.depth, self.width) == (other.depth, other.width)
+
+
+    def __repr__(self) -> str:
+        return f"Layout(depth={self.depth}, width={self.width})"
+
+
+    @property
+    def is_flat(self) -> bool:
+        return self.depth == 0
+
+
+    def path(self, root: Path, name: str) -> Path:
+        if self.is_flat:
+            return root / name
+
+        digest = hashlib.md5(shard_key(name).encode("utf-8")).hexdigest()
+        shards = [digest[i * self.width:(i + 1) * self.width] for i in range(self.depth)]
+        return root.joinpath(*shards, name)
+
+
+    def locate(self, root: Path, name: str) -> Optional[Path]:
+
+        """ Existing file for name, also looking at the flat location a half-finished migration may have left it in """
+
+        for candidate in (self.path(root, name), root / name):
+            if candidate.exists():
+                return candidate
+        return None
+
+
+    def glob(self, root: Path, pattern: str = "*") -> Iterator[Path]:
+
+        """ Files matching pattern at shard depth, plus any still at the top level """
+
+        if not self.is_flat:
+            for path in root.glob("/".join(["*"] * self.depth + [pattern])):
+                if path.is_file():
+                    yield path
+
+        for path in root.glob(pattern):
+            if path.is_file() and path.name not in RESERVED_NAMES:
+                yield path
+
+
+    def to_dict(self) -> dict:
+        return {"depth": self.depth, "width": self.width}
+
+
+FLAT = Layout()
+SHARDED = Layout(depth=1, width=2)
+
+
+def layout_for(directory: Path) -> Layout:
+
+    """ Layout recorded in directory, flat when there is no marker """
+
+    marker = directory / LAYOUT_MARKER
+    if not marker.exists():
+        return FLAT
+
+    data = json.loads(marker.read_text(encoding="utf-8"))
+    return Layout(depth=data["depth"], width=data["width"])
+
+
+def resolve_layout(directory: Path, layout: Optional[Layout] = None) -> Layout:
+
+    """
+        Layout a writer should use for directory: the recorded one, or the requested one
+
+        Requesting a sharded layout for a directory without a marker records it, provided the directory holds
+        no flat files yet (those need migrate_directory). Requesting a layout that contradicts the marker
+        raises ValueError rather than scattering files under two schemes.
+    """
+
+    recorded = layout_for(directory)
+
+    if layout is None or layout == recorded:
+        return recorded
+
+    if (directory / LAYOUT_MARKER).exists() or any(FLAT.glob(directory)):
+        raise ValueError(f"{directory} uses {recorded}, not {layout}; run 'python layout.py {directory}' to migrate it")
+
+    save_layout(directory, layout)
+    return layout
+
+
+def save_layout(directory: Path, layout: Layout) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / LAYOUT_MARKER).write_text(json.dumps(layout.to_dict()), encoding="utf-8")
+
+
+def migrate_directory(directory: Path, layout: Layout = SHARDED, pattern: str = "*") -> int:
+
+    """
+        Move the files of a flat (or differently sharded) directory into layout; returns how many moved
+
+        The new layout is recorded first, and readers also look at the top level, so the directory stays
+        readable while the migration runs. Interrupted migrations are finished by running it again.
+    """
+
+    old = layout_for(directory)
+    files = list(old.glob(directory, pattern))
+
+    save_layout(directory, layout)
+    moved = 0
+
+    for path in files:
+        target = layout.path(directory, path.name)
+        if target == path:
+            continue
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+        moved += 1
+
+    if not old.is_flat:
+        _remove_empty_shards(directory)
+
+    logger.info(f"Moved {moved} files in {directory} to {layout}")
+    return moved
+
+
+def _remove_empty_shards(directory: Path) -> None:
+    for path in sorted(directory.rglob("*"), key=lambda p: len(p.parts), reverse=True):
+        if path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate a flat output directory to a sharded layout")
+    parser.add_argument("directory", type=Path, help="directory to migrate in place")
+    parser.add_argument("--depth", type=int, default=SHARDED.depth, help="levels of shard directories (0 flattens)")
+    parser.add_argument("--width", type=int, default=SHARDED.width, help="hex characters per shard level")
+    parser.add_argument("--pattern", default="*", help="only move files matching this glob")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not args.directory.is_dir():
+        logger.error(f"Not a directory: {args.directory}")
+        return 2
+
+    migrate_directory(args.directory, Layout(depth=args.depth, width=args.width), args.pattern)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
 import asyncio
 import logging
+import httpx
 from pathlib import Path 
 from models import EconBizResponse
 from api import search
-from utils import (load_saved_responses, list_saved_responses, download_pdfs_batch, format_paper_info)
+from client import create_client
+from cache import ResponseCache
+from metrics import Metrics
+from progress import TerminalProgress
+from utils import (load_saved_responses, list_saved_response_entries, download_pdfs_batch, format_paper_info)
 
 
 logging.basicConfig(level=logging.INFO, format = '%(asctime)s - %(levelname)s - %(message)s', handlers = [
@@ -12,6 +17,8 @@ logging.basicConfig(level=logging.INFO, format = '%(asctime)s - %(levelname)s -
 ])
 logger = logging.getLogger(__name__)
 
+METRICS_FILE = Path("econstor_metrics.json")
+
 
 def display_search_results(response: EconBizResponse) -> None: 
 
@@ -26,7 +33,7 @@ def display_search_results(response: EconBizResponse) -> None:
         logger.info(f"[{i}] {format_paper_info(paper)}")
 
 
-async def offer_pdf_download(pdf_urls) -> None:
+async def offer_pdf_download(pdf_urls, client: httpx.AsyncClient = None, metrics: Metrics = None) -> None:
 
     """ Facilitates PDF download process """
 
@@ -36,7 +43,7 @@ async def offer_pdf_download(pdf_urls) -> None:
     download = input(f"\nDownload {len(pdf_urls)} PDF(s)? (y/n): ").strip().lower()
 
     if download == 'y':
-        results = await download_pdfs_batch(pdf_urls)
+        results = await download_pdfs_batch(pdf_urls, client=client, metrics=metrics, progress=TerminalProgress())
 
         # Display results 
         logger.info("Download results:")
@@ -44,7 +51,7 @@ async def offer_pdf_download(pdf_urls) -> None:
         logger.info(f"  Failed downloads: {len(results['failed'])}")
 
 
-async def handle_search_mode() -> None:
+async def handle_search_mode(client: httpx.AsyncClient = None, cache: ResponseCache = None, metrics: Metrics = None) -> None:
 
     """Handles online search mode, makes API call to EconBiz"""
 
@@ -60,42 +67,34 @@ async def handle_search_mode() -> None:
     save_input = input("Save response? (y/n, default y): ").strip().lower()
     save = save_input != 'n'
 
-    response = await search(query=query, size=size, save_response=save)
+    response = await search(query=query, size=size, save_response=save, client=client, cache=cache, metrics=metrics)
 
     if response: 
         display_search_results(response)
 
         pdf_urls = response.get_pdf_urls()
-        await offer_pdf_download(pdf_urls)
+        await offer_pdf_download(pdf_urls, client, metrics)
 
     else:
         logger.error("Search failed")
 
 
-async def handle_load_mode() -> None:
+async def handle_load_mode(client: httpx.AsyncClient = None, metrics: Metrics = None) -> None:
 
     """ Facilitates offline loading mode - loads saved responses from disk """
 
     saved_dir = Path("saved_responses")
-    saved_files = list_saved_responses(saved_dir) # Synchronous function 
+    entries = await list_saved_response_entries(saved_dir)
 
-    if not saved_files:
+    if not entries:
         logger.info("No saved responses")
         return 
 
-    logger.info(f"Found {len(saved_files)} saved files:")
-
-    # Load metadata for each saved file
-    for i, filepath in enumerate(saved_files, 1):
-        try:
-            r = await load_saved_responses(filepath)
-            if r:
-                logger.info(f"[{i}] {r.query} - {r.timestamp}")
-            else:
-                logger.info(f"[{i}] Error loading: {filepath.name}")
+    logger.info(f"Found {len(entries)} saved files:")
 
-        except Exception as e:
-            logger.error(f"[{i}] Error loading: {filepath.name} - {e}")
+    # Metadata comes from the index, only the selected file is parsed
+    for i, entry in enumerate(entries, 1):
+        logger.info(f"[{i}] {entry.query} - {entry.timestamp} ({entry.papers} of {entry.total} papers)")
 
     selection = input("\nSelect (or Enter for latest): ").strip()
 
@@ -105,7 +104,7 @@ async def handle_load_mode() -> None:
         else:
             index = int(selection) - 1
 
-        selected_file = saved_files[index]
+        selected_file = entries[index].path
 
         loaded = await load_saved_responses(selected_file)
 
@@ -124,7 +123,7 @@ async def handle_load_mode() -> None:
 
         #PDF download
         pdf_urls = loaded.get_pdf_urls()
-        await offer_pdf_download(pdf_urls)
+        await offer_pdf_download(pdf_urls, client, metrics)
 
 
     except ValueError:
@@ -139,26 +138,34 @@ async def main() -> None:
     logger.info("ECONBIZ RESEARCH PAPER SEARCH TOOL")
     logger.info("-" * 70)
 
-    while True:
+    # One connection pool, one search cache and one set of request metrics for the whole session
+    cache = ResponseCache()
+    metrics = Metrics()
+
+    async with create_client() as client:
+        while True:
+            
+            # Show menu
+            logger.info("What would you like to do?")
+            logger.info("[1] Search EconBiz (makes API call)")
+            logger.info("[2] Load saved response (no API call, works offline)")
         
-        # Show menu
-        logger.info("What would you like to do?")
-        logger.info("[1] Search EconBiz (makes API call)")
-        logger.info("[2] Load saved response (no API call, works offline)")
-    
-        choice = input("\nEnter 1 or 2 (or 'q' to quit): ").strip()
-        
-        # Route to appropriate handler
-        if choice == "1":
-            await handle_search_mode()
-        elif choice == "2":
-            await handle_load_mode()
-        elif choice == "q":
-            logger.info("Thank you for using our tool. Goodbye")
-            break
-        else:
-            logger.info("Invalid choice. Please enter 1, 2 or q.")
+            choice = input("\nEnter 1 or 2 (or 'q' to quit): ").strip()
+            
+            # Route to appropriate handler
+            if choice == "1":
+                await handle_search_mode(client, cache, metrics)
+            elif choice == "2":
+                await handle_load_mode(client, metrics)
+            elif choice == "q":
+                logger.info("Thank you for using our tool. Goodbye")
+                break
+            else:
+                logger.info("Invalid choice. Please enter 1, 2 or q.")
 
+    stats = cache.stats()
+    logger.info(f"Search cache: {stats['hits']} hits, {stats['misses']} misses")
+    metrics.export(METRICS_FILE)
     logger.info("Program terminated successfully")
 
 if __name__ == "__main__":
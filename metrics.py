@@ -0,0 +1,317 @@
+import json
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+PREFIX = "econstor_"
+
+# Seconds, from a warm keep-alive request on a LAN up to a slow PDF on a congested mirror
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Bytes, from an error page up to a large scanned PDF
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+
+    """ Fixed-bucket histogram; counts are per bucket and made cumulative on export """
+
+    def __init__(self, buckets: Sequence[float] = TIME_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        bounds = [_format_number(b) for b in self.buckets] + ["+Inf"]
+        running, result = 0, []
+        for bound, count in zip(bounds, self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+    def quantile(self, q: float) -> Optional[float]:
+
+        """ Estimate of the q-quantile, interpolated linearly inside the bucket it falls in """
+
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        running = 0
+
+        for i, count in enumerate(self.counts):
+            if running + count >= rank and count:
+                if i == len(self.buckets):
+                    # Past the last finite bound there is nothing to interpolate towards
+                    return self.buckets[-1] if self.buckets else None
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - running) / count
+            running += count
+
+        return None
+
+
+class RequestTimer:
+
+    """
+        Phases of one HTTP request attempt
+
+        Connect time and time to first byte come from httpcore's trace events, so pass
+        timer.extensions with the request. Transfer is headers-to-last-byte minus time spent writing to disk.
+        With trace=False the extensions are empty, so an unrecorded request pays nothing for tracing.
+    """
+
+    def __init__(self, trace: bool = True):
+        self.trace = trace
+        self.started = time.perf_counter()
+        self.connect: Optional[float] = None
+        self.headers_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.disk = 0.0
+        self.bytes = 0
+        self.status: Optional[int] = None
+        self._connect_started: Optional[float] = None
+
+
+    @property
+    def extensions(self) -> dict:
+        return {"trace": self._trace} if self.trace else {}
+
+
+    async def _trace(self, event: str, info: dict) -> None:
+        now = time.perf_counter()
+
+        if event.endswith(("connect_tcp.started", "connect_unix_socket.started")):
+            self._connect_started = now
+        elif event.endswith(("connect_tcp.complete", "connect_unix_socket.complete", "start_tls.complete")) and self._connect_started is not None:
+            self.connect = now - self._connect_started
+        elif event.endswith("receive_response_headers.complete"):
+            self.headers_at = now
+
+
+    def response_received(self, response: httpx.Response) -> None:
+
+        """ Record status and wire bytes once the body has been read """
+
+        self.finished_at = time.perf_counter()
+        self.status = response.status_code
+        self.bytes += response.num_bytes_downloaded
+        if self.headers_at is None:
+            self.headers_at = self.finished_at
+
+
+    @contextmanager
+    def disk_write(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.disk += time.perf_counter() - start
+
+
+    def phases(self) -> Dict[str, float]:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        phases = {"total": end - self.started}
+
+        # Only requests that opened a new connection have a connect phase
+        if self.connect is not None:
+            phases["connect"] = self.connect
+
+        if self.headers_at is not None:
+            phases["ttfb"] = self.headers_at - self.started
+            phases["transfer"] = max(0.0, end - self.headers_at - self.disk)
+
+        if self.disk:
+            phases["disk"] = self.disk
+
+        return phases
+
+
+class Metrics:
+
+    """
+        Counters and histograms for HTTP traffic, exportable as JSON or Prometheus text at any time
+
+        Pass one instance to search / download_pdfs_batch (or fetch_from_api / download_pdf) and every
+        request attempt, retries included, is recorded under its kind ("search" or "download"):
+
+            requests_total{kind, status}          attempts by HTTP status ("error" when no response came back)
+            request_phase_seconds{kind, phase}    connect, ttfb, transfer, disk and total
+            response_bytes{kind}                  bytes received per attempt
+            circuit_open_total{kind}              attempts skipped by an open circuit breaker, never sent
+
+        download_pdfs_batch adds per-paper series on top of the per-attempt ones:
+
+            paper_download_seconds                time to a complete PDF, retries and hedges included
+            hedges_total{outcome}                 alternate URLs started by hedged downloads, "won" or "lost"
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + amount
+
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = TIME_BUCKETS, **labels: str) -> None:
+        series = self._histograms.setdefault(name, {})
+        key = _labels(labels)
+        if key not in series:
+            series[key] = Histogram(buckets)
+        series[key].observe(value)
+
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self._counters.get(name, {}).get(_labels(labels), 0)
+
+
+    def histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(_labels(labels))
+
+
+    def record(self, kind: str, timer: RequestTimer) -> None:
+        status = str(timer.status) if timer.status is not None else "error"
+        self.inc("requests_total", kind=kind, status=status)
+        self.observe("response_bytes", timer.bytes, buckets=SIZE_BUCKETS, kind=kind)
+
+        for phase, seconds in timer.phases().items():
+            self.observe("request_phase_seconds", seconds, kind=kind, phase=phase)
+
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._histograms.clear()
+
+
+    def to_dict(self) -> dict:
+        return {
+            "counters": {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            },
+            "histograms": {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": hist.count,
+                        "sum": hist.sum,
+                        "p50": hist.quantile(0.5),
+                        "p95": hist.quantile(0.95),
+                        "p99": hist.quantile(0.99),
+                        "buckets": dict(hist.cumulative())
+                    }
+                    for key, hist in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        }
+
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+
+    def to_prometheus(self) -> str:
+
+        """ Prometheus text exposition format (version 0.0.4) """
+
+        lines = []
+
+        for name, series in self._counters.items():
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            for key, value in series.items():
+                lines.append(f"{PREFIX}{name}{_format_labels(key)} {_format_number(value)}")
+
+        for name, series in self._histograms.items():
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for key, hist in series.items():
+                for bound, count in hist.cumulative():
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {_format_number(hist.sum)}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+    def export(self, filepath: Path) -> None:
+
+        """ Write Prometheus text for a .prom or .txt file, JSON otherwise """
+
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+
+        if filepath.suffix in (".prom", ".txt"):
+            filepath.write_text(self.to_prometheus())
+        else:
+            filepath.write_text(self.to_json())
+
+        logger.info(f"Metrics written to {filepath}")
+
+
+def latency_summary(durations: Sequence[float]) -> Dict[str, Optional[float]]:
+
+    """ Count, p50, p95, p99 and max of durations in seconds (exact nearest-rank percentiles, None when empty) """
+
+    ordered = sorted(durations)
+    summary: Dict[str, Optional[float]] = {"count": len(ordered)}
+
+    for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        summary[name] = round(ordered[max(0, math.ceil(q * len(ordered)) - 1)], 4) if ordered else None
+
+    summary["max"] = round(ordered[-1], 4) if ordered else None
+    return summary
+
+
+@contextmanager
+def track_request(metrics: Optional[Metrics], kind: str) -> Iterator[RequestTimer]:
+
+    """ Time one request attempt and record it in metrics when the block exits, however it exits """
+
+    timer = RequestTimer(trace=metrics is not None)
+    try:
+        yield timer
+    finally:
+        if metrics is not None:
+            metrics.record(kind, timer)
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Labels) -> str:
+    if not key:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+    return "{" + inner + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
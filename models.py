@@ -1,8 +1,9 @@
 import aiofiles 
-from pydantic import BaseModel, Field 
-from typing import Optional, List, Tuple, Union
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, Dict, List, Tuple, Union
 from datetime import datetime
 from pathlib import Path 
+import storage
  
  
 class Paper(BaseModel):  # individual paper
@@ -31,12 +32,18 @@ class SearchHits(BaseModel): # search results
 
 
 
+# Version of the saved EconBizResponse layout; bump it when a change to these models would misread older files.
+# Files saved before the field existed count as version 1
+RESPONSE_SCHEMA_VERSION = 2
+
+
 class EconBizResponse(BaseModel): # complete API response
     hits: SearchHits
     facets: Optional[dict] = None
     query: str = ""
     search_params: dict = Field(default_factory=dict)
     timestamp: datetime = Field(default_factory=datetime.now)
+    schema_version: int = RESPONSE_SCHEMA_VERSION
 
     def get_papers(self) -> List[Paper]:
         return self.hits.hits
@@ -53,14 +60,74 @@ class EconBizResponse(BaseModel): # complete API response
         return results
 
     
-    async def save(self, filepath: Path) -> None:
+    async def save(self, filepath: Path, format: str = "json") -> None:
+        """ Write the response in the given storage format ('json', 'json.gz' or 'json.zst') """
         filepath.parent.mkdir(parents = True, exist_ok = True)
-        async with aiofiles.open(filepath, 'w', encoding = 'utf-8') as f:
-            await f.write(self.model_dump_json(indent = 2))
+        indent = 2 if storage.is_pretty(format) else None
+        data = storage.encode(self.model_dump_json(indent = indent).encode('utf-8'), format)
+        async with aiofiles.open(filepath, 'wb') as f:
+            await f.write(data)
 
 
     @classmethod
     async def load(cls, filepath: Path) -> 'EconBizResponse':
-        async with aiofiles.open(filepath, 'r', encoding = 'utf-8') as f:
-            content = await f.read()
-        return cls.model_validate_json(content)
+        """ Read a response saved in any storage format, detected automatically; files from a newer schema are refused """
+        async with aiofiles.open(filepath, 'rb') as f:
+            data = await f.read()
+        response = cls.model_validate_json(storage.decode(data))
+
+        version = response.schema_version if "schema_version" in response.model_fields_set else 1
+        if version > RESPONSE_SCHEMA_VERSION:
+            raise ValueError(f"{filepath} uses response schema {version}, this version reads up to {RESPONSE_SCHEMA_VERSION}")
+        return response
+
+
+
+
+class SavedResponseEntry(BaseModel): # one line of the saved_responses index
+    path: Path
+    query: str = ""
+    timestamp: datetime
+    total: int = 0
+    papers: int = 0
+    size_bytes: int = 0
+
+    @classmethod
+    def from_response(cls, filepath: Path, response: 'EconBizResponse') -> 'SavedResponseEntry':
+        return cls(
+            path=filepath,
+            query=response.query,
+            timestamp=response.timestamp,
+            total=response.hits.total,
+            papers=len(response.get_papers()),
+            size_bytes=filepath.stat().st_size
+        )
+
+
+class ExtractedText(BaseModel): # plain text pulled out of one downloaded PDF
+    path: Path
+    sha256: str
+    pages: int = 0
+    text: str = ""
+    error: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class SyncState(BaseModel): # high-water mark of one query for incremental harvests
+    query: str
+    newest_date: Optional[str] = None
+    seen_ids: List[str] = Field(default_factory=list)
+    pending_pdfs: Dict[str, List[str]] = Field(default_factory=dict) # paper id -> candidate PDF URLs, best first
+    last_sync: Optional[datetime] = None
+
+    @field_validator("pending_pdfs", mode="before")
+    @classmethod
+    def _single_url(cls, value):
+        # State files written before alternates were kept hold one URL per paper
+        if isinstance(value, dict):
+            return {paper_id: [urls] if isinstance(urls, str) else urls for paper_id, urls in value.items()}
+        return value
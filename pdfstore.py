@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from storage import read_jsonl_mapping
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_STORE_DIR = Path("pdf_store")
+MANIFEST_NAME = "manifest.jsonl"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class PdfStore:
+
+    """
+        Content-addressed PDF store shared by every harvest
+
+        Each distinct PDF is kept once, as objects/<first two hex digits>/<sha256>.pdf. manifest.jsonl maps
+        paper_id to hash, one JSON line per stored paper (the last line for an id wins). Files in a batch's
+        output directory are hardlinks to the stored object, or symlinks when the two are on different
+        filesystems, so the same paper under several queries costs one download and one copy on disk.
+
+        Args:
+            root: Directory holding the objects and the manifest
+    """
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR):
+        self.root = root
+        self.objects = root / "objects"
+        self.manifest = root / MANIFEST_NAME
+
+        # paper_id -> sha256; loaded from the manifest on first use
+        self._hashes: Optional[Dict[str, str]] = None
+
+
+    def lookup(self, paper_id: str) -> Optional[Path]:
+
+        """ Stored object of a paper, or None if the paper was never stored or its object has gone """
+
+        digest = self._load().get(paper_id)
+        if digest is None:
+            return None
+
+        path = self.object_path(digest)
+        return path if path.exists() else None
+
+
+    async def add(self, paper_id: str, filepath: Path) -> Path:
+
+        """ Move a downloaded PDF into the store, link it back in place, and record it in the manifest """
+
+        # Hashing reads the whole file, so keep it off the event loop
+        digest = await asyncio.get_running_loop().run_in_executor(None, file_sha256, filepath)
+        stored = self.object_path(digest)
+
+        if stored.exists():
+            # Same bytes already stored under another paper id or an earlier run
+            filepath.unlink()
+        else:
+            stored.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(filepath, stored)
+
+        link(stored, filepath)
+
+        if self._load().get(paper_id) != digest:
+            self._hashes[paper_id] = digest
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.manifest, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"paper_id": paper_id, "sha256": digest, "size": stored.stat().st_size}) + "\n")
+
+        return stored
+
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}.pdf"
+
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+    def _load(self) -> Dict[str, str]:
+        if self._hashes is not None:
+            return self._hashes
+
+        self._hashes = read_jsonl_mapping(self.manifest, "paper_id", "sha256")
+        return self._hashes
+
+
+def link(source: Path, target: Path) -> None:
+
+    """ Point target at source: a hardlink where possible, a symlink across filesystems; replaces what was there """
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    if target.exists() and os.path.samefile(source, target):
+        return
+
+    tmp = target.with_name(target.name + ".link")
+    if os.path.lexists(tmp):
+        tmp.unlink()
+
+    try:
+        os.link(source, tmp)
+    except OSError:
+        os.symlink(source.resolve(), tmp)
+
+    os.replace(tmp, target)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,200 @@
+import httpx
+import asyncio
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from models import EconBizResponse, SearchHits
+from api import search, DEFAULT_PAGE_SIZE
+from harvest import harvest, DEFAULT_REQUESTS_PER_SECOND
+from ratelimit import RateLimiter
+from metrics import Metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SPLIT_FACETS = ("date", "type_genre")
+
+# Results a single (sub-)query may page through before it is split further
+DEFAULT_SPLIT_THRESHOLD = 1000
+
+DEFAULT_SUBQUERY_CONCURRENCY = 4
+
+
+class SubQuery(NamedTuple):
+
+    """ One slice of a broad query: the facet filters that select it and the result count the facet reported """
+
+    filters: List[str]
+    expected: int
+
+
+class QueryPlan(NamedTuple):
+    total: int
+    facets: Optional[dict]
+    subqueries: List[SubQuery]
+
+
+def facet_counts(facets: Optional[dict], field: str) -> Dict[str, int]:
+
+    """
+        Value -> count of one facet field
+
+        Accepts the shapes facet lists come in: {value: count}, [{"term"/"value"/"key": value, "count": n}]
+        and [[value, count]]. Anything else yields no counts, so the caller falls back to not splitting.
+    """
+
+    raw = (facets or {}).get(field)
+    counts = {}
+
+    if isinstance(raw, dict):
+        items = raw.items()
+    elif isinstance(raw, list):
+        items = []
+        for entry in raw:
+            if isinstance(entry, dict):
+                value = entry.get("term", entry.get("value", entry.get("key")))
+                items.append((value, entry.get("count")))
+            elif isinstance(entry, (list, tuple)) and len(entry) == 2:
+                items.append(tuple(entry))
+    else:
+        return counts
+
+    for value, count in items:
+        if value is not None and isinstance(count, int) and count > 0:
+            counts[str(value)] = count
+
+    return counts
+
+
+async def plan_query(query: str, facets: Sequence[str] = DEFAULT_SPLIT_FACETS, split_threshold: int = DEFAULT_SPLIT_THRESHOLD, client: Optional[httpx.AsyncClient] = None, rate_limiter: Optional[RateLimiter] = None, metrics: Optional[Metrics] = None) -> Optional[QueryPlan]:
+
+    """
+        Split a query into sub-queries of at most split_threshold results each, by facet values
+
+        The query is probed for the counts of facets[0]; every value becomes a sub-query filtered on it.
+        A slice still above the threshold is probed again and split by the next facet. A facet whose values
+        do not cover the whole slice (a truncated facet list, or papers without a value) is passed over for
+        the next one, since splitting by it would lose the rest. A slice that cannot be split is kept as one
+        deep-paged sub-query. Returns None if a probe fails.
+
+        Counts only prove coverage for single-valued facets: with a multi-valued one, papers carrying several
+        values can make up for papers carrying none. harvest_split checks the harvested papers against the total.
+    """
+
+    async def probe(filters: List[str], facet: str) -> Optional[EconBizResponse]:
+        return await search(query, size=1, facets=facet, save_response=False, client=client, rate_limiter=rate_limiter, metrics=metrics, filters=filters)
+
+    async def split(filters: List[str], remaining: Sequence[str], response: EconBizResponse) -> Optional[List[SubQuery]]:
+        total = response.hits.total
+
+        if total <= split_threshold or not remaining:
+            return [SubQuery(filters, total)]
+
+        facet = remaining[0]
+        counts = facet_counts(response.facets, facet)
+        covered = sum(counts.values())
+
+        if covered < total:
+            # Facet lists can be truncated and some papers have no value for the field
+            logger.warning(f"'{facet}' values cover {covered} of {total} results for '{query}' {filters}, trying the next facet")
+
+            if len(remaining) == 1:
+                logger.warning(f"Keeping '{query}' {filters} as one sub-query of {total} results")
+                return [SubQuery(filters, total)]
+
+            next_response = await probe(filters, remaining[1])
+            if next_response is None:
+                return None
+            return await split(filters, remaining[1:], next_response)
+
+        slices = []
+        for value in sorted(counts, reverse=True):
+            sub_filters = filters + [f'{facet}:"{value}"']
+
+            if counts[value] <= split_threshold or len(remaining) == 1:
+                slices.append(SubQuery(sub_filters, counts[value]))
+                continue
+
+            sub_response = await probe(sub_filters, remaining[1])
+            if sub_response is None:
+                return None
+
+            sub_slices = await split(sub_filters, remaining[1:], sub_response)
+            if sub_slices is None:
+                return None
+            slices.extend(sub_slices)
+
+        return slices
+
+    response = await probe([], facets[0] if facets else "")
+    if response is None:
+        return None
+
+    subqueries = await split([], list(facets), response)
+    if subqueries is None:
+        return None
+
+    logger.info(f"Planned {len(subqueries)} sub-queries for '{query}' ({response.hits.total} results)")
+    return QueryPlan(total=response.hits.total, facets=response.facets, subqueries=subqueries)
+
+
+async def harvest_split(query: str, facets: Sequence[str] = DEFAULT_SPLIT_FACETS, split_threshold: int = DEFAULT_SPLIT_THRESHOLD, page_size: int = DEFAULT_PAGE_SIZE, max_concurrency: int = DEFAULT_SUBQUERY_CONCURRENCY, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, client: Optional[httpx.AsyncClient] = None, rate_limiter: Optional[RateLimiter] = None, metrics: Optional[Metrics] = None) -> Optional[EconBizResponse]:
+
+    """
+        Harvest a broad query as a set of shallow sub-queries run in parallel (see plan_query)
+
+        At most max_concurrency sub-queries run at once, each one page at a time, all through one rate limiter.
+        Hits are merged in sub-query order and de-duplicated by Paper.id, since a paper can carry several
+        values of a multi-valued facet. Returns None if planning or any sub-query fails, or if fewer unique
+        papers come back than the unsplit query reported (papers without a value of a split facet).
+
+        The index can change between planning and harvesting. A shortfall no larger than the drift of the
+        sub-query totals since planning is put down to that, and logged as a warning instead.
+    """
+
+    limiter = rate_limiter or RateLimiter(requests_per_second, burst=max_concurrency)
+
+    plan = await plan_query(query, facets, split_threshold, client=client, rate_limiter=limiter, metrics=metrics)
+    if plan is None:
+        return None
+
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def run(subquery: SubQuery) -> Optional[EconBizResponse]:
+        async with slots:
+            return await harvest(query, page_size=page_size, max_concurrency=1, client=client, rate_limiter=limiter, metrics=metrics, filters=subquery.filters)
+
+    responses = await asyncio.gather(*(run(subquery) for subquery in plan.subqueries))
+
+    papers, seen = [], set()
+    drift = 0
+
+    for subquery, response in zip(plan.subqueries, responses):
+        if response is None:
+            logger.error(f"Sub-query {subquery.filters} of '{query}' failed")
+            return None
+
+        drift += abs(response.hits.total - subquery.expected)
+
+        for paper in response.get_papers():
+            if paper.id not in seen:
+                seen.add(paper.id)
+                papers.append(paper)
+
+    shortfall = plan.total - len(papers)
+
+    if shortfall > drift:
+        logger.error(f"Sub-queries of '{query}' returned {len(papers)} unique papers of {plan.total}; papers without a value for {list(facets)} were lost")
+        return None
+
+    if shortfall > 0:
+        logger.warning(f"Sub-queries of '{query}' returned {len(papers)} unique papers of {plan.total}; their totals changed by {drift} since planning, so the index was likely updated meanwhile")
+
+    logger.info(f"Harvested {len(papers)} unique papers of {plan.total} for '{query}' from {len(plan.subqueries)} sub-queries")
+
+    return EconBizResponse(
+        hits=SearchHits(total=plan.total, hits=papers),
+        facets=plan.facets,
+        query=query,
+        search_params={"q": query, "split_by": list(facets), "subqueries": [subquery.filters for subquery in plan.subqueries], "size": len(papers)}
+    )
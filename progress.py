@@ -0,0 +1,187 @@
+import sys
+import time
+from typing import Callable, NamedTuple, Optional, TextIO
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INTERVAL = 0.5
+
+# Weight of the newest interval in the smoothed transfer rate
+RATE_SMOOTHING = 0.3
+
+
+class ProgressSnapshot(NamedTuple):
+
+    """ State of a download batch at one moment """
+
+    total: Optional[int]
+    completed: int
+    failed: int
+    in_flight: int
+    bytes: int
+    elapsed: float
+    rate: float
+    eta: Optional[float]
+    done: bool
+
+    @property
+    def finished(self) -> int:
+        return self.completed + self.failed
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.rate / 1e6
+
+
+class ProgressTracker:
+
+    """
+        Counts a batch's downloads and bytes and hands snapshots to callback at most once per interval
+
+        The counting methods are called from the download loop for every chunk, so they only bump
+        counters and compare a timestamp; building a snapshot and calling back happens at most
+        once per interval, plus once more from close() so the final state is always reported.
+
+        Args:
+            callback: Receives each ProgressSnapshot
+            total: Number of downloads in the batch, when known (needed for an ETA)
+            interval: Minimum seconds between callbacks
+    """
+
+    def __init__(self, callback: Callable[[ProgressSnapshot], None], total: Optional[int] = None, interval: float = DEFAULT_INTERVAL):
+        self.callback = callback
+        self.total = total
+        self.interval = interval
+
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.bytes = 0
+        self.rate = 0.0
+
+        self._started = time.monotonic()
+        self._last_emit = self._started
+        self._last_bytes = 0
+
+
+    def start(self) -> None:
+        self.in_flight += 1
+        self._maybe_emit()
+
+
+    def add_bytes(self, count: int) -> None:
+        self.bytes += count
+        self._maybe_emit()
+
+
+    def finish(self, success: bool) -> None:
+        self.in_flight -= 1
+        if success:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self._maybe_emit()
+
+
+    def close(self) -> None:
+        self._emit(time.monotonic(), done=True)
+
+
+    def snapshot(self, now: Optional[float] = None, done: bool = False) -> ProgressSnapshot:
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._started
+        finished = self.completed + self.failed
+
+        eta = None
+        if self.total is not None and finished and not done:
+            eta = (self.total - finished) * elapsed / finished
+
+        return ProgressSnapshot(
+            total=self.total,
+            completed=self.completed,
+            failed=self.failed,
+            in_flight=self.in_flight,
+            bytes=self.bytes,
+            elapsed=elapsed,
+            rate=self.bytes / elapsed if done and elapsed > 0 else self.rate,
+            eta=eta,
+            done=done
+        )
+
+
+    def _maybe_emit(self) -> None:
+        now = time.monotonic()
+        if now - self._last_emit >= self.interval:
+            self._emit(now)
+
+
+    def _emit(self, now: float, done: bool = False) -> None:
+        window = now - self._last_emit
+        if window > 0:
+            current = (self.bytes - self._last_bytes) / window
+            self.rate = current if not self.rate else RATE_SMOOTHING * current + (1 - RATE_SMOOTHING) * self.rate
+
+        self._last_emit = now
+        self._last_bytes = self.bytes
+
+        try:
+            self.callback(self.snapshot(now, done))
+        except Exception as e:
+            # A broken progress display must never fail the downloads it reports on
+            logger.warning(f"Progress callback failed: {e}")
+
+
+class TerminalProgress:
+
+    """
+        Progress callback rendering a one-line status, redrawn in place on a terminal
+
+        When stream is not a terminal (a log file, CI output) each update goes on its own line instead.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream if stream is not None else sys.stdout
+        self._redraw = self.stream.isatty()
+        self._width = 0
+
+
+    def __call__(self, snapshot: ProgressSnapshot) -> None:
+        line = format_progress(snapshot)
+
+        if self._redraw:
+            # Pad with spaces to wipe the tail of a longer previous line
+            self.stream.write("\r" + line.ljust(self._width))
+            self._width = len(line)
+            if snapshot.done:
+                self.stream.write("\n")
+        else:
+            self.stream.write(line + "\n")
+
+        self.stream.flush()
+
+
+def format_progress(snapshot: ProgressSnapshot) -> str:
+    total = snapshot.total if snapshot.total is not None else "?"
+    parts = [
+        f"[{snapshot.finished}/{total}]",
+        f"{snapshot.in_flight} in flight",
+        f"{snapshot.failed} failed",
+        f"{snapshot.bytes / 1e6:.1f} MB",
+        f"{snapshot.mb_per_sec:.2f} MB/s"
+    ]
+
+    if snapshot.done:
+        parts.append(f"done in {_format_seconds(snapshot.elapsed)}")
+    elif snapshot.eta is not None:
+        parts.append(f"ETA {_format_seconds(snapshot.eta)}")
+
+    return " | ".join(parts)
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
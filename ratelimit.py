@@ -0,0 +1,203 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+T = TypeVar("T")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+class RateLimiter:
+
+    """
+        Token bucket shared by every request that should count against one server's limit
+
+        The rate adapts to server feedback: a throttling response (429/503) cuts it multiplicatively and
+        records a ceiling just below the rate that was refused; each success then raises it additively,
+        back up towards that ceiling. A Retry-After value pauses every caller of the limiter, not just one.
+
+        Args:
+            rate: Requests per second allowed on average (also the upper bound for adaptation)
+            burst: Requests that may go out back to back after an idle period
+            min_rate: Floor the rate never drops below when throttled
+            increase: Requests per second added after each successful request
+            decrease: Factor the rate is multiplied by when throttled
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: Optional[float] = None, increase: Optional[float] = None, decrease: float = 0.5):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.increase = increase if increase is not None else rate / 50
+        self.decrease = decrease
+
+        self._ceiling = rate
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+
+    async def acquire(self) -> None:
+
+        """ Wait until a request may be sent """
+
+        async with self._lock:
+            pause = self._blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            self._refill()
+
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+
+            self._tokens -= 1
+
+
+    def on_success(self) -> None:
+
+        """ Additive increase towards the learned ceiling """
+
+        self.rate = min(self._ceiling, self.rate + self.increase)
+
+        # Let the ceiling creep back up slowly, so a limit that was lifted is eventually found again
+        self._ceiling = min(self.max_rate, self._ceiling + self.increase / 100)
+
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> None:
+
+        """ Multiplicative decrease, remembering the refused rate, and a shared pause for Retry-After """
+
+        self._ceiling = max(self.min_rate, min(self._ceiling, self.rate * 0.9))
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._tokens = min(self._tokens, 0.0)
+
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+        logger.warning(f"Server throttled requests, rate now {self.rate:.2f}/s" + (f", pausing {retry_after:.1f}s" if retry_after else ""))
+
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RetryPolicy:
+
+    """
+        Exponential backoff with full jitter for transient failures
+
+        Args:
+            max_attempts: Total tries including the first one
+            base_delay: Backoff before the second attempt; doubled each time after
+            max_delay: Upper bound on any single wait, including a server's Retry-After
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.25, max_delay: float = 60.0):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+
+        """ Seconds to wait before retry number 'attempt' (1-based) """
+
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+DEFAULT_RETRY = RetryPolicy()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+
+    """ Retry-After as seconds, from either delta-seconds or an HTTP-date """
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+async def with_retries(operation: Callable[[], Awaitable[T]], retry: RetryPolicy = DEFAULT_RETRY, rate_limiter: Optional[RateLimiter] = None, description: str = "request") -> T:
+
+    """
+        Run operation, retrying transport errors and retryable HTTP statuses
+
+        The operation must raise httpx errors (e.g. via raise_for_status) for this to see them.
+        The last error is re-raised once attempts run out; non-retryable errors are raised at once.
+    """
+
+    attempt = 1
+
+    while True:
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+
+        try:
+            result = await operation()
+
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+
+            if rate_limiter is not None and status in THROTTLE_STATUSES:
+                rate_limiter.on_throttled(retry_after)
+
+            if status not in RETRY_STATUSES or attempt >= retry.max_attempts:
+                raise
+
+            wait = retry.delay(attempt, retry_after)
+            logger.info(f"Retrying {description} after HTTP {status} in {wait:.2f}s (attempt {attempt + 1}/{retry.max_attempts})")
+
+        except httpx.TransportError as e:
+            if attempt >= retry.max_attempts:
+                raise
+
+            wait = retry.delay(attempt)
+            logger.info(f"Retrying {description} after {type(e).__name__} in {wait:.2f}s (attempt {attempt + 1}/{retry.max_attempts})")
+
+        else:
+            if rate_limiter is not None:
+                rate_limiter.on_success()
+            return result
+
+        await asyncio.sleep(wait)
+        attempt += 1
@@ -0,0 +1,233 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+from client import borrow_client
+from metrics import Metrics, track_request
+from models import Paper
+from ratelimit import RateLimiter
+from storage import read_jsonl_mapping
+from utils import NON_PDF_CONTENT_TYPES, PDF_MAGIC, PDF_MAGIC_WINDOW
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RESOLVER_CACHE = Path("resolved_urls.jsonl")
+DEFAULT_RESOLVE_CONCURRENCY = 8
+
+# Landing pages are small; anything bigger is not one and is not read past this
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+
+PDF_CONTENT_TYPES = ("application/pdf", "application/x-pdf")
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class PdfUrlResolver:
+
+    """
+        Turns a paper's identifier URLs (handles, landing pages or direct links) into a PDF download URL
+
+        A URL that already serves a PDF resolves to itself (after redirects): an application/pdf response, or
+        any other non-HTML one whose body starts with %PDF. An HTML page is scraped for
+        its PDF link - the citation_pdf_url meta tag repositories publish for Google Scholar, then a
+        rel="alternate" PDF link, then the first anchor to a .pdf. Resolutions are appended to a JSON Lines
+        cache (the last line for a URL wins), so each landing page is fetched once across runs. Pages
+        without a PDF link are cached too; network errors and HTTP errors are not, so they are retried.
+
+        Args:
+            cache_path: JSON Lines file of {"url", "pdf_url"} resolutions (pdf_url is null when there is none)
+            client: Shared client; a throwaway one per request when None
+            max_concurrency: Landing pages fetched at once
+            rate_limiter: Limiter pacing every page fetch
+            metrics: Records every fetch as kind "resolve"
+    """
+
+    def __init__(self, cache_path: Path = DEFAULT_RESOLVER_CACHE, client: Optional[httpx.AsyncClient] = None, max_concurrency: int = DEFAULT_RESOLVE_CONCURRENCY, rate_limiter: Optional[RateLimiter] = None, metrics: Optional[Metrics] = None):
+        self.cache_path = cache_path
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+        # url -> resolved PDF url (None: no PDF there); loaded from the cache file on first use
+        self._resolved: Optional[Dict[str, Optional[str]]] = None
+
+        # url -> resolution in progress, so papers sharing a landing page fetch it once
+        self._pending: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+
+
+    async def resolve(self, urls: Iterable[str]) -> Optional[str]:
+
+        """ PDF URL for one paper: all its identifier URLs are resolved concurrently, the earliest that yields a PDF wins """
+
+        candidates = await self.candidates(urls)
+        return candidates[0] if candidates else None
+
+
+    async def candidates(self, urls: Iterable[str]) -> List[str]:
+
+        """ Every distinct PDF URL behind one paper's identifier URLs, resolved concurrently, in identifier order """
+
+        urls = list(dict.fromkeys(url for url in urls if url))
+        resolved = await asyncio.gather(*(self.resolve_url(url) for url in urls))
+        return list(dict.fromkeys(pdf_url for pdf_url in resolved if pdf_url))
+
+
+    async def resolve_url(self, url: str) -> Optional[str]:
+
+        """ PDF URL behind one identifier URL, or None if there is none or it could not be fetched """
+
+        cache = self._load()
+        if url in cache:
+            return cache[url]
+
+        if url in self._pending:
+            return await asyncio.shield(self._pending[url])
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[url] = future
+
+        try:
+            pdf_url, cacheable = await self._fetch(url)
+            if cacheable:
+                self._remember(url, pdf_url)
+            future.set_result(pdf_url)
+            return pdf_url
+        except asyncio.CancelledError:
+            # Futures do not accept a CancelledError as their exception; cancel waiters instead
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved, so a future nobody else awaited does not log 'exception was never retrieved'
+            future.exception()
+            raise
+        finally:
+            del self._pending[url]
+
+
+    async def resolve_papers(self, papers: Iterable[Paper]) -> List[Tuple[str, str]]:
+
+        """ (paper_id, pdf_url) for every paper whose identifier URLs lead to a PDF, in paper order """
+
+        papers = [paper for paper in papers if paper.identifier_url]
+        resolved = await asyncio.gather(*(self.resolve(paper.identifier_url) for paper in papers))
+
+        pdf_urls = [(paper.id, pdf_url) for paper, pdf_url in zip(papers, resolved) if pdf_url]
+        logger.info(f"Resolved PDF links for {len(pdf_urls)} of {len(papers)} papers")
+
+        return pdf_urls
+
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+    async def _fetch(self, url: str) -> Tuple[Optional[str], bool]:
+
+        """ (pdf_url, whether the answer is definitive enough to cache) for one URL """
+
+        async with self._slots:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+
+            try:
+                async with borrow_client(self.client) as client:
+                    with track_request(self.metrics, "resolve") as timer:
+                        async with client.stream("GET", url, extensions=timer.extensions) as response:
+                            timer.status = response.status_code
+                            response.raise_for_status()
+
+                            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                            final_url = str(response.url)
+
+                            if content_type in PDF_CONTENT_TYPES:
+                                # The body is the PDF itself; leave it for the download
+                                timer.response_received(response)
+                                return final_url, True
+
+                            if content_type not in HTML_CONTENT_TYPES:
+                                if content_type.startswith(NON_PDF_CONTENT_TYPES):
+                                    head = b""
+                                else:
+                                    # PDFs are also served as application/octet-stream or with no type at all, so let the bytes decide
+                                    head = await _read_limited(response, PDF_MAGIC_WINDOW)
+                                timer.response_received(response)
+
+                                if PDF_MAGIC in head:
+                                    return final_url, True
+
+                                logger.debug(f"{url} is neither a PDF nor a landing page ({content_type or 'no content type'})")
+                                return None, True
+
+                            page = await _read_limited(response, MAX_PAGE_BYTES)
+                            timer.response_received(response)
+
+            except httpx.HTTPError as e:
+                logger.warning(f"Could not resolve {url}: {type(e).__name__}: {e}")
+                return None, False
+
+        pdf_url = find_pdf_link(page, final_url)
+        if pdf_url is None:
+            logger.debug(f"No PDF link on landing page {url}")
+
+        return pdf_url, True
+
+
+    def _remember(self, url: str, pdf_url: Optional[str]) -> None:
+        self._load()[url] = pdf_url
+
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"url": url, "pdf_url": pdf_url}) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not cache resolution of {url}: {e}")
+
+
+    def _load(self) -> Dict[str, Optional[str]]:
+        if self._resolved is not None:
+            return self._resolved
+
+        self._resolved = read_jsonl_mapping(self.cache_path, "url", "pdf_url")
+        return self._resolved
+
+
+def find_pdf_link(html: bytes, base_url: str) -> Optional[str]:
+
+    """ Absolute URL of the PDF a landing page links to, or None """
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    meta = soup.find("meta", attrs={"name": "citation_pdf_url"})
+    if meta and meta.get("content"):
+        return urljoin(base_url, meta["content"].strip())
+
+    for link in soup.find_all("link", href=True):
+        if (link.get("type") or "").lower() in PDF_CONTENT_TYPES:
+            return urljoin(base_url, link["href"].strip())
+
+    for anchor in soup.find_all("a", href=True):
+        href = urljoin(base_url, anchor["href"].strip())
+        if urlparse(href).path.lower().endswith(".pdf"):
+            return href
+
+    return None
+
+
+async def _read_limited(response: httpx.Response, limit: int) -> bytes:
+    body = bytearray()
+
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) >= limit:
+            break
+
+    return bytes(body[:limit])
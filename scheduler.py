@@ -0,0 +1,137 @@
+import asyncio
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_MAX_PER_HOST = 4
+
+
+class DownloadScheduler:
+
+    """
+        Dispatches jobs under a global and a per-host concurrency cap
+
+        Jobs are pulled lazily from the input iterable, so memory stays flat however many
+        (paper_id, url) tuples are passed in. A job whose host is at its cap waits in that host's
+        backlog without holding a global slot, so a busy host never stalls jobs for idle ones; when
+        a slot frees up, it goes to the oldest waiting job that fits before any new one is read.
+
+        A running job may open extra transfers (hedged downloads to alternate URLs). Those take a
+        per-host slot through try_claim, without a global one, so every host's cap covers them too.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_per_host: int = DEFAULT_MAX_PER_HOST):
+        if max_concurrency < 1 or max_per_host < 1:
+            raise ValueError("max_concurrency and max_per_host must be at least 1")
+
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+
+        # Transfers in flight per host, jobs and claims alike
+        self._active: Dict[str, int] = defaultdict(int)
+        self._on_release: Optional[Callable[[], None]] = None
+
+
+    def try_claim(self, url: str) -> bool:
+
+        """ Take a slot on url's host for an extra transfer if the host has room; release it when done """
+
+        host = urlparse(url).netloc
+        if self._active[host] >= self.max_per_host:
+            return False
+
+        self._active[host] += 1
+        return True
+
+
+    def release(self, url: str) -> None:
+        self._active[urlparse(url).netloc] -= 1
+        if self._on_release is not None:
+            self._on_release()
+
+
+    async def run(self, jobs: Iterable[Tuple[str, str]], handler: Callable[[str, str], Awaitable[None]]) -> None:
+
+        """ Await handler(paper_id, url) for every job, never exceeding either concurrency cap """
+
+        active = self._active
+        backlog: Dict[str, Deque[Tuple[str, str]]] = {}
+        tasks: Set[asyncio.Task] = set()
+        changed = asyncio.Event()
+        running = 0
+
+        # Jobs read from the input but waiting for their host, bounded to keep the read-ahead lazy
+        max_waiting = self.max_concurrency * 2
+        waiting = 0
+
+        async def run_job(host: str, job: Tuple[str, str]) -> None:
+            nonlocal running
+            paper_id, url = job
+
+            try:
+                await handler(paper_id, url)
+            except Exception as e:
+                logger.error(f"Unhandled error for {paper_id}: {e}")
+            finally:
+                active[host] -= 1
+                running -= 1
+                slot_freed()
+
+        def start(host: str, job: Tuple[str, str]) -> None:
+            nonlocal running
+            active[host] += 1
+            running += 1
+
+            task = asyncio.ensure_future(run_job(host, job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        def slot_freed() -> None:
+            nonlocal waiting
+
+            # Hand free slots to waiting jobs, oldest host first
+            for host in list(backlog):
+                queue = backlog[host]
+                while queue and running < self.max_concurrency and active[host] < self.max_per_host:
+                    waiting -= 1
+                    start(host, queue.popleft())
+                if not queue:
+                    del backlog[host]
+
+            changed.set()
+
+        async def wait_for_change() -> None:
+            changed.clear()
+            await changed.wait()
+
+        self._on_release = slot_freed
+
+        try:
+            for job in jobs:
+                host = urlparse(job[1]).netloc
+
+                while waiting >= max_waiting:
+                    await wait_for_change()
+
+                while host not in backlog and active[host] < self.max_per_host and running >= self.max_concurrency:
+                    await wait_for_change()
+
+                if host in backlog or active[host] >= self.max_per_host:
+                    backlog.setdefault(host, deque()).append(job)
+                    waiting += 1
+                    continue
+
+                start(host, job)
+
+            while tasks:
+                await asyncio.wait(set(tasks))
+
+        finally:
+            self._on_release = None
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,101 @@
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Storage formats for saved responses. Each wraps the JSON bytes of a response and is
+# recognised on load by its magic bytes, so readers never need to know the format.
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# format name -> (file suffix, pretty-print JSON before encoding)
+FORMATS: Dict[str, Tuple[str, bool]] = {
+    "json": (".json", True),
+    "json.gz": (".json.gz", False),
+    "json.zst": (".json.zst", False),
+}
+
+DEFAULT_FORMAT = "json.gz"
+
+
+def suffix_for(format: str) -> str:
+    return _lookup(format)[0]
+
+
+def is_pretty(format: str) -> bool:
+    return _lookup(format)[1]
+
+
+def encode(json_bytes: bytes, format: str) -> bytes:
+
+    """ Wrap serialized JSON in the given storage format """
+
+    _lookup(format)
+
+    if format == "json.gz":
+        return gzip.compress(json_bytes, compresslevel=6)
+
+    if format == "json.zst":
+        return _zstd().ZstdCompressor(level=3).compress(json_bytes)
+
+    return json_bytes
+
+
+def decode(data: bytes) -> bytes:
+
+    """ Recover the JSON bytes from a file in any supported format, detected from its magic bytes """
+
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+
+    if data.startswith(ZSTD_MAGIC):
+        return _zstd().ZstdDecompressor().decompress(data)
+
+    return data
+
+
+def is_saved_response(path: Path) -> bool:
+
+    """ True for files written by any supported format (ignores .tmp / .part leftovers) """
+
+    return any(path.name.endswith(suffix) for suffix, _ in FORMATS.values())
+
+
+def read_jsonl_mapping(path: Path, key: str, value: str) -> Dict[str, Any]:
+
+    """
+        Read an append-only JSONL file of {key: ..., value: ...} lines into a dict. Later lines win, and
+        lines that do not parse (e.g. cut short by a crash mid-append) are skipped with a warning.
+    """
+
+    mapping = {}
+
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    mapping[entry[key]] = entry[value]
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Skipping bad line in {path}")
+
+    return mapping
+
+
+def _lookup(format: str) -> Tuple[str, bool]:
+    if format not in FORMATS:
+        raise ValueError(f"Unknown storage format '{format}', expected one of {sorted(FORMATS)}")
+    return FORMATS[format]
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("The 'json.zst' storage format requires the 'zstandard' package (pip install zstandard)")
+    return zstandard
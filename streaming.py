@@ -0,0 +1,228 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Optional
+
+from models import Paper
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+COMPACT_THRESHOLD = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+# What matters when finding the end of a value: quotes and brackets outside strings, quotes and escapes inside
+STRUCTURAL = re.compile(r'["{}\[\]]')
+STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class SearchStream:
+
+    """
+        Incrementally decodes an EconBiz search body, yielding each hit in hits.hits as a Paper as soon as it is complete
+
+        Only the current hit and the undecoded tail of the byte stream are held in memory. 'total' and 'facets'
+        are captured on the way past; facets usually follow the hits, so read them after iteration finishes.
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self.total: Optional[int] = None
+        self.facets: Optional[dict] = None
+        self.extra: Dict[str, Any] = {}
+
+        self._chunks = chunks.__aiter__()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+
+    async def __aiter__(self) -> AsyncIterator[Paper]:
+        await self._expect("{")
+
+        async for key in self._members():
+            if key == "hits" and await self._peek() == "{":
+                self._pos += 1
+
+                async for hits_key in self._members():
+                    if hits_key == "hits" and await self._peek() == "[":
+                        self._pos += 1
+                        async for hit in self._elements():
+                            yield Paper.model_validate(hit)
+                    elif hits_key == "total":
+                        self.total = await self._value()
+                    else:
+                        await self._value()
+
+            elif key == "facets":
+                self.facets = await self._value()
+            else:
+                self.extra[key] = await self._value()
+
+
+    async def _members(self) -> AsyncIterator[str]:
+
+        """ Yield each key of the object whose '{' was just consumed; the caller consumes the value """
+
+        if await self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = await self._value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected object key at offset {self._pos}")
+            await self._expect(":")
+
+            yield key
+
+            separator = await self._next()
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in object, got {separator!r}")
+
+
+    async def _elements(self) -> AsyncIterator[Any]:
+
+        """ Yield each element of the array whose '[' was just consumed """
+
+        if await self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield await self._value()
+
+            separator = await self._next()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in array, got {separator!r}")
+
+
+    async def _value(self) -> Any:
+
+        """ Decode one complete JSON value, reading more of the stream until it is available """
+
+        if await self._peek() in '{["':
+            # Decoding is deferred until the closing bracket or quote has arrived, so a value spread over
+            # many chunks is decoded once rather than retried after every chunk
+            await self._read_to_end()
+            value, self._pos = self._json.raw_decode(self._buf, self._pos)
+            return value
+
+        # Numbers and literals are short; one ending at the buffer edge may be truncated, so read on
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+                # A value ending exactly at the buffer edge may be a truncated number or literal
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+
+            await self._fill()
+
+
+    async def _read_to_end(self) -> None:
+
+        """ Fill the buffer until the object, array or string starting at _pos is complete, scanning each byte once """
+
+        depth = 0
+        in_string = False
+
+        # Scan progress is kept relative to _pos, which _fill may move when it compacts the buffer
+        scanned = 0
+
+        while True:
+            buf = self._buf
+            i = self._pos + scanned
+
+            while i < len(buf):
+                if in_string:
+                    match = STRING_SPECIAL.search(buf, i)
+                    if match is None:
+                        i = len(buf)
+                        break
+                    i = match.start()
+                    if buf[i] == "\\":
+                        if i + 1 == len(buf):
+                            break  # the escaped character is still to come
+                        i += 2
+                        continue
+                    in_string = False
+                    i += 1
+                    if depth == 0:
+                        return
+                else:
+                    match = STRUCTURAL.search(buf, i)
+                    if match is None:
+                        i = len(buf)
+                        break
+                    char = buf[match.start()]
+                    i = match.end()
+                    if char == '"':
+                        in_string = True
+                    elif char in "{[":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            return
+
+            scanned = i - self._pos
+
+            if self._eof:
+                raise ValueError("Unexpected end of JSON stream")
+
+            await self._fill()
+
+
+    async def _peek(self) -> str:
+
+        """ Next non-whitespace character, without consuming it """
+
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+
+            if self._eof:
+                raise ValueError("Unexpected end of JSON stream")
+
+            await self._fill()
+
+
+    async def _next(self) -> str:
+        char = await self._peek()
+        self._pos += 1
+        return char
+
+
+    async def _expect(self, char: str) -> None:
+        found = await self._next()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, got {found!r}")
+
+
+    async def _fill(self) -> None:
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._eof = True
+            self._buf += self._text.decode(b"", final=True)
+            return
+
+        # Drop the consumed prefix so the buffer never grows past one value plus a chunk
+        if self._pos > COMPACT_THRESHOLD:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+
+        self._buf += self._text.decode(chunk)
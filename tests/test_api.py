@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from api import search
+import asyncio
+import gc
+from api import search, iter_search, parse_api_response
 import httpx
 
 
@@ -281,4 +283,113 @@ class TestAPIErrorHandling:
     
 
 
-            
\ No newline at end of file
+            
+class TestIterSearch:
+
+    """ Tests auto-pagination across search result pages """
+
+    @staticmethod
+    def make_transport(total, requests_seen):
+
+        def handler(request):
+            start = int(request.url.params["from"])
+            size = int(request.url.params["size"])
+            requests_seen.append((start, size))
+            hits = [{"id": f"paper{i}"} for i in range(start, min(start + size, total + 1))]
+            return httpx.Response(200, json={"hits": {"total": total, "hits": hits}})
+
+        return httpx.MockTransport(handler)
+
+
+    @pytest.mark.asyncio
+    async def test_yields_all_pages(self):
+
+        requests_seen = []
+
+        async with httpx.AsyncClient(transport=self.make_transport(25, requests_seen)) as client:
+            ids = [paper.id async for paper in iter_search("test", page_size=10, client=client)]
+
+        assert ids == [f"paper{i}" for i in range(1, 26)]
+        assert requests_seen == [(1, 10), (11, 10), (21, 5)]
+
+
+    @pytest.mark.asyncio
+    async def test_max_results(self):
+
+        requests_seen = []
+
+        async with httpx.AsyncClient(transport=self.make_transport(1000, requests_seen)) as client:
+            ids = [paper.id async for paper in iter_search("test", page_size=10, max_results=15, client=client)]
+
+        assert len(ids) == 15
+        assert requests_seen == [(1, 10), (11, 5)]
+
+
+    @pytest.mark.asyncio
+    async def test_next_page_prefetched(self):
+
+        """ The second page is requested before the consumer has finished the first """
+
+        requests_seen = []
+
+        async with httpx.AsyncClient(transport=self.make_transport(20, requests_seen)) as client:
+            async for paper in iter_search("test", page_size=10, client=client):
+                if paper.id == "paper1":
+                    await asyncio.sleep(0.01)
+                    assert (11, 10) in requests_seen
+                    break
+
+
+class TestParseApiResponse:
+
+    """ Tests the fast single-pass parser against the strict per-paper parser """
+
+    RAW = {
+        "hits": {
+            "total": 3,
+            "hits": [
+                {"id": "p1", "title": ["One"], "identifier_url": ["https://example.com/1.pdf"]},
+                {"id": "p2", "title": "Two as a plain string"},
+                {"id": "p3", "creator_name": ["Doe, Jane"]}
+            ]
+        },
+        "facets": {"language": ["en"]}
+    }
+
+    def test_fast_matches_strict(self):
+
+        fast = parse_api_response(self.RAW, "q", {"q": "q"})
+        strict = parse_api_response(self.RAW, "q", {"q": "q"}, strict=True)
+
+        assert fast.hits == strict.hits
+        assert fast.facets == strict.facets
+        assert fast.search_params == strict.search_params
+
+
+    def test_gc_is_only_paused_on_request(self, monkeypatch):
+
+        disabled = []
+        monkeypatch.setattr(gc, "disable", lambda: disabled.append(True))
+
+        default = parse_api_response(self.RAW, "q", {"q": "q"})
+        assert disabled == []
+
+        paused = parse_api_response(self.RAW, "q", {"q": "q"}, pause_gc=True)
+        assert disabled == [True]
+        assert paused.hits == default.hits
+        assert gc.isenabled()
+
+
+    def test_strict_names_failing_hit(self):
+
+        raw = {"hits": {"total": 2, "hits": [{"id": "ok"}, {"title": ["missing id"]}]}}
+
+        with pytest.raises(ValueError, match="position 1"):
+            parse_api_response(raw, "q", {}, strict=True)
+
+
+    @pytest.mark.parametrize("strict", [False, True])
+    def test_missing_hits_section(self, strict):
+
+        with pytest.raises(ValueError):
+            parse_api_response({"wrong_field": "unexpected structure"}, "q", {}, strict=strict)
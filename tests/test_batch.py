@@ -0,0 +1,268 @@
+import pytest
+import json
+
+import api
+import batch
+from benchmarks.mock_server import MockEconBizServer
+from harvest import save_sync_state
+from layout import FLAT, SHARDED, layout_for
+from models import SyncState
+
+
+@pytest.fixture
+def queries_file(temp_dir):
+
+    path = temp_dir / "queries.txt"
+    path.write_text("# nightly harvest\nlabour economics\n\nclimate policy\nlabour economics\n")
+    return path
+
+
+class TestReadQueries:
+
+    def test_skips_comments_blanks_and_repeats(self, queries_file):
+
+        assert batch.read_queries(queries_file) == ["labour economics", "climate policy"]
+
+
+class TestReadPdfLinks:
+
+    def test_reads_ids_and_links_lazily(self, temp_dir):
+
+        corpus = temp_dir / "corpus.jsonl"
+        corpus.write_text(json.dumps({"id": "a", "identifier_url": ["https://x/a.pdf"], "abstract": ["long"]}) + "\n"
+                          + json.dumps({"id": "b"}) + "\n\n")
+
+        links = batch.read_pdf_links(corpus)
+
+        assert next(links) == ("a", ["https://x/a.pdf"])
+        assert list(links) == [("b", [])]
+
+
+class TestBatchRun:
+
+    def test_harvests_queries_and_pdfs(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+
+        with MockEconBizServer(total_hits=12, pdf_size=2048) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+            exit_code = batch.main([str(queries_file), "--output-dir", str(output_dir), "--page-size", "5",
+                                    "--metrics", str(output_dir / "metrics.prom")])
+
+        report = json.loads((output_dir / batch.REPORT_NAME).read_text())
+
+        assert exit_code == batch.EXIT_OK
+        assert report["exit_code"] == batch.EXIT_OK
+        assert report["totals"] == {"queries": 2, "failed_queries": 0, "papers": 24, "pdfs_successful": 24, "pdfs_failed": 0, "texts_extracted": 0}
+        assert len((output_dir / "corpus" / "labour_economics.jsonl").read_text().splitlines()) == 12
+        assert len(list((output_dir / "pdfs" / "climate_policy").glob("*.pdf"))) == 12
+        assert "econstor_requests_total" in (output_dir / "metrics.prom").read_text()
+
+
+    def test_incremental_run_downloads_only_new_pdfs(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+        args = [str(queries_file), "--output-dir", str(output_dir), "--page-size", "5", "--incremental"]
+
+        with MockEconBizServer(total_hits=6, pdf_size=1024) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+            first = batch.main(args)
+            second = batch.main(args)
+
+        report = json.loads((output_dir / batch.REPORT_NAME).read_text())
+
+        assert first == second == batch.EXIT_OK
+        assert report["totals"]["papers"] == 0
+        assert report["totals"]["pdfs_successful"] == 0
+        assert len((output_dir / "corpus" / "labour_economics.jsonl").read_text().splitlines()) == 6
+        assert (output_dir / "sync_state" / "labour_economics.json").exists()
+
+
+    def test_incremental_run_after_crash_does_not_duplicate_corpus(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+        args = [str(queries_file), "--output-dir", str(output_dir), "--incremental", "--no-pdfs"]
+        save_sync_state = batch.save_sync_state
+
+        def crash(state, state_dir):
+            raise RuntimeError("boom")
+
+        with MockEconBizServer(total_hits=6, pdf_size=1024) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+
+            # The corpus is appended to, then the run dies before its state is saved
+            monkeypatch.setattr(batch, "save_sync_state", crash)
+            first = batch.main(args)
+
+            monkeypatch.setattr(batch, "save_sync_state", save_sync_state)
+            second = batch.main(args)
+
+        assert first == batch.EXIT_FAILED
+        assert second == batch.EXIT_OK
+        assert len((output_dir / "corpus" / "labour_economics.jsonl").read_text().splitlines()) == 6
+
+
+    def test_incremental_run_keeps_only_transient_failures_pending(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+        reasons = {"10419/1": "not_pdf", "10419/2": "timeout", "10419/3": "http_404", "10419/4": "http_503"}
+
+        async def failing_batch(pdf_urls, **kwargs):
+            failed = [paper_id for paper_id, _ in pdf_urls]
+            return {"successful": [], "failed": failed, "failure_reasons": {paper_id: reasons[paper_id] for paper_id in failed}, "latency": {}}
+
+        monkeypatch.setattr(batch, "download_pdfs_batch", failing_batch)
+
+        with MockEconBizServer(total_hits=4, pdf_size=1024) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+            batch.main([str(queries_file), "--output-dir", str(output_dir), "--incremental"])
+
+        state = json.loads((output_dir / "sync_state" / "labour_economics.json").read_text())
+        assert sorted(state["pending_pdfs"]) == ["10419/2", "10419/4"]
+
+
+    def test_incremental_retry_keeps_alternate_urls(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+        state_dir = output_dir / "sync_state"
+        calls = []
+
+        async def recording_batch(pdf_urls, **kwargs):
+            calls.append((list(pdf_urls), kwargs["alternates"]))
+            return {"successful": [], "failed": [], "failure_reasons": {}, "latency": {}}
+
+        monkeypatch.setattr(batch, "download_pdfs_batch", recording_batch)
+
+        with MockEconBizServer(total_hits=1, pdf_size=1024) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+
+            # A paper that failed transiently last time, with a mirror to hedge with
+            save_sync_state(SyncState(query="labour economics", seen_ids=["10419/1"], pending_pdfs={"10419/0": ["https://a/0.pdf", "https://b/0.pdf"]}), state_dir)
+            batch.main([str(queries_file), "--output-dir", str(output_dir), "--incremental", "--hedge-after", "0.5"])
+
+        pdf_urls, alternates = calls[0]
+        assert pdf_urls == [("10419/0", "https://a/0.pdf")]
+        assert alternates == {"10419/0": ["https://b/0.pdf"]}
+
+
+    def test_resolved_and_hedged_downloads(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+        cache = temp_dir / "resolved.jsonl"
+
+        with MockEconBizServer(total_hits=4, pdf_size=1024) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+            exit_code = batch.main([str(queries_file), "--output-dir", str(output_dir), "--resolve-pdf-links", "--resolve-cache", str(cache),
+                                    "--hedge-after", "0.5"])
+
+        report = json.loads((output_dir / batch.REPORT_NAME).read_text())
+
+        assert exit_code == batch.EXIT_OK
+        assert report["totals"]["pdfs_successful"] == 8
+        # Both queries match the same four papers, so their links are resolved once
+        assert len(cache.read_text().splitlines()) == 4
+        assert report["queries"][0]["pdfs"]["latency"]["count"] == 4
+
+
+    def test_papers_without_a_pdf_link_are_reported(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+        cache = temp_dir / "resolved.jsonl"
+
+        with MockEconBizServer(total_hits=3, pdf_size=1024) as server:
+            # An earlier run found nothing behind paper 2's link
+            cache.write_text(json.dumps({"url": f"{server.base_url}/pdf/2", "pdf_url": None}) + "\n")
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+            exit_code = batch.main([str(queries_file), "--output-dir", str(output_dir), "--resolve-pdf-links", "--resolve-cache", str(cache)])
+
+        report = json.loads((output_dir / batch.REPORT_NAME).read_text())
+        pdfs = report["queries"][0]["pdfs"]
+
+        assert exit_code == batch.EXIT_PARTIAL
+        assert report["queries"][0]["status"] == "partial"
+        assert pdfs["requested"] == 3
+        assert pdfs["successful"] == 2
+        assert pdfs["failed"] == ["10419/2"]
+        assert pdfs["failure_reasons"] == {"10419/2": "no_pdf_link"}
+
+
+    def test_shard_depth_keeps_existing_flat_directories(self, queries_file, temp_dir, monkeypatch):
+
+        output_dir = temp_dir / "run"
+
+        with MockEconBizServer(total_hits=3, pdf_size=1024) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+            first = batch.main([str(queries_file), "--output-dir", str(output_dir)])
+            second = batch.main([str(queries_file), "--output-dir", str(output_dir), "--shard-depth", "1"])
+            fresh = batch.main([str(queries_file), "--output-dir", str(temp_dir / "fresh"), "--shard-depth", "1"])
+
+        assert first == second == fresh == batch.EXIT_OK
+        assert len(list((output_dir / "pdfs" / "climate_policy").glob("*.pdf"))) == 3
+        assert layout_for(output_dir / "pdfs" / "climate_policy") == FLAT
+        assert layout_for(temp_dir / "fresh" / "pdfs" / "climate_policy") == SHARDED
+
+
+    def test_every_query_failing(self, queries_file, temp_dir, monkeypatch):
+
+        with MockEconBizServer() as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/gone")
+            exit_code = batch.main([str(queries_file), "--output-dir", str(temp_dir / "run"), "--no-pdfs"])
+
+        report = json.loads((temp_dir / "run" / batch.REPORT_NAME).read_text())
+
+        assert exit_code == batch.EXIT_FAILED
+        assert [entry["status"] for entry in report["queries"]] == ["failed", "failed"]
+
+
+    def test_crashing_query_does_not_stop_the_run(self, queries_file, temp_dir, monkeypatch):
+
+        run_query = batch.run_query
+
+        async def flaky_run_query(query, *args, **kwargs):
+            if query == "labour economics":
+                raise RuntimeError("boom")
+            return await run_query(query, *args, **kwargs)
+
+        monkeypatch.setattr(batch, "run_query", flaky_run_query)
+
+        with MockEconBizServer(total_hits=3, pdf_size=1024) as server:
+            monkeypatch.setattr(api, "BASE_URL", f"{server.base_url}/v1/search")
+            exit_code = batch.main([str(queries_file), "--output-dir", str(temp_dir / "run")])
+
+        report = json.loads((temp_dir / "run" / batch.REPORT_NAME).read_text())
+
+        assert exit_code == batch.EXIT_PARTIAL
+        assert report["queries"][0] == {"query": "labour economics", "papers": None, "status": "failed", "error": "RuntimeError: boom"}
+        assert report["queries"][1]["status"] == "ok"
+
+
+    def test_crashed_run_has_its_own_exit_code(self, queries_file, temp_dir, monkeypatch):
+
+        async def broken_run_batch(queries, args):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(batch, "run_batch", broken_run_batch)
+
+        assert batch.main([str(queries_file), "--output-dir", str(temp_dir / "run")]) == batch.EXIT_CRASHED
+
+
+    def test_usage_errors(self, temp_dir):
+
+        empty = temp_dir / "empty.txt"
+        empty.write_text("# nothing yet\n")
+
+        assert batch.main([str(empty)]) == batch.EXIT_USAGE
+        assert batch.main([str(temp_dir / "missing.txt")]) == batch.EXIT_USAGE
+        assert batch.main(["--bogus"]) == batch.EXIT_USAGE
+        assert batch.main([str(empty), "--log-level", "verbose"]) == batch.EXIT_USAGE
+
+
+    def test_missing_pypdf_is_a_usage_error(self, queries_file, temp_dir, monkeypatch):
+
+        def no_pypdf():
+            raise ImportError("PDF text extraction requires the 'pypdf' package (pip install pypdf)")
+
+        monkeypatch.setattr(batch, "require_pypdf", no_pypdf)
+
+        assert batch.main([str(queries_file), "--output-dir", str(temp_dir / "run"), "--extract-text"]) == batch.EXIT_USAGE
+        assert not (temp_dir / "run").exists()
@@ -0,0 +1,35 @@
+import json
+import logging
+from benchmarks.run import main, find_regressions
+
+
+class TestBenchmarkSuite:
+
+    """ Smoke tests for the offline benchmark suite and its regression check """
+
+    def test_regression_direction(self):
+
+        baseline = {"searches_per_sec": 100.0, "parse_us_per_hit": 5.0}
+
+        assert find_regressions({"searches_per_sec": 90.0, "parse_us_per_hit": 5.5}, baseline, 0.2) == {}
+
+        regressions = find_regressions({"searches_per_sec": 50.0, "parse_us_per_hit": 4.0}, baseline, 0.2)
+        assert list(regressions) == ["searches_per_sec"]
+
+
+    def test_suite_runs_against_mock_server(self, temp_dir):
+
+        output = temp_dir / "bench.json"
+
+        exit_code = main(["--searches", "2", "--page-size", "5", "--hits", "20", "--pdfs", "3", "--pdf-size", "2048",
+                          "--concurrency", "2", "--error-rate", "0.1", "--json", str(output)])
+
+        results = json.loads(output.read_text())
+        assert exit_code == 0
+        assert results["searches_per_sec"] > 0
+        assert results["download_mb_per_sec"] > 0
+        assert results["parse_peak_mb"] > 0
+
+        # Quieting the benchmarked modules must not outlive the run
+        assert logging.root.manager.disable == logging.NOTSET
+        assert logging.getLogger("api").level == logging.NOTSET
@@ -0,0 +1,102 @@
+import pytest
+import httpx
+from unittest.mock import patch
+from breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from ratelimit import NO_RETRY
+from utils import download_pdfs_batch
+
+
+class TestCircuitBreaker:
+
+    """ Tests per-host circuit state transitions """
+
+    def test_trips_after_threshold(self):
+
+        breaker = CircuitBreaker(failure_threshold=3)
+
+        for _ in range(2):
+            breaker.record_failure("dead.com")
+        assert breaker.state("dead.com") == CLOSED
+
+        breaker.record_failure("dead.com")
+        assert breaker.state("dead.com") == OPEN
+        assert not breaker.allow("dead.com")
+        assert breaker.allow("alive.com")
+
+
+    def test_half_open_allows_single_probe(self):
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure("dead.com")
+
+        with patch("breaker.time.monotonic", return_value=breaker._hosts["dead.com"].opened_at + 31):
+            assert breaker.allow("dead.com")
+            assert breaker.state("dead.com") == HALF_OPEN
+            assert not breaker.allow("dead.com")
+
+            breaker.record_failure("dead.com")
+            assert breaker.state("dead.com") == OPEN
+
+
+    def test_successful_probe_closes(self):
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure("flaky.com")
+
+        assert breaker.allow("flaky.com")
+        breaker.record_success("flaky.com")
+
+        assert breaker.state("flaky.com") == CLOSED
+
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_trip(self):
+
+        """ A 404 means the host answered, so it must not count towards opening the circuit """
+
+        breaker = CircuitBreaker(failure_threshold=1)
+        response = httpx.Response(404, request=httpx.Request("GET", "https://alive.com/x.pdf"))
+
+        async def not_found():
+            response.raise_for_status()
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await breaker.call("https://alive.com/x.pdf", not_found)
+
+        assert breaker.state("alive.com") == CLOSED
+
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self):
+
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_failure("dead.com")
+
+        async def never_called():
+            raise AssertionError("request should not be sent")
+
+        with pytest.raises(CircuitOpenError):
+            await breaker.call("https://dead.com/x.pdf", never_called)
+
+
+    @pytest.mark.asyncio
+    async def test_batch_stops_contacting_dead_host(self, temp_dir, mock_pdf_content):
+
+        requests_to_dead_host = []
+
+        def handler(request):
+            if request.url.host == "dead.com":
+                requests_to_dead_host.append(request.url.path)
+                raise httpx.ConnectError("connection refused")
+            return httpx.Response(200, content=mock_pdf_content)
+
+        pdf_urls = [(f"dead{i}", f"https://dead.com/{i}.pdf") for i in range(20)]
+        pdf_urls += [(f"ok{i}", f"https://alive.com/{i}.pdf") for i in range(5)]
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir, client=client, max_per_host=1,
+                                                retry=NO_RETRY, breaker=CircuitBreaker(failure_threshold=3))
+
+        assert len(requests_to_dead_host) == 3
+        assert len(results['failed']) == 20
+        assert len(results['successful']) == 5
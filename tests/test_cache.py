@@ -0,0 +1,125 @@
+import pytest
+import os
+import httpx
+from datetime import datetime, timedelta
+from api import search, build_search_params
+from cache import ResponseCache
+from models import Paper
+import storage
+
+
+class TestResponseCache:
+
+    """ Tests the on-disk search response cache """
+
+    def test_key_normalization(self):
+
+        a = build_search_params("machine   learning ", size=10)
+        b = dict(reversed(list(build_search_params("machine learning", size=10).items())))
+        c = build_search_params("machine learning", size=20)
+
+        assert ResponseCache.make_key(a) == ResponseCache.make_key(b)
+        assert ResponseCache.make_key(a) != ResponseCache.make_key(c)
+
+
+    @pytest.mark.asyncio
+    async def test_hit_and_miss_counters(self, temp_dir, econbiz_response):
+
+        cache = ResponseCache(directory=temp_dir)
+        params = build_search_params("test")
+
+        assert await cache.get(params) is None
+        await cache.put(params, econbiz_response(papers=[Paper(id="p1")]))
+        cached = await cache.get(params)
+
+        assert cached.get_papers()[0].id == "p1"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_miss(self, temp_dir, econbiz_response):
+
+        cache = ResponseCache(directory=temp_dir, ttl=60)
+        params = build_search_params("test")
+
+        stale = econbiz_response()
+        stale.timestamp = datetime.now() - timedelta(seconds=120)
+        await cache.put(params, stale)
+
+        assert await cache.get(params) is None
+        assert cache.stats()["entries"] == 0
+
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, temp_dir, econbiz_response):
+
+        cache = ResponseCache(directory=temp_dir)
+        first, second, third = (build_search_params(q) for q in ("a", "b", "c"))
+
+        await cache.put(first, econbiz_response(query="a"))
+        await cache.put(second, econbiz_response(query="b"))
+        # Room for two entries; compressed sizes vary by a few bytes, so leave some slack short of a third
+        cache.max_bytes = cache.stats()["bytes"] * 5 // 4
+
+        # Touch 'a' so 'b' becomes least recently used
+        await cache.get(first)
+        await cache.put(third, econbiz_response(query="c"))
+
+        assert await cache.get(second) is None
+        assert (await cache.get(first)).query == "a"
+        assert cache.stats()["evictions"] >= 1
+
+
+    @pytest.mark.asyncio
+    async def test_lru_order_survives_restart(self, temp_dir, econbiz_response):
+
+        # Re-put the same response below, so its compressed size does not change
+        new = econbiz_response(query="new")
+
+        cache = ResponseCache(directory=temp_dir)
+        await cache.put(build_search_params("old"), econbiz_response(query="old"))
+        await cache.put(build_search_params("new"), new)
+
+        old_path = temp_dir / f"{ResponseCache.make_key(build_search_params('old'))}.json.gz"
+        os.utime(old_path, (0, 0))
+
+        reopened = ResponseCache(directory=temp_dir)
+        reopened.max_bytes = reopened.stats()["bytes"] - 1
+        await reopened.put(build_search_params("new"), new)
+
+        assert not old_path.exists()
+
+
+    @pytest.mark.asyncio
+    async def test_entries_are_compressed(self, temp_dir, econbiz_response):
+
+        # Left by a version that cached pretty-printed JSON
+        (temp_dir / f"{'0' * 64}.json").write_text("{}")
+
+        cache = ResponseCache(directory=temp_dir)
+        await cache.put(build_search_params("q"), econbiz_response(query="q"))
+
+        files = list(temp_dir.iterdir())
+        assert [path.name[64:] for path in files] == [".json.gz"]
+        assert files[0].read_bytes().startswith(storage.GZIP_MAGIC)
+        assert (await cache.get(build_search_params("q"))).query == "q"
+
+
+    @pytest.mark.asyncio
+    async def test_search_served_from_cache(self, temp_dir):
+
+        calls = []
+
+        def handler(request):
+            calls.append(request.url)
+            return httpx.Response(200, json={"hits": {"total": 1, "hits": [{"id": "p1"}]}})
+
+        cache = ResponseCache(directory=temp_dir)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await search("test", save_response=False, client=client, cache=cache)
+            second = await search("test", save_response=False, client=client, cache=cache)
+
+        assert len(calls) == 1
+        assert second.get_papers()[0].id == first.get_papers()[0].id
@@ -0,0 +1,58 @@
+import pytest
+import httpx
+from client import create_client, borrow_client
+from api import search
+from utils import download_pdf
+
+
+class TestSharedClient:
+
+    """ Tests the pooled client shared across search and download paths """
+
+    @pytest.mark.asyncio
+    async def test_create_client_applies_pool_limits(self):
+
+        client = create_client(max_connections=7, max_keepalive_connections=3, keepalive_expiry=5.0)
+
+        async with client:
+            pool = client._transport._pool
+            assert pool._max_connections == 7
+            assert pool._max_keepalive_connections == 3
+            assert pool._keepalive_expiry == 5.0
+
+
+    @pytest.mark.asyncio
+    async def test_borrow_client_leaves_shared_client_open(self):
+
+        """ A borrowed client must not be closed when the borrowing call returns """
+
+        shared = create_client()
+
+        async with borrow_client(shared) as client:
+            assert client is shared
+
+        assert not shared.is_closed
+        await shared.aclose()
+
+
+    @pytest.mark.asyncio
+    async def test_search_and_download_reuse_client(self, temp_dir, mock_pdf_content):
+
+        """ Both paths send their requests through the same client instance """
+
+        seen = []
+
+        def handler(request):
+            seen.append(request.url.path)
+            if request.url.path == "/v1/search":
+                return httpx.Response(200, json={"hits": {"total": 1, "hits": [{"id": "p1", "identifier_url": ["https://example.com/p1.pdf"]}]}})
+            return httpx.Response(200, content=mock_pdf_content)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            response = await search(query="test", save_response=False, client=client)
+            paper_id, url = response.get_pdf_urls()[0]
+            result = await download_pdf(url, str(temp_dir / f"{paper_id}.pdf"), client=client)
+
+        assert result is True
+        assert seen == ["/v1/search", "/p1.pdf"]
+        assert (temp_dir / "p1.pdf").read_bytes() == mock_pdf_content
@@ -1,9 +1,14 @@
 import pytest
+import asyncio
+import time
 from pathlib import Path
 from unittest.mock import patch, AsyncMock, MagicMock
-from utils import download_pdf, download_pdfs_batch
+from utils import download_pdf, download_pdf_hedged, download_pdfs_batch, pdf_filename
 import httpx
 
+from benchmarks.mock_server import MockEconBizServer
+from metrics import Metrics
+
 
 class TestPDFDownload:
      
@@ -14,10 +19,15 @@ class TestPDFDownload:
         
         filename = temp_dir / "test_paper.pdf"
 
-        # Mock HTTP response
+        # Mock HTTP response, streamed in two chunks
+        async def aiter_bytes(chunk_size=None):
+            yield mock_pdf_content[:100]
+            yield mock_pdf_content[100:]
+
         mock_response = MagicMock()
-        mock_response.content = mock_pdf_content
+        mock_response.aiter_bytes = aiter_bytes
         mock_response.raise_for_status = MagicMock()
+        mock_response.headers = {"Content-Type": "application/pdf"}
 
         mock_stream = AsyncMock()
         mock_stream.__aenter__.return_value = mock_response
@@ -25,7 +35,7 @@ class TestPDFDownload:
 
         with patch("httpx.AsyncClient") as mock_client_class:
             mock_client = AsyncMock()
-            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client.stream = MagicMock(return_value=mock_stream)
             mock_client.__aenter__.return_value = mock_client
             mock_client.__aexit__.return_value = None
             mock_client_class.return_value = mock_client    
@@ -48,7 +58,7 @@ class TestPDFDownload:
 
         with patch("httpx.AsyncClient") as mock_client_class:
             mock_client = AsyncMock()
-            mock_client.get.side_effect = httpx.TimeoutException("Timeout")
+            mock_client.stream = MagicMock(side_effect=httpx.TimeoutException("Timeout"))
             mock_client.__aenter__.return_value = mock_client
             mock_client.__aexit__.return_value = None
             mock_client_class.return_value = mock_client
@@ -70,7 +80,7 @@ class TestPDFDownload:
             ]
         
         # Mock: paper1 and paper3 succeed, paper 2 fails 
-        async def mock_download(url, filename):
+        async def mock_download(url, filename, **kwargs):
             if "paper2" in url:
                 return False
             return True
@@ -92,7 +102,7 @@ class TestPDFDownload:
         output_dir = temp_dir / "nonexistent" / "downloads"
         pdf_urls = [("test", "https://example.com/test.pdf")]
 
-        async def mock_download(url, filename):
+        async def mock_download(url, filename, **kwargs):
             return True
         
         with patch('utils.download_pdf', side_effect=mock_download):
@@ -101,3 +111,397 @@ class TestPDFDownload:
         assert output_dir.exists()
 
 
+
+class TestPdfFilenames:
+
+    """ Handle-style ids are saved flat, and PDFs saved under their older nested names are still found """
+
+    def test_handle_ids_are_flattened(self):
+
+        assert pdf_filename("10419/12345") == "10419_12345.pdf"
+        assert pdf_filename("ECONSTOR-1") == "ECONSTOR-1.pdf"
+
+
+    @pytest.mark.asyncio
+    async def test_pdf_under_old_name_is_renamed_not_fetched(self, temp_dir, mock_pdf_content):
+
+        (temp_dir / "10419").mkdir()
+        (temp_dir / "10419" / "12345.pdf").write_bytes(mock_pdf_content)
+        requests = []
+
+        def handler(request):
+            requests.append(request.url)
+            return httpx.Response(200, content=mock_pdf_content, headers={"Content-Type": "application/pdf"})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            results = await download_pdfs_batch([("10419/12345", "https://example.com/12345.pdf"), ("10419/6", "https://example.com/6.pdf")], output_dir=temp_dir, client=client)
+
+        assert sorted(results['successful']) == ["10419/12345", "10419/6"]
+        assert [url.path for url in requests] == ["/6.pdf"]
+        assert (temp_dir / "10419_12345.pdf").read_bytes() == mock_pdf_content
+        assert not (temp_dir / "10419").exists()
+
+
+class TestStreamingDownload:
+
+    """ Validates PDFs are written to disk as chunks arrive rather than buffered in memory """
+
+    @pytest.mark.asyncio
+    async def test_chunks_written_before_body_finishes(self, temp_dir):
+
+        filename = temp_dir / "streamed.pdf"
+        part = temp_dir / "streamed.pdf.part"
+        chunk = b"%PDF-1.4\n".ljust(64 * 1024, b"x")
+        sizes_seen = []
+
+        class ChunkStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                for _ in range(4):
+                    assert not filename.exists()
+                    sizes_seen.append(part.stat().st_size if part.exists() else 0)
+                    yield chunk
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=ChunkStream()))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await download_pdf("https://example.com/big.pdf", str(filename), client=client, chunk_size=len(chunk))
+
+        assert result is True
+        assert filename.stat().st_size == 4 * len(chunk)
+        assert sizes_seen[-1] >= 2 * len(chunk)
+
+
+    @pytest.mark.asyncio
+    async def test_interrupted_stream_keeps_only_part_file(self, temp_dir):
+
+        filename = temp_dir / "broken.pdf"
+
+        class BrokenStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield b"%PDF-1.4 partial"
+                raise httpx.ReadError("connection reset")
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=BrokenStream()))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await download_pdf("https://example.com/broken.pdf", str(filename), client=client, chunk_size=8)
+
+        assert result is False
+        assert not filename.exists()
+        assert (temp_dir / "broken.pdf.part").read_bytes() == b"%PDF-1.4 partial"
+
+
+class TestResumableDownload:
+
+    """ Validates .part files are resumed with Range requests """
+
+    CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+    def make_transport(self, honour_range=True, seen_ranges=None):
+
+        def handler(request):
+            range_header = request.headers.get("Range")
+            if seen_ranges is not None:
+                seen_ranges.append(range_header)
+
+            if range_header and honour_range:
+                start = int(range_header.split("=")[1].rstrip("-"))
+                if start >= len(self.CONTENT):
+                    return httpx.Response(416)
+                headers = {"Content-Range": f"bytes {start}-{len(self.CONTENT) - 1}/{len(self.CONTENT)}"}
+                return httpx.Response(206, content=self.CONTENT[start:], headers=headers)
+
+            return httpx.Response(200, content=self.CONTENT)
+
+        return httpx.MockTransport(handler)
+
+
+    @pytest.mark.asyncio
+    async def test_resume_from_part_file(self, temp_dir):
+
+        filename = temp_dir / "paper.pdf"
+        (temp_dir / "paper.pdf.part").write_bytes(self.CONTENT[:100])
+        (temp_dir / "paper.pdf.part.validator").write_text('"v1"')
+        seen_ranges = []
+
+        async with httpx.AsyncClient(transport=self.make_transport(seen_ranges=seen_ranges)) as client:
+            result = await download_pdf("https://example.com/paper.pdf", str(filename), client=client)
+
+        assert result is True
+        assert seen_ranges == ["bytes=100-"]
+        assert filename.read_bytes() == self.CONTENT
+        assert not (temp_dir / "paper.pdf.part").exists()
+
+
+    @pytest.mark.asyncio
+    async def test_range_ignored_rewrites_from_zero(self, temp_dir):
+
+        filename = temp_dir / "paper.pdf"
+        (temp_dir / "paper.pdf.part").write_bytes(b"garbage")
+        (temp_dir / "paper.pdf.part.validator").write_text('"v1"')
+
+        async with httpx.AsyncClient(transport=self.make_transport(honour_range=False)) as client:
+            result = await download_pdf("https://example.com/paper.pdf", str(filename), client=client)
+
+        assert result is True
+        assert filename.read_bytes() == self.CONTENT
+
+
+    @pytest.mark.asyncio
+    async def test_unsatisfiable_range_restarts(self, temp_dir):
+
+        filename = temp_dir / "paper.pdf"
+        (temp_dir / "paper.pdf.part").write_bytes(self.CONTENT + b"extra")
+        (temp_dir / "paper.pdf.part.validator").write_text('"v1"')
+        seen_ranges = []
+
+        async with httpx.AsyncClient(transport=self.make_transport(seen_ranges=seen_ranges)) as client:
+            result = await download_pdf("https://example.com/paper.pdf", str(filename), client=client)
+
+        assert result is True
+        assert seen_ranges == [f"bytes={len(self.CONTENT) + 5}-", None]
+        assert filename.read_bytes() == self.CONTENT
+
+
+    @pytest.mark.asyncio
+    async def test_part_without_validator_is_not_resumed(self, temp_dir):
+
+        # Left by an older version, or by a server that sends no ETag / Last-Modified
+        filename = temp_dir / "paper.pdf"
+        (temp_dir / "paper.pdf.part").write_bytes(b"%PDF-1.3 stale bytes of an older version")
+        seen_ranges = []
+
+        async with httpx.AsyncClient(transport=self.make_transport(seen_ranges=seen_ranges)) as client:
+            result = await download_pdf("https://example.com/paper.pdf", str(filename), client=client)
+
+        assert result is True
+        assert seen_ranges == [None]
+        assert filename.read_bytes() == self.CONTENT
+
+
+    @pytest.mark.asyncio
+    async def test_changed_file_is_not_appended_to_old_part(self, temp_dir):
+
+        filename = temp_dir / "paper.pdf"
+        versions = {"current": b'"v1"'}
+        contents = {b'"v1"': self.CONTENT, b'"v2"': b"%PDF-1.7 revised " + bytes(range(256)) * 4}
+        seen = []
+
+        def handler(request):
+            etag = versions["current"]
+            content = contents[etag]
+            seen.append((request.headers.get("Range"), request.headers.get("If-Range")))
+
+            range_header = request.headers.get("Range")
+            if range_header and request.headers.get("If-Range", "").encode() == etag:
+                start = int(range_header.split("=")[1].rstrip("-"))
+                headers = {"ETag": etag.decode(), "Content-Range": f"bytes {start}-{len(content) - 1}/{len(content)}"}
+                return httpx.Response(206, content=content[start:], headers=headers)
+
+            return httpx.Response(200, content=content, headers={"ETag": etag.decode()})
+
+        class BrokenStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                # First run: the v1 body breaks off after 100 bytes
+                yield TestResumableDownload.CONTENT[:100]
+                raise httpx.ReadError("connection reset")
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=BrokenStream(), headers={"ETag": '"v1"'}))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            assert await download_pdf("https://example.com/paper.pdf", str(filename), client=client, chunk_size=50) is False
+
+        assert (temp_dir / "paper.pdf.part").read_bytes() == self.CONTENT[:100]
+
+        # The PDF is replaced on the server before the next run
+        versions["current"] = b'"v2"'
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            result = await download_pdf("https://example.com/paper.pdf", str(filename), client=client)
+
+        assert result is True
+        assert seen == [("bytes=100-", '"v1"')]
+        assert filename.read_bytes() == contents[b'"v2"']
+        assert not (temp_dir / "paper.pdf.part.validator").exists()
+
+
+class TestContentValidation:
+
+    """ Validates non-PDF responses are abandoned early and reported as such """
+
+    @pytest.mark.asyncio
+    async def test_html_content_type_aborts_before_body(self, temp_dir):
+
+        filename = temp_dir / "landing.pdf"
+        body_read = []
+        reasons = []
+
+        class HtmlStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                body_read.append(True)
+                yield b"<html>landing page</html>"
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, headers={"Content-Type": "text/html; charset=utf-8"}, stream=HtmlStream()))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await download_pdf("https://example.com/handle/1", str(filename), client=client, on_failure=reasons.append)
+
+        assert result is False
+        assert reasons == ["not_pdf"]
+        assert body_read == []
+        assert not filename.exists()
+        assert not (temp_dir / "landing.pdf.part").exists()
+
+
+    @pytest.mark.asyncio
+    async def test_missing_magic_bytes_rejected(self, temp_dir):
+
+        filename = temp_dir / "fake.pdf"
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, headers={"Content-Type": "application/octet-stream"}, content=b"<!DOCTYPE html><html></html>")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            result = await download_pdf("https://example.com/fake.pdf", str(filename), client=client)
+
+        assert result is False
+        assert len(requests) == 1
+        assert not (temp_dir / "fake.pdf.part").exists()
+
+
+    @pytest.mark.asyncio
+    async def test_octet_stream_pdf_accepted(self, temp_dir, mock_pdf_content):
+
+        filename = temp_dir / "paper.pdf"
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, headers={"Content-Type": "application/octet-stream"}, content=mock_pdf_content))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await download_pdf("https://example.com/paper.pdf", str(filename), client=client)
+
+        assert result is True
+        assert filename.read_bytes() == mock_pdf_content
+
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_failure_reasons(self, temp_dir):
+
+        with MockEconBizServer(pdf_size=2048) as server:
+            pdf_urls = [
+                ("good", f"{server.base_url}/pdf/1"),
+                ("landing", f"{server.base_url}/handle/2"),
+                ("missing", f"{server.base_url}/gone/3")
+            ]
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir)
+
+        assert results['successful'] == ["good"]
+        assert sorted(results['failed']) == ["landing", "missing"]
+        assert results['failure_reasons'] == {"landing": "not_pdf", "missing": "http_404"}
+
+
+class TestHedgedDownload:
+
+    """ Validates alternate URLs are raced only when the primary is slow to start, and the loser is cleaned up """
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self, temp_dir):
+
+        filename = temp_dir / "paper.pdf"
+        metrics = Metrics()
+
+        with MockEconBizServer(latency=2.0) as slow, MockEconBizServer() as fast:
+            start = time.perf_counter()
+            result = await download_pdf_hedged([f"{slow.base_url}/pdf/1", f"{fast.base_url}/pdf/1"], str(filename), hedge_after=0.1, metrics=metrics)
+            elapsed = time.perf_counter() - start
+
+            assert result is True
+            assert elapsed < 1.5
+            assert filename.read_bytes() == fast.pdf_body
+
+        assert metrics.counter("hedges_total", outcome="won") == 1
+        assert sorted(p.name for p in temp_dir.iterdir()) == ["paper.pdf"]
+
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, temp_dir):
+
+        with MockEconBizServer() as primary, MockEconBizServer() as mirror:
+            result = await download_pdf_hedged([f"{primary.base_url}/pdf/1", f"{mirror.base_url}/pdf/1"], str(temp_dir / "paper.pdf"), hedge_after=1.0)
+
+            assert result is True
+            assert mirror.connections == 0
+
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_over_at_once(self, temp_dir):
+
+        reasons = []
+
+        with MockEconBizServer() as server:
+            start = time.perf_counter()
+            result = await download_pdf_hedged([f"{server.base_url}/handle/1", f"{server.base_url}/pdf/1"], str(temp_dir / "paper.pdf"), hedge_after=5.0, on_failure=reasons.append)
+
+            assert result is True
+            assert time.perf_counter() - start < 2.0
+
+            result = await download_pdf_hedged([f"{server.base_url}/handle/1", f"{server.base_url}/gone/1"], str(temp_dir / "other.pdf"), hedge_after=5.0, on_failure=reasons.append)
+
+        assert result is False
+        assert reasons == ["not_pdf"]
+
+
+    @pytest.mark.asyncio
+    async def test_batch_hedges_with_alternates_and_reports_latency(self, temp_dir):
+
+        with MockEconBizServer(latency=2.0) as slow, MockEconBizServer() as fast:
+            pdf_urls = [(f"paper{i}", f"{slow.base_url}/pdf/{i}") for i in range(3)]
+            alternates = {f"paper{i}": [f"{fast.base_url}/pdf/{i}"] for i in range(3)}
+
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir, alternates=alternates, hedge_after=0.1)
+
+        assert len(results['successful']) == 3
+        assert results['latency']['count'] == 3
+        assert results['latency']['max'] < 1.5
+
+
+    @pytest.mark.asyncio
+    async def test_batch_pool_has_room_for_hedges(self, temp_dir):
+
+        # Every primary stalls at once; the hedges must not queue behind them for a connection
+        with MockEconBizServer(latency=1.5) as slow, MockEconBizServer() as fast:
+            pdf_urls = [(f"paper{i}", f"{slow.base_url}/pdf/{i}") for i in range(8)]
+            alternates = {f"paper{i}": [f"{fast.base_url}/pdf/{i}"] for i in range(8)}
+
+            start = time.perf_counter()
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir, max_concurrency=4, max_per_host=4, alternates=alternates, hedge_after=0.1)
+            elapsed = time.perf_counter() - start
+
+        assert len(results['successful']) == 8
+        assert elapsed < 1.5
+
+
+    @pytest.mark.asyncio
+    async def test_hedges_respect_per_host_cap(self, temp_dir, mock_pdf_content):
+
+        # Primaries on ten different hosts all stall; every alternate points at the same mirror
+        in_flight = {"mirror": 0, "peak": 0}
+
+        async def handler(request):
+            if request.url.host != "mirror.org":
+                await asyncio.sleep(0.5)
+            else:
+                in_flight["mirror"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["mirror"])
+                await asyncio.sleep(0.05)
+                in_flight["mirror"] -= 1
+            return httpx.Response(200, content=mock_pdf_content, headers={"Content-Type": "application/pdf"})
+
+        pdf_urls = [(f"paper{i}", f"https://host{i}.org/{i}.pdf") for i in range(10)]
+        alternates = {f"paper{i}": [f"https://mirror.org/{i}.pdf"] for i in range(10)}
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir, client=client, max_concurrency=10, max_per_host=2, alternates=alternates, hedge_after=0.01)
+
+        assert len(results['successful']) == 10
+        assert 1 <= in_flight["peak"] <= 2
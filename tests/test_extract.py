@@ -0,0 +1,80 @@
+import pytest
+import shutil
+from pathlib import Path
+
+pypdf = pytest.importorskip("pypdf")
+
+from extract import extract_pdfs, file_sha256
+
+
+SAMPLE_PDF = Path(__file__).resolve().parent.parent / "test.pdf"
+
+
+@pytest.fixture
+def pdf_dir(temp_dir):
+
+    pdfs = temp_dir / "pdfs"
+    pdfs.mkdir()
+
+    # The first three pages of the sample keep extraction quick
+    writer = pypdf.PdfWriter()
+    for page in pypdf.PdfReader(SAMPLE_PDF).pages[:3]:
+        writer.add_page(page)
+    writer.write(str(pdfs / "good.pdf"))
+
+    (pdfs / "truncated.pdf").write_bytes(SAMPLE_PDF.read_bytes()[:4096])
+    (pdfs / "garbage.pdf").write_bytes(b"<html>not a pdf</html>")
+    return pdfs
+
+
+class TestExtractPdfs:
+
+    @pytest.mark.asyncio
+    async def test_extracts_text_and_isolates_corrupt_files(self, pdf_dir, temp_dir):
+
+        paths = [pdf_dir / "truncated.pdf", pdf_dir / "good.pdf", pdf_dir / "garbage.pdf"]
+        results = await extract_pdfs(paths, cache_dir=temp_dir / "cache", max_workers=2)
+
+        truncated, good, garbage = results
+        assert good.ok and good.pages == 3
+        assert "Cohen, Arthur" in good.text
+        assert good.text.count("\f") == 2
+        assert good.sha256 == file_sha256(pdf_dir / "good.pdf")
+
+        assert not truncated.ok and truncated.pages == 0
+        assert not garbage.ok
+
+
+    @pytest.mark.asyncio
+    async def test_rerun_is_served_from_cache(self, pdf_dir, temp_dir):
+
+        paths = [pdf_dir / "good.pdf", pdf_dir / "garbage.pdf"]
+        first = await extract_pdfs(paths, cache_dir=temp_dir / "cache", max_workers=1)
+
+        # Same bytes under a new name still hit the cache
+        renamed = pdf_dir / "renamed.pdf"
+        shutil.copy(pdf_dir / "good.pdf", renamed)
+        second = await extract_pdfs([renamed, pdf_dir / "garbage.pdf"], cache_dir=temp_dir / "cache", max_workers=1)
+
+        assert not any(result.cached for result in first)
+        assert all(result.cached for result in second)
+        assert second[0].path == renamed
+        assert second[0].text == first[0].text
+        assert second[1].error == first[1].error
+
+
+    @pytest.mark.asyncio
+    async def test_slow_pdf_times_out_without_caching(self, pdf_dir, temp_dir):
+
+        results = await extract_pdfs([SAMPLE_PDF], cache_dir=temp_dir / "cache", max_workers=1, timeout=0.001)
+
+        assert results[0].error.startswith("ExtractionTimeout")
+        assert list((temp_dir / "cache").iterdir()) == []
+
+
+    @pytest.mark.asyncio
+    async def test_missing_file(self, temp_dir):
+
+        results = await extract_pdfs([temp_dir / "nope.pdf"], cache_dir=temp_dir / "cache", max_workers=1)
+
+        assert results[0].error.startswith("FileNotFoundError")
@@ -0,0 +1,203 @@
+import pytest
+import asyncio
+import json
+import httpx
+from harvest import harvest, harvest_to_file, harvest_new, load_sync_state, save_sync_state
+from models import SyncState
+
+
+def make_transport(total, state, fail_from=None):
+
+    """ Serves synthetic pages; later pages answer faster so they complete out of order """
+
+    async def handler(request):
+        start = int(request.url.params["from"])
+        size = int(request.url.params["size"])
+
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.02 if start < 50 else 0.001)
+        state["in_flight"] -= 1
+
+        if fail_from is not None and start >= fail_from:
+            return httpx.Response(503)
+
+        hits = [{"id": f"paper{i}"} for i in range(start, min(start + size, total + 1))]
+        return httpx.Response(200, json={"hits": {"total": total, "hits": hits}, "facets": {"language": ["en"]}})
+
+    return httpx.MockTransport(handler)
+
+
+class TestHarvest:
+
+    """ Tests concurrent page fan-out and ordered merging """
+
+    @pytest.mark.asyncio
+    async def test_pages_merged_in_sort_order(self):
+
+        state = {"in_flight": 0, "peak": 0}
+
+        async with httpx.AsyncClient(transport=make_transport(95, state)) as client:
+            response = await harvest("test", page_size=10, max_concurrency=3, requests_per_second=1000, client=client)
+
+        assert [p.id for p in response.get_papers()] == [f"paper{i}" for i in range(1, 96)]
+        assert response.hits.total == 95
+        assert response.facets == {"language": ["en"]}
+        assert state["peak"] <= 3
+
+
+    @pytest.mark.asyncio
+    async def test_max_results(self):
+
+        state = {"in_flight": 0, "peak": 0}
+
+        async with httpx.AsyncClient(transport=make_transport(1000, state)) as client:
+            response = await harvest("test", page_size=10, max_results=25, requests_per_second=1000, client=client)
+
+        assert len(response.get_papers()) == 25
+
+
+    @pytest.mark.asyncio
+    async def test_failed_page_fails_harvest(self):
+
+        state = {"in_flight": 0, "peak": 0}
+
+        async with httpx.AsyncClient(transport=make_transport(100, state, fail_from=31)) as client:
+            response = await harvest("test", page_size=10, requests_per_second=1000, client=client)
+
+        assert response is None
+
+
+    @pytest.mark.asyncio
+    async def test_harvest_to_file(self, temp_dir):
+
+        state = {"in_flight": 0, "peak": 0}
+        corpus = temp_dir / "corpus" / "test.jsonl"
+
+        async with httpx.AsyncClient(transport=make_transport(42, state)) as client:
+            written = await harvest_to_file("test", corpus, page_size=10, requests_per_second=1000, client=client)
+
+        lines = corpus.read_text().splitlines()
+        assert written == 42
+        assert [json.loads(line)["id"] for line in lines] == [f"paper{i}" for i in range(1, 43)]
+
+
+def make_corpus_transport(corpus, requests):
+
+    """ Serves a fixed list of hits in the given (date desc) order and records every 'from' requested """
+
+    async def handler(request):
+        start = int(request.url.params["from"])
+        size = int(request.url.params["size"])
+        requests.append(start)
+
+        hits = corpus[start - 1:start - 1 + size]
+        return httpx.Response(200, json={"hits": {"total": len(corpus), "hits": hits}})
+
+    return httpx.MockTransport(handler)
+
+
+class TestIncrementalHarvest:
+
+    """ Tests the per-query high-water mark used by incremental syncs """
+
+    @staticmethod
+    def corpus(n, newest_year=2024):
+        return [{"id": f"old{i}", "date": [str(newest_year - i // 10)]} for i in range(n)]
+
+
+    @pytest.mark.asyncio
+    async def test_first_sync_takes_everything(self):
+
+        corpus, requests = self.corpus(45), []
+        state = SyncState(query="test")
+
+        async with httpx.AsyncClient(transport=make_corpus_transport(corpus, requests)) as client:
+            papers = await harvest_new("test", state, page_size=10, requests_per_second=1000, client=client)
+
+        assert len(papers) == 45
+        assert state.newest_date == "2024"
+        assert len(state.seen_ids) == 45
+
+
+    @pytest.mark.asyncio
+    async def test_next_sync_stops_at_known_papers(self):
+
+        corpus, requests = self.corpus(500), []
+        state = SyncState(query="test", newest_date="2024", seen_ids=[hit["id"] for hit in corpus])
+
+        # Three new papers appear at the top of the date-sorted results
+        fresh = [{"id": f"new{i}", "date": ["2025"]} for i in range(3)]
+
+        async with httpx.AsyncClient(transport=make_corpus_transport(fresh + corpus, requests)) as client:
+            papers = await harvest_new("test", state, page_size=20, overlap=10, requests_per_second=1000, client=client)
+
+        assert [p.id for p in papers] == ["new0", "new1", "new2"]
+        assert requests == [1]
+        assert state.newest_date == "2025"
+        assert len(state.seen_ids) == 503
+
+
+    @pytest.mark.asyncio
+    async def test_keeps_ties_with_newest_date(self):
+
+        corpus, requests = self.corpus(500), []
+        state = SyncState(query="test", newest_date="2024", seen_ids=["old0", "old1"] + [f"old{i}" for i in range(10, 500)])
+
+        # Papers sharing the newest date but missed last time are still picked up
+        async with httpx.AsyncClient(transport=make_corpus_transport(corpus, requests)) as client:
+            papers = await harvest_new("test", state, page_size=4, overlap=10, requests_per_second=1000, client=client)
+
+        assert [p.id for p in papers] == [f"old{i}" for i in range(2, 10)]
+        assert requests == [1, 5, 9, 13, 17]
+
+
+    @pytest.mark.asyncio
+    async def test_late_indexed_older_paper_is_harvested(self):
+
+        corpus, requests = self.corpus(500), []
+        fresh = [{"id": "new0", "date": ["2025"]}]
+        state = SyncState(query="test", newest_date="2025", seen_ids=["new0"] + [hit["id"] for hit in corpus])
+
+        # Indexed after the 2025 paper moved the high-water mark, but dated 2024
+        late = {"id": "late", "date": ["2024"]}
+
+        async with httpx.AsyncClient(transport=make_corpus_transport(fresh + corpus[:3] + [late] + corpus[3:], requests)) as client:
+            papers = await harvest_new("test", state, page_size=20, overlap=10, requests_per_second=1000, client=client)
+
+        assert [p.id for p in papers] == ["late"]
+        assert requests == [1]
+        assert state.newest_date == "2025"
+        assert "late" in state.seen_ids
+
+
+    @pytest.mark.asyncio
+    async def test_failed_sync_leaves_state_untouched(self):
+
+        async def handler(request):
+            return httpx.Response(404)
+
+        state = SyncState(query="test", newest_date="2024", seen_ids=["a"])
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            papers = await harvest_new("test", state, requests_per_second=1000, client=client)
+
+        assert papers is None
+        assert state.seen_ids == ["a"]
+        assert state.last_sync is None
+
+
+    def test_state_round_trip(self, temp_dir):
+
+        state = SyncState(query="labour / economics", newest_date="2024", seen_ids=["a", "b"], pending_pdfs={"a": ["https://x/a.pdf", "https://mirror/a.pdf"]})
+        save_sync_state(state, temp_dir)
+
+        assert load_sync_state("labour / economics", temp_dir) == state
+        assert load_sync_state("unseen query", temp_dir) == SyncState(query="unseen query")
+
+
+    def test_state_with_single_pending_urls_still_loads(self, temp_dir):
+
+        (temp_dir / "old.json").write_text(json.dumps({"query": "old", "pending_pdfs": {"a": "https://x/a.pdf"}}))
+
+        assert load_sync_state("old", temp_dir).pending_pdfs == {"a": ["https://x/a.pdf"]}
@@ -0,0 +1,142 @@
+import pytest
+
+from benchmarks.mock_server import MockEconBizServer
+from layout import Layout, FLAT, SHARDED, LAYOUT_MARKER, layout_for, resolve_layout, migrate_directory, main, shard_key
+from utils import download_pdfs_batch, index_saved_response, list_saved_responses, list_saved_response_entries
+
+
+class TestLayout:
+
+    def test_flat_layout_is_the_default(self, temp_dir):
+
+        assert layout_for(temp_dir) == FLAT
+        assert FLAT.path(temp_dir, "10419_1.pdf") == temp_dir / "10419_1.pdf"
+
+
+    def test_sharded_path(self, temp_dir):
+
+        path = Layout(depth=2, width=2).path(temp_dir, "10419_1.pdf")
+
+        assert path.name == "10419_1.pdf"
+        assert len(path.relative_to(temp_dir).parts) == 3
+        assert all(len(part) == 2 for part in path.relative_to(temp_dir).parts[:2])
+
+
+    def test_part_file_shares_the_shard_of_its_pdf(self, temp_dir):
+
+        shard = SHARDED.path(temp_dir, "a.pdf").parent
+        for sibling in ("a.pdf.part", "a.pdf.part.validator", "a.pdf.alt1", "a.pdf.alt1.part", "a.pdf.link"):
+            assert SHARDED.path(temp_dir, sibling).parent == shard
+
+
+    def test_dotted_names_spread_over_shards(self, temp_dir):
+
+        # DOI-style ids and saved responses of dotted queries share everything before their second dot
+        names = [f"10.1234_{i}.pdf" for i in range(64)] + [f"response_U.S._trade_{i}.json.gz" for i in range(64)]
+
+        assert shard_key("10.1234_5.pdf.part.validator") == "10.1234_5"
+        assert shard_key("response_U.S._trade_1.json.gz") == "response_U.S._trade_1"
+        assert len({SHARDED.path(temp_dir, name).parent for name in names}) > 32
+
+
+    def test_invalid_layout(self):
+
+        with pytest.raises(ValueError):
+            Layout(depth=-1)
+
+
+    def test_resolve_records_requested_layout_for_new_directory(self, temp_dir):
+
+        directory = temp_dir / "pdfs"
+
+        assert resolve_layout(directory, SHARDED) == SHARDED
+        assert layout_for(directory) == SHARDED
+        assert resolve_layout(directory) == SHARDED
+
+
+    def test_resolve_refuses_to_mix_layouts(self, temp_dir):
+
+        (temp_dir / "old.pdf").write_bytes(b"%PDF")
+
+        with pytest.raises(ValueError):
+            resolve_layout(temp_dir, SHARDED)
+
+
+class TestMigration:
+
+    def test_migrate_flat_directory(self, temp_dir):
+
+        names = [f"10419_{i}.pdf" for i in range(20)]
+        for name in names:
+            (temp_dir / name).write_bytes(b"%PDF")
+
+        assert migrate_directory(temp_dir) == 20
+
+        assert layout_for(temp_dir) == SHARDED
+        assert all(SHARDED.path(temp_dir, name).exists() for name in names)
+        assert not any(temp_dir.glob("*.pdf"))
+        assert sorted(p.name for p in SHARDED.glob(temp_dir, "*.pdf")) == sorted(names)
+
+
+    def test_migration_is_idempotent_and_reversible(self, temp_dir):
+
+        (temp_dir / "a.pdf").write_bytes(b"%PDF")
+
+        migrate_directory(temp_dir)
+        assert migrate_directory(temp_dir) == 0
+
+        assert migrate_directory(temp_dir, FLAT) == 1
+        assert (temp_dir / "a.pdf").exists()
+        assert [p for p in temp_dir.iterdir() if p.is_dir()] == []
+
+
+    def test_half_migrated_files_are_still_found(self, temp_dir):
+
+        (temp_dir / "a.pdf").write_bytes(b"%PDF")
+        (temp_dir / LAYOUT_MARKER).write_text('{"depth": 1, "width": 2}')
+
+        assert SHARDED.locate(temp_dir, "a.pdf") == temp_dir / "a.pdf"
+        assert [p.name for p in SHARDED.glob(temp_dir)] == ["a.pdf"]
+
+
+    def test_cli(self, temp_dir):
+
+        (temp_dir / "a.pdf").write_bytes(b"%PDF")
+
+        assert main([str(temp_dir), "--depth", "2", "--width", "1"]) == 0
+        assert layout_for(temp_dir) == Layout(depth=2, width=1)
+        assert main([str(temp_dir / "missing")]) == 2
+
+
+class TestReadersFollowLayout:
+
+    @pytest.mark.asyncio
+    async def test_saved_responses_after_migration(self, temp_dir, econbiz_response):
+
+        for name in ("a", "b"):
+            response = econbiz_response(query=name)
+            filepath = temp_dir / f"response_{name}_20250101_000000.json"
+            await response.save(filepath)
+            await index_saved_response(filepath, response)
+
+        migrate_directory(temp_dir, pattern="response_*")
+
+        assert (temp_dir / "index.jsonl").exists()
+        assert [p.name for p in list_saved_responses(temp_dir)] == ["response_a_20250101_000000.json", "response_b_20250101_000000.json"]
+
+        entries = await list_saved_response_entries(temp_dir)
+        assert [e.query for e in entries] == ["a", "b"]
+        assert all(e.path.parent != temp_dir for e in entries)
+
+
+    @pytest.mark.asyncio
+    async def test_batch_download_into_shards(self, temp_dir):
+
+        with MockEconBizServer(pdf_size=1024) as server:
+            pdf_urls = [(f"10419/{i}", f"{server.base_url}/pdf/{i}") for i in range(5)]
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir, layout=SHARDED)
+
+        assert len(results['successful']) == 5
+        assert not any(temp_dir.glob("*.pdf"))
+        assert len(list(SHARDED.glob(temp_dir, "*.pdf"))) == 5
+        assert layout_for(temp_dir) == SHARDED
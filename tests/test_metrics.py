@@ -0,0 +1,141 @@
+import pytest
+import json
+
+from api import fetch_from_api
+from benchmarks.mock_server import MockEconBizServer
+from breaker import CircuitBreaker
+from client import create_client
+from metrics import Histogram, Metrics, latency_summary
+from ratelimit import NO_RETRY
+from utils import download_pdf
+
+
+class TestHistogram:
+
+    def test_cumulative_buckets(self):
+
+        hist = Histogram(buckets=(1, 2, 5))
+        for value in (0.5, 1, 1.5, 3, 10):
+            hist.observe(value)
+
+        assert hist.cumulative() == [("1", 2), ("2", 3), ("5", 4), ("+Inf", 5)]
+        assert hist.count == 5
+        assert hist.sum == 16
+
+
+    def test_quantile_interpolates_within_bucket(self):
+
+        hist = Histogram(buckets=(1, 2))
+        for _ in range(10):
+            hist.observe(1.5)
+
+        assert hist.quantile(0.5) == pytest.approx(1.5)
+        assert Histogram().quantile(0.5) is None
+
+
+class TestLatencySummary:
+
+    def test_nearest_rank_percentiles(self):
+
+        summary = latency_summary([i / 100 for i in range(1, 101)])
+
+        assert summary == {"count": 100, "p50": 0.5, "p95": 0.95, "p99": 0.99, "max": 1.0}
+
+
+    def test_empty(self):
+
+        assert latency_summary([]) == {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+
+
+class TestExport:
+
+    def test_prometheus_text(self):
+
+        metrics = Metrics()
+        metrics.inc("requests_total", kind="search", status="200")
+        metrics.observe("request_phase_seconds", 0.02, buckets=(0.01, 0.1), kind="search", phase="ttfb")
+
+        text = metrics.to_prometheus()
+
+        assert '# TYPE econstor_requests_total counter' in text
+        assert 'econstor_requests_total{kind="search",status="200"} 1' in text
+        assert 'econstor_request_phase_seconds_bucket{kind="search",phase="ttfb",le="0.01"} 0' in text
+        assert 'econstor_request_phase_seconds_bucket{kind="search",phase="ttfb",le="+Inf"} 1' in text
+        assert 'econstor_request_phase_seconds_count{kind="search",phase="ttfb"} 1' in text
+
+
+    def test_export_picks_format_from_suffix(self, temp_dir):
+
+        metrics = Metrics()
+        metrics.inc("requests_total", kind="download", status="error")
+
+        metrics.export(temp_dir / "run.json")
+        metrics.export(temp_dir / "run.prom")
+
+        data = json.loads((temp_dir / "run.json").read_text())
+        assert data["counters"]["requests_total"] == [{"labels": {"kind": "download", "status": "error"}, "value": 1}]
+        assert (temp_dir / "run.prom").read_text().startswith("# TYPE econstor_requests_total counter")
+
+
+class TestRequestInstrumentation:
+
+    @pytest.mark.asyncio
+    async def test_search_phases_recorded(self):
+
+        metrics = Metrics()
+
+        with MockEconBizServer(total_hits=5) as server:
+            async with create_client() as client:
+                for _ in range(2):
+                    await fetch_from_api(f"{server.base_url}/v1/search", {"q": "x", "size": 5}, client=client, metrics=metrics)
+
+        assert metrics.counter("requests_total", kind="search", status="200") == 2
+        assert metrics.histogram("response_bytes", kind="search").sum > 0
+        assert metrics.histogram("request_phase_seconds", kind="search", phase="ttfb").count == 2
+        assert metrics.histogram("request_phase_seconds", kind="search", phase="transfer").count == 2
+
+        # The second request reuses the pooled connection, so only one connect is timed
+        assert metrics.histogram("request_phase_seconds", kind="search", phase="connect").count == 1
+
+
+    @pytest.mark.asyncio
+    async def test_download_records_disk_time_and_failures(self, temp_dir):
+
+        metrics = Metrics()
+
+        with MockEconBizServer(pdf_size=4096) as server:
+            async with create_client() as client:
+                ok = await download_pdf(f"{server.base_url}/pdf/1", str(temp_dir / "a.pdf"), client=client, metrics=metrics)
+                missing = await download_pdf(f"{server.base_url}/missing", str(temp_dir / "b.pdf"), client=client, retry=NO_RETRY, metrics=metrics)
+
+        assert ok and not missing
+        assert metrics.counter("requests_total", kind="download", status="200") == 1
+        assert metrics.counter("requests_total", kind="download", status="404") == 1
+        assert metrics.histogram("request_phase_seconds", kind="download", phase="disk").count == 1
+        assert metrics.histogram("response_bytes", kind="download").sum >= 4096
+
+
+    @pytest.mark.asyncio
+    async def test_circuit_open_skip_is_not_a_request(self, temp_dir):
+
+        metrics = Metrics()
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_failure("127.0.0.1:9")
+
+        result = await download_pdf("http://127.0.0.1:9/pdf/1", str(temp_dir / "a.pdf"), breaker=breaker, metrics=metrics)
+
+        assert result is False
+        assert metrics.counter("requests_total", kind="download", status="error") == 0
+        assert metrics.counter("circuit_open_total", kind="download") == 1
+
+
+    @pytest.mark.asyncio
+    async def test_unreachable_host_counts_as_error(self):
+
+        metrics = Metrics()
+
+        async with create_client() as client:
+            result = await fetch_from_api("http://127.0.0.1:9/v1/search", {"q": "x"}, client=client, retry=NO_RETRY, metrics=metrics)
+
+        assert result is None
+        assert metrics.counter("requests_total", kind="search", status="error") == 1
@@ -0,0 +1,74 @@
+import pytest
+import os
+
+from benchmarks.mock_server import MockEconBizServer
+from metrics import Metrics
+from pdfstore import PdfStore, file_sha256
+from utils import download_pdfs_batch
+
+
+class TestPdfStore:
+
+    @pytest.mark.asyncio
+    async def test_add_moves_into_store_and_links_back(self, temp_dir, mock_pdf_content):
+
+        store = PdfStore(temp_dir / "store")
+        downloaded = temp_dir / "out" / "paper1.pdf"
+        downloaded.parent.mkdir()
+        downloaded.write_bytes(mock_pdf_content)
+
+        stored = await store.add("paper1", downloaded)
+
+        assert stored == store.object_path(file_sha256(stored))
+        assert store.lookup("paper1") == stored
+        assert os.path.samefile(stored, downloaded)
+
+
+    @pytest.mark.asyncio
+    async def test_identical_content_is_stored_once(self, temp_dir, mock_pdf_content):
+
+        store = PdfStore(temp_dir / "store")
+        for name in ("a", "b"):
+            (temp_dir / f"{name}.pdf").write_bytes(mock_pdf_content)
+            await store.add(name, temp_dir / f"{name}.pdf")
+
+        assert store.lookup("a") == store.lookup("b")
+        assert len(list((temp_dir / "store" / "objects").rglob("*.pdf"))) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_manifest_survives_restart(self, temp_dir, mock_pdf_content):
+
+        (temp_dir / "a.pdf").write_bytes(mock_pdf_content)
+        await PdfStore(temp_dir / "store").add("a", temp_dir / "a.pdf")
+
+        with open(temp_dir / "store" / "manifest.jsonl", "a") as f:
+            f.write('{"paper_id": "trunc')
+
+        reopened = PdfStore(temp_dir / "store")
+        assert reopened.lookup("a") is not None
+        assert reopened.lookup("missing") is None
+        assert len(reopened) == 1
+
+
+class TestBatchWithStore:
+
+    @pytest.mark.asyncio
+    async def test_overlapping_batches_fetch_each_paper_once(self, temp_dir):
+
+        store = PdfStore(temp_dir / "store")
+        metrics = Metrics()
+
+        with MockEconBizServer(pdf_size=4096) as server:
+            first = [(f"paper{i}", f"{server.base_url}/pdf/{i}") for i in range(4)]
+            second = [(f"paper{i}", f"{server.base_url}/pdf/{i}") for i in range(2, 6)]
+
+            await download_pdfs_batch(first, output_dir=temp_dir / "query1", store=store, metrics=metrics)
+            results = await download_pdfs_batch(second, output_dir=temp_dir / "query2", store=store, metrics=metrics)
+
+        assert sorted(results['successful']) == ["paper2", "paper3", "paper4", "paper5"]
+        assert metrics.counter("requests_total", kind="download", status="200") == 6
+        assert os.path.samefile(temp_dir / "query1" / "paper3.pdf", temp_dir / "query2" / "paper3.pdf")
+
+        # The mock serves identical bytes for every paper, so all six papers share one object
+        assert len(list((temp_dir / "store" / "objects").rglob("*.pdf"))) == 1
@@ -0,0 +1,172 @@
+import pytest
+import httpx
+import json
+from collections import Counter
+
+from planner import facet_counts, plan_query, harvest_split
+
+
+def make_corpus():
+
+    """ 300 papers over three years and two types; paper0..9 are also books (multi-valued facet) """
+
+    corpus = []
+    for i in range(300):
+        corpus.append({"id": f"paper{i}", "date": [str(2020 + i % 3)], "type_genre": ["article" if i % 2 else "working paper"] + (["book"] if i < 10 else [])})
+    return corpus
+
+
+def make_transport(corpus, requests):
+
+    """ Applies ff filters and reports facet counts as [{"term", "count"}], like the real API """
+
+    async def handler(request):
+        params = request.url.params
+        requests.append((params.get_list("ff"), int(params["from"]), int(params["size"])))
+
+        hits = corpus
+        for ff in params.get_list("ff")[1:]:
+            field, value = ff.split(":", 1)
+            hits = [hit for hit in hits if value.strip('"') in hit[field]]
+
+        facets = {}
+        for field in params["facets"].split():
+            counts = Counter(value for hit in hits for value in hit.get(field, []))
+            facets[field] = [{"term": term, "count": count} for term, count in counts.items()]
+
+        start, size = int(params["from"]), int(params["size"])
+        return httpx.Response(200, json={"hits": {"total": len(hits), "hits": hits[start - 1:start - 1 + size]}, "facets": facets})
+
+    return httpx.MockTransport(handler)
+
+
+class TestFacetCounts:
+
+    def test_accepts_common_shapes(self):
+
+        assert facet_counts({"date": {"2020": 5}}, "date") == {"2020": 5}
+        assert facet_counts({"date": [{"term": "2020", "count": 5}]}, "date") == {"2020": 5}
+        assert facet_counts({"date": [["2020", 5], ["2019", 0]]}, "date") == {"2020": 5}
+        assert facet_counts({"date": "nonsense"}, "date") == {}
+        assert facet_counts(None, "date") == {}
+
+
+class TestPlanner:
+
+    """ Tests splitting a broad query into shallow facet-filtered sub-queries """
+
+    @pytest.mark.asyncio
+    async def test_small_query_is_not_split(self):
+
+        requests = []
+        async with httpx.AsyncClient(transport=make_transport(make_corpus(), requests)) as client:
+            plan = await plan_query("test", split_threshold=1000, client=client)
+
+        assert plan.subqueries == [([], 300)]
+        assert len(requests) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_splits_by_year_then_type(self):
+
+        requests = []
+        async with httpx.AsyncClient(transport=make_transport(make_corpus(), requests)) as client:
+            plan = await plan_query("test", facets=("date", "type_genre"), split_threshold=80, client=client)
+
+        assert plan.total == 300
+        assert all(subquery.expected <= 80 for subquery in plan.subqueries)
+        assert plan.subqueries[0].filters[0] == 'date:"2022"'
+        assert len(plan.subqueries) == 9
+
+
+    @pytest.mark.asyncio
+    async def test_harvest_split_merges_and_deduplicates(self):
+
+        requests = []
+        async with httpx.AsyncClient(transport=make_transport(make_corpus(), requests)) as client:
+            response = await harvest_split("test", facets=("date", "type_genre"), split_threshold=80, page_size=50, requests_per_second=1000, client=client)
+
+        ids = [paper.id for paper in response.get_papers()]
+        assert len(ids) == len(set(ids)) == 300
+        assert response.hits.total == 300
+
+        # No request paged deeper than one sub-query's worth of results
+        assert max(start for _, start, _ in requests) <= 80
+
+
+    @pytest.mark.asyncio
+    async def test_truncated_facet_list_is_not_split_by(self):
+
+        corpus = make_corpus()
+        requests = []
+        inner = make_transport(corpus, requests)
+
+        async def handler(request):
+            # Only the top two date values are listed, like a facet list cut at its limit
+            response = await inner.handle_async_request(request)
+            data = json.loads(response.content)
+            if "date" in data["facets"]:
+                data["facets"]["date"] = sorted(data["facets"]["date"], key=lambda f: -f["count"])[:2]
+            return httpx.Response(200, json=data)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            by_date = await harvest_split("test", facets=("date",), split_threshold=50, page_size=50, requests_per_second=1000, client=client)
+            plan = await plan_query("test", facets=("date", "type_genre"), split_threshold=200, client=client)
+
+        # Splitting by two of three years would drop a third of the results
+        assert len({paper.id for paper in by_date.get_papers()}) == 300
+
+        # With another facet to fall back on, that one is used instead
+        assert sorted(subquery.filters[0] for subquery in plan.subqueries) == ['type_genre:"article"', 'type_genre:"book"', 'type_genre:"working paper"']
+
+
+    @pytest.mark.asyncio
+    async def test_multi_valued_facet_with_gaps_fails_harvest(self):
+
+        # Ten papers carry two types and ten carry none, so the type counts still add up to the total
+        corpus = make_corpus()
+        for hit in corpus[10:20]:
+            hit["type_genre"] = []
+
+        requests = []
+        async with httpx.AsyncClient(transport=make_transport(corpus, requests)) as client:
+            response = await harvest_split("test", facets=("type_genre",), split_threshold=50, page_size=50, requests_per_second=1000, client=client)
+
+        assert response is None
+
+
+    @pytest.mark.asyncio
+    async def test_papers_removed_after_planning_are_tolerated(self):
+
+        corpus = make_corpus()
+        requests = []
+        inner = make_transport(corpus, requests)
+
+        async def handler(request):
+            # The index loses five papers once planning is done
+            if request.url.params["size"] != "1" and len(corpus) == 300:
+                del corpus[-5:]
+            return await inner.handle_async_request(request)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            response = await harvest_split("test", facets=("date",), split_threshold=50, page_size=50, requests_per_second=1000, client=client)
+
+        assert len(response.get_papers()) == 295
+
+
+    @pytest.mark.asyncio
+    async def test_failed_subquery_fails_harvest(self):
+
+        corpus = make_corpus()
+        requests = []
+        inner = make_transport(corpus, requests)
+
+        async def handler(request):
+            if 'date:"2021"' in request.url.params.get_list("ff") and request.url.params["size"] != "1":
+                return httpx.Response(404)
+            return await inner.handle_async_request(request)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            response = await harvest_split("test", facets=("date",), split_threshold=50, requests_per_second=1000, client=client)
+
+        assert response is None
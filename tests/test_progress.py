@@ -0,0 +1,130 @@
+import pytest
+import io
+from unittest.mock import patch
+
+from benchmarks.mock_server import MockEconBizServer
+from progress import ProgressTracker, TerminalProgress, format_progress
+from utils import download_pdfs_batch
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgressTracker:
+
+    def test_callbacks_are_rate_limited(self):
+
+        clock = FakeClock()
+        snapshots = []
+
+        with patch("progress.time.monotonic", clock):
+            tracker = ProgressTracker(snapshots.append, total=4, interval=1.0)
+
+            # A burst of chunks inside one interval produces no callbacks at all
+            tracker.start()
+            for _ in range(1000):
+                tracker.add_bytes(1000)
+            assert snapshots == []
+
+            clock.now += 1.0
+            tracker.add_bytes(1000)
+            assert len(snapshots) == 1
+
+            tracker.finish(True)
+            tracker.close()
+
+        assert len(snapshots) == 2
+        assert snapshots[-1].done
+        assert snapshots[-1].completed == 1
+        assert snapshots[-1].bytes == 1001000
+
+
+    def test_rate_and_eta(self):
+
+        clock = FakeClock()
+        snapshots = []
+
+        with patch("progress.time.monotonic", clock):
+            tracker = ProgressTracker(snapshots.append, total=10, interval=1.0)
+
+            tracker.start()
+            clock.now += 2.0
+            tracker.add_bytes(4_000_000)
+            tracker.finish(True)
+            tracker.start()
+            tracker.finish(False)
+            current = tracker.snapshot()
+
+        assert snapshots[0].mb_per_sec == pytest.approx(2.0)
+        assert snapshots[0].in_flight == 1
+
+        # Two of ten finished after 2s, so eight more take about 8s
+        assert current.eta == pytest.approx(8.0)
+        assert current.failed == 1
+
+
+    def test_failing_callback_does_not_raise(self):
+
+        def broken(snapshot):
+            raise RuntimeError("display gone")
+
+        tracker = ProgressTracker(broken, interval=0)
+        tracker.start()
+        tracker.close()
+
+
+class TestTerminalProgress:
+
+    def test_format(self):
+
+        clock = FakeClock()
+        with patch("progress.time.monotonic", clock):
+            tracker = ProgressTracker(lambda s: None, total=3)
+            tracker.start()
+            tracker.finish(True)
+            clock.now += 30
+            line = format_progress(tracker.snapshot())
+
+        assert line.startswith("[1/3] | 0 in flight | 0 failed")
+        assert line.endswith("ETA 1:00")
+
+
+    def test_non_terminal_writes_one_line_per_update(self):
+
+        stream = io.StringIO()
+        tracker = ProgressTracker(TerminalProgress(stream), interval=0)
+        tracker.start()
+        tracker.finish(True)
+        tracker.close()
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 3
+        assert "done in" in lines[-1]
+
+
+class TestBatchProgress:
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_final_counts_and_bytes(self, temp_dir):
+
+        snapshots = []
+
+        with MockEconBizServer(pdf_size=8192) as server:
+            pdf_urls = [(f"paper{i}", f"{server.base_url}/pdf/{i}") for i in range(5)]
+            pdf_urls.append(("missing", f"{server.base_url}/missing"))
+
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir, max_concurrency=3, progress=snapshots.append, progress_interval=0.01)
+
+        final = snapshots[-1]
+        assert final.done
+        assert final.total == 6
+        assert final.completed == len(results['successful']) == 5
+        assert final.failed == 1
+        assert final.in_flight == 0
+        assert final.bytes == 5 * 8192
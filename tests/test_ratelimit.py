@@ -0,0 +1,142 @@
+import pytest
+import time
+import httpx
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from api import fetch_from_api
+from ratelimit import RateLimiter, RetryPolicy, parse_retry_after, with_retries
+
+
+class TestRateLimiter:
+
+    @pytest.mark.asyncio
+    async def test_burst_then_rate(self):
+
+        limiter = RateLimiter(rate=50, burst=5)
+
+        start = time.monotonic()
+        for _ in range(15):
+            await limiter.acquire()
+        elapsed = time.monotonic() - start
+
+        # 5 immediate, 10 more at 50/s
+        assert 0.15 <= elapsed < 0.5
+
+
+    def test_invalid_rate(self):
+
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
+
+
+class TestAdaptiveRate:
+
+    """ Tests the limiter reacting to server feedback """
+
+    def test_throttle_cuts_rate_and_sets_ceiling(self):
+
+        limiter = RateLimiter(rate=10)
+        limiter.on_throttled()
+
+        assert limiter.rate == 5
+        for _ in range(200):
+            limiter.on_success()
+
+        # Climbs back, but settles just under the refused rate rather than at it
+        assert 8.9 <= limiter.rate < 9.5
+
+
+    def test_rate_never_below_floor(self):
+
+        limiter = RateLimiter(rate=10, min_rate=2)
+        for _ in range(10):
+            limiter.on_throttled()
+
+        assert limiter.rate == 2
+
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_all_callers(self):
+
+        limiter = RateLimiter(rate=1000, burst=10)
+        limiter.on_throttled(retry_after=0.2)
+
+        start = time.monotonic()
+        await limiter.acquire()
+
+        assert time.monotonic() - start >= 0.19
+
+
+class TestRetries:
+
+    """ Tests retry, backoff and Retry-After handling """
+
+    def test_parse_retry_after(self):
+
+        future = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+        assert parse_retry_after("5") == 5.0
+        assert 25 <= parse_retry_after(format_datetime(future, usegmt=True)) <= 30
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+
+    def test_backoff_grows_and_is_capped(self):
+
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+
+        assert all(0 <= policy.delay(1) <= 1 for _ in range(50))
+        assert all(0 <= policy.delay(10) <= 5 for _ in range(50))
+        assert policy.delay(1, retry_after=3) == 3
+
+
+    @pytest.mark.asyncio
+    async def test_fetch_retries_throttled_request(self):
+
+        statuses = [429, 503, 200]
+
+        def handler(request):
+            status = statuses.pop(0)
+            if status == 200:
+                return httpx.Response(200, json={"hits": {"total": 0, "hits": []}})
+            return httpx.Response(status, headers={"Retry-After": "0"})
+
+        limiter = RateLimiter(rate=100)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            data = await fetch_from_api("https://api.example.com/v1/search", {"q": "x"}, client=client, rate_limiter=limiter)
+
+        assert data == {"hits": {"total": 0, "hits": []}}
+        assert statuses == []
+        assert limiter.rate < 100
+
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self):
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(404)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            data = await fetch_from_api("https://api.example.com/v1/search", {"q": "x"}, client=client)
+
+        assert data is None
+        assert len(calls) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self):
+
+        calls = []
+
+        async def operation():
+            calls.append(1)
+            raise httpx.ConnectError("refused")
+
+        with pytest.raises(httpx.ConnectError):
+            await with_retries(operation, RetryPolicy(max_attempts=3, base_delay=0.001))
+
+        assert len(calls) == 3
@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+import httpx
+
+from benchmarks.mock_server import MockEconBizServer
+from metrics import Metrics
+from models import Paper
+from resolver import PdfUrlResolver, find_pdf_link
+
+
+class TestFindPdfLink:
+
+    def test_citation_meta_tag_wins(self):
+
+        html = b'<html><head><meta name="citation_pdf_url" content="/bitstream/10419/1/paper.pdf"></head><body><a href="other.pdf">x</a></body></html>'
+
+        assert find_pdf_link(html, "https://www.econstor.eu/handle/10419/1") == "https://www.econstor.eu/bitstream/10419/1/paper.pdf"
+
+
+    def test_falls_back_to_pdf_anchor(self):
+
+        html = b'<html><body><a href="/about">About</a><a href="files/Paper.PDF?sequence=1">Download</a></body></html>'
+
+        assert find_pdf_link(html, "https://example.org/record/7") == "https://example.org/record/files/Paper.PDF?sequence=1"
+
+
+    def test_no_pdf_link(self):
+
+        assert find_pdf_link(b"<html><body><a href='/about'>About</a></body></html>", "https://example.org/") is None
+
+
+class TestPdfUrlResolver:
+
+    @pytest.mark.asyncio
+    async def test_landing_page_resolved_and_cached(self, temp_dir):
+
+        metrics = Metrics()
+
+        with MockEconBizServer() as server:
+            async with httpx.AsyncClient() as client:
+                resolver = PdfUrlResolver(temp_dir / "resolved.jsonl", client=client, metrics=metrics)
+                pdf_url = await resolver.resolve([f"{server.base_url}/handle/10419/1"])
+
+                assert pdf_url == f"{server.base_url}/pdf/10419/1"
+
+                # A fresh resolver reads the cache file instead of fetching the page again
+                restarted = PdfUrlResolver(temp_dir / "resolved.jsonl", client=client, metrics=metrics)
+                assert await restarted.resolve([f"{server.base_url}/handle/10419/1"]) == pdf_url
+
+        assert metrics.counter("requests_total", kind="resolve", status="200") == 1
+
+
+    @pytest.mark.asyncio
+    async def test_handle_redirect_followed_without_a_shared_client(self, temp_dir):
+
+        with MockEconBizServer() as server:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl")
+            assert await resolver.resolve([f"{server.base_url}/hdl/10419/7"]) == f"{server.base_url}/pdf/10419/7"
+
+
+    @pytest.mark.asyncio
+    async def test_direct_pdf_resolves_to_itself(self, temp_dir):
+
+        with MockEconBizServer() as server:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl")
+            assert await resolver.resolve([f"{server.base_url}/pdf/3"]) == f"{server.base_url}/pdf/3"
+
+
+    @pytest.mark.asyncio
+    async def test_untyped_pdf_recognised_by_its_bytes(self, temp_dir):
+
+        def handler(request):
+            if request.url.path == "/octet":
+                return httpx.Response(200, content=b"%PDF-1.4\n...", headers={"Content-Type": "application/octet-stream"})
+            if request.url.path == "/untyped":
+                return httpx.Response(200, content=b"%PDF-1.7\n...")
+            return httpx.Response(200, text="%PDF is just text here")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl", client=client)
+
+            assert await resolver.resolve(["https://example.org/octet"]) == "https://example.org/octet"
+            assert await resolver.resolve(["https://example.org/untyped"]) == "https://example.org/untyped"
+            assert await resolver.resolve(["https://example.org/notes.txt"]) is None
+
+
+    @pytest.mark.asyncio
+    async def test_first_identifier_with_a_pdf_wins(self, temp_dir):
+
+        with MockEconBizServer() as server:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl")
+            pdf_url = await resolver.resolve([f"{server.base_url}/missing", f"{server.base_url}/handle/5", f"{server.base_url}/pdf/6"])
+
+        assert pdf_url == f"{server.base_url}/pdf/5"
+
+
+    @pytest.mark.asyncio
+    async def test_shared_landing_page_fetched_once(self, temp_dir):
+
+        requests = []
+
+        def handler(request):
+            requests.append(request.url.path)
+            return httpx.Response(200, html='<a href="/files/shared.pdf">PDF</a>')
+
+        papers = [Paper(id=f"p{i}", identifier_url=["https://example.org/shared"]) for i in range(5)]
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl", client=client)
+            pdf_urls = await resolver.resolve_papers(papers)
+
+        assert pdf_urls == [(f"p{i}", "https://example.org/files/shared.pdf") for i in range(5)]
+        assert requests == ["/shared"]
+
+
+    @pytest.mark.asyncio
+    async def test_cancelled_fetch_cancels_waiters(self, temp_dir):
+
+        started = asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await asyncio.sleep(10)
+            return httpx.Response(200, html="<p>No files</p>")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl", client=client)
+
+            first = asyncio.create_task(resolver.resolve_url("https://example.org/slow"))
+            await started.wait()
+            second = asyncio.create_task(resolver.resolve_url("https://example.org/slow"))
+            await asyncio.sleep(0)
+
+            first.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            with pytest.raises(asyncio.CancelledError):
+                await second
+
+        assert len(resolver) == 0
+
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, temp_dir):
+
+        def handler(request):
+            if request.url.path == "/down":
+                return httpx.Response(503)
+            return httpx.Response(200, html="<p>No files</p>")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl", client=client)
+
+            assert await resolver.resolve(["https://example.org/down", "https://example.org/empty"]) is None
+
+        # The page without a PDF is remembered, the server error will be retried
+        assert len(PdfUrlResolver(temp_dir / "resolved.jsonl")) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_candidates_keep_every_pdf_link(self, temp_dir):
+
+        with MockEconBizServer() as server:
+            resolver = PdfUrlResolver(temp_dir / "resolved.jsonl")
+            candidates = await resolver.candidates([f"{server.base_url}/handle/1", f"{server.base_url}/pdf/1", f"{server.base_url}/pdf/2", f"{server.base_url}/missing"])
+
+        assert candidates == [f"{server.base_url}/pdf/1", f"{server.base_url}/pdf/2"]
@@ -1,7 +1,9 @@
 import pytest
 from pathlib import Path
-from models import Paper, SearchHits, EconBizResponse
-from utils import load_saved_responses, list_saved_responses
+from models import Paper, SearchHits, EconBizResponse, RESPONSE_SCHEMA_VERSION
+import storage
+from unittest.mock import patch
+from utils import load_saved_responses, list_saved_responses, index_saved_response, list_saved_response_entries
 import json
 
 
@@ -90,3 +92,137 @@ class TestSaveLoadCycle:
         assert files[1].name == "response_b_20250117.json"
         assert files[2].name == "response_c_20250118.json"
 
+
+
+class TestSavedResponseIndex:
+
+    """ Tests the metadata index that lets load mode list responses without parsing them """
+
+    @pytest.mark.asyncio
+    async def test_save_appends_index_entry(self, temp_dir, complete_paper, econbiz_response):
+
+        response = econbiz_response(papers=[complete_paper], total=42, query="indexed query")
+        filepath = temp_dir / "response_indexed_20250101_000000.json"
+
+        await response.save(filepath)
+        await index_saved_response(filepath, response)
+
+        entries = await list_saved_response_entries(temp_dir)
+
+        assert len(entries) == 1
+        assert entries[0].query == "indexed query"
+        assert entries[0].total == 42
+        assert entries[0].papers == 1
+        assert entries[0].size_bytes == filepath.stat().st_size
+        assert entries[0].path == filepath
+
+
+    @pytest.mark.asyncio
+    async def test_listing_does_not_parse_indexed_files(self, temp_dir, econbiz_response):
+
+        response = econbiz_response(query="cheap listing")
+        filepath = temp_dir / "response_cheap_20250101_000000.json"
+        await response.save(filepath)
+        await index_saved_response(filepath, response)
+
+        with patch("utils.load_saved_responses") as mock_load:
+            entries = await list_saved_response_entries(temp_dir)
+
+        mock_load.assert_not_called()
+        assert entries[0].query == "cheap listing"
+
+
+    @pytest.mark.asyncio
+    async def test_unindexed_files_backfilled(self, temp_dir, econbiz_response):
+
+        """ Responses saved before the index existed are indexed on first listing """
+
+        await econbiz_response(query="old").save(temp_dir / "response_old_20240101_000000.json")
+
+        entries = await list_saved_response_entries(temp_dir)
+
+        assert [e.query for e in entries] == ["old"]
+        assert (temp_dir / "index.jsonl").read_text().count("\n") == 1
+
+
+    @pytest.mark.asyncio
+    async def test_deleted_files_skipped(self, temp_dir, econbiz_response):
+
+        for name in ("a", "b"):
+            response = econbiz_response(query=name)
+            filepath = temp_dir / f"response_{name}_20250101_000000.json"
+            await response.save(filepath)
+            await index_saved_response(filepath, response)
+
+        (temp_dir / "response_a_20250101_000000.json").unlink()
+
+        entries = await list_saved_response_entries(temp_dir)
+        assert [e.query for e in entries] == ["b"]
+
+
+class TestStorageFormats:
+
+    """ Tests compressed storage formats and automatic format detection on load """
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("format", ["json", "json.gz", "json.zst"])
+    async def test_round_trip(self, temp_dir, complete_paper, econbiz_response, format):
+
+        if format == "json.zst":
+            pytest.importorskip("zstandard")
+
+        original = econbiz_response(papers=[complete_paper], total=7, facets={"language": ["en"]})
+        filepath = temp_dir / f"response_test{storage.suffix_for(format)}"
+
+        await original.save(filepath, format=format)
+        loaded = await EconBizResponse.load(filepath)
+
+        assert loaded == original
+
+
+    @pytest.mark.asyncio
+    async def test_compressed_smaller_than_pretty_json(self, temp_dir, sample_papers, econbiz_response):
+
+        response = econbiz_response(papers=sample_papers * 20)
+
+        await response.save(temp_dir / "pretty.json", format="json")
+        await response.save(temp_dir / "compact.json.gz", format="json.gz")
+
+        assert (temp_dir / "compact.json.gz").stat().st_size < (temp_dir / "pretty.json").stat().st_size / 4
+
+
+    def test_list_includes_compressed_files(self, temp_dir):
+
+        (temp_dir / "response_a_20250116.json").touch()
+        (temp_dir / "response_b_20250117.json.gz").touch()
+        (temp_dir / "response_c_20250118.json.gz.tmp").touch()  # Should be ignored
+
+        files = list_saved_responses(temp_dir)
+        assert [f.name for f in files] == ["response_a_20250116.json", "response_b_20250117.json.gz"]
+
+
+    @pytest.mark.asyncio
+    async def test_unknown_format(self, temp_dir, econbiz_response):
+
+        with pytest.raises(ValueError):
+            await econbiz_response().save(temp_dir / "response.bin", format="pickle")
+
+
+    @pytest.mark.asyncio
+    async def test_schema_version_is_saved_and_checked(self, temp_dir, econbiz_response):
+
+        filepath = temp_dir / "response.json.gz"
+        await econbiz_response().save(filepath, format="json.gz")
+        saved = json.loads(storage.decode(filepath.read_bytes()))
+        assert saved["schema_version"] == RESPONSE_SCHEMA_VERSION
+
+        # Files from before the field existed still load
+        del saved["schema_version"]
+        (temp_dir / "old.json").write_text(json.dumps(saved))
+        assert (await EconBizResponse.load(temp_dir / "old.json")).query == saved["query"]
+
+        # A file written by a newer model is refused rather than misread
+        saved["schema_version"] = RESPONSE_SCHEMA_VERSION + 1
+        (temp_dir / "newer.json").write_text(json.dumps(saved))
+        with pytest.raises(ValueError, match="schema"):
+            await EconBizResponse.load(temp_dir / "newer.json")
@@ -0,0 +1,152 @@
+import pytest
+import asyncio
+from unittest.mock import patch
+from scheduler import DownloadScheduler
+from utils import download_pdfs_batch
+
+
+class TestDownloadScheduler:
+
+    """ Tests the bounded worker pool behind download_pdfs_batch """
+
+    @pytest.mark.asyncio
+    async def test_global_and_per_host_caps(self):
+
+        in_flight = {"total": 0, "a.com": 0, "b.com": 0}
+        peaks = {"total": 0, "a.com": 0, "b.com": 0}
+
+        async def handler(paper_id, url):
+            host = url.split("/")[2]
+            for key in ("total", host):
+                in_flight[key] += 1
+                peaks[key] = max(peaks[key], in_flight[key])
+            await asyncio.sleep(0.01)
+            for key in ("total", host):
+                in_flight[key] -= 1
+
+        jobs = [(f"p{i}", f"https://{'a.com' if i % 2 else 'b.com'}/{i}.pdf") for i in range(40)]
+        await DownloadScheduler(max_concurrency=5, max_per_host=2).run(jobs, handler)
+
+        assert peaks["total"] <= 4  # two hosts x two slots each
+        assert peaks["a.com"] <= 2
+        assert peaks["b.com"] <= 2
+
+
+    @pytest.mark.asyncio
+    async def test_busy_host_does_not_block_other_hosts(self):
+
+        """ Jobs queued behind a saturated host must not hold global slots while other hosts sit idle """
+
+        peaks = {"total": 0}
+        in_flight = {"total": 0}
+        finished = {"a.com": 0, "b.com": 0}
+        a_released = asyncio.Event()
+
+        async def handler(paper_id, url):
+            host = url.split("/")[2]
+            in_flight["total"] += 1
+            peaks["total"] = max(peaks["total"], in_flight["total"])
+
+            # a.com stalls until every b.com job is through, so b.com can only finish if it never waits on a.com
+            if host == "a.com":
+                await a_released.wait()
+            else:
+                await asyncio.sleep(0)
+
+            in_flight["total"] -= 1
+            finished[host] += 1
+            if finished["b.com"] == 20:
+                a_released.set()
+
+        jobs = [(f"a{i}", f"https://a.com/{i}.pdf") for i in range(20)] + [(f"b{i}", f"https://b.com/{i}.pdf") for i in range(20)]
+
+        await asyncio.wait_for(DownloadScheduler(max_concurrency=10, max_per_host=2).run(jobs, handler), timeout=5)
+
+        # Both hosts busy at once, each at its own cap
+        assert peaks["total"] == 4
+        assert finished == {"a.com": 20, "b.com": 20}
+
+
+    @pytest.mark.asyncio
+    async def test_jobs_consumed_lazily(self):
+
+        """ The input iterable is only read a bounded distance ahead of the workers """
+
+        produced = []
+        done = []
+
+        def jobs():
+            for i in range(100):
+                produced.append(i)
+                yield (f"p{i}", f"https://example.com/{i}.pdf")
+
+        async def handler(paper_id, url):
+            await asyncio.sleep(0)
+            done.append(paper_id)
+            assert len(produced) - len(done) <= 3 * 2 + 3 + 1
+
+        await DownloadScheduler(max_concurrency=3, max_per_host=3).run(jobs(), handler)
+
+        assert len(done) == 100
+
+
+    @pytest.mark.asyncio
+    async def test_claims_share_the_per_host_cap(self):
+
+        """ Extra transfers claimed by a job hold a slot on their host like any job would """
+
+        scheduler = DownloadScheduler(max_concurrency=4, max_per_host=1)
+        events = []
+
+        # A hedge on b.com, as if claimed by an earlier job still running
+        assert scheduler.try_claim("https://b.com/mirror.pdf")
+        assert not scheduler.try_claim("https://b.com/other.pdf")
+
+        async def handler(paper_id, url):
+            events.append(paper_id)
+            if paper_id == "a0":
+                await asyncio.sleep(0.05)
+                events.append("released")
+                scheduler.release("https://b.com/mirror.pdf")
+
+        await scheduler.run([("b0", "https://b.com/0.pdf"), ("a0", "https://a.com/0.pdf")], handler)
+
+        # b.com's job waits for the claim while a.com's runs, then takes the freed slot
+        assert events == ["a0", "released", "b0"]
+
+
+    @pytest.mark.asyncio
+    async def test_handler_error_does_not_stop_pool(self):
+
+        done = []
+
+        async def handler(paper_id, url):
+            if paper_id == "bad":
+                raise RuntimeError("boom")
+            done.append(paper_id)
+
+        jobs = [("bad", "https://example.com/bad.pdf"), ("ok1", "https://example.com/1.pdf"), ("ok2", "https://example.com/2.pdf")]
+        await DownloadScheduler(max_concurrency=1).run(jobs, handler)
+
+        assert done == ["ok1", "ok2"]
+
+
+    @pytest.mark.asyncio
+    async def test_batch_accepts_generator(self, temp_dir):
+
+        async def mock_download(url, filename, **kwargs):
+            return True
+
+        pdf_urls = ((f"paper{i}", f"https://example.com/{i}.pdf") for i in range(25))
+
+        with patch("utils.download_pdf", side_effect=mock_download):
+            results = await download_pdfs_batch(pdf_urls, output_dir=temp_dir, max_concurrency=4)
+
+        assert len(results['successful']) == 25
+        assert results['failed'] == []
+
+
+    def test_invalid_limits(self):
+
+        with pytest.raises(ValueError):
+            DownloadScheduler(max_concurrency=0)
@@ -0,0 +1,136 @@
+import pytest
+import json
+import httpx
+from api import stream_search
+from streaming import SearchStream
+
+
+PAYLOAD = {
+    "hits": {
+        "total": 12345,
+        "hits": [
+            {"id": "10419/1", "title": ["Ökonomie und Märkte"], "identifier_url": ["https://example.com/1.pdf"]},
+            {"id": "10419/2", "title": "Plain string title", "creator_name": ["Doe, Jane"]},
+            {"id": "10419/3", "subject": ["Finance", "Risk"]}
+        ]
+    },
+    "facets": {"language": ["en", "de"], "type_genre": ["Working Paper"]}
+}
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class TestSearchStream:
+
+    """ Tests incremental decoding of hits from a byte stream """
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 100000])
+    async def test_decodes_across_chunk_boundaries(self, chunk_size):
+
+        body = json.dumps(PAYLOAD, indent=2, ensure_ascii=False).encode("utf-8")
+        results = SearchStream(chunked(body, chunk_size))
+
+        papers = [paper async for paper in results]
+
+        assert [p.id for p in papers] == ["10419/1", "10419/2", "10419/3"]
+        assert papers[0].title == ["Ökonomie und Märkte"]
+        assert results.total == 12345
+        assert results.facets == PAYLOAD["facets"]
+
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("chunk_size", [1, 2, 5])
+    async def test_brackets_quotes_and_escapes_inside_strings(self, chunk_size):
+
+        tricky = {"hits": {"total": 1, "hits": [{"id": 'a"}]\\', "title": ["{[ \\\" ]}", "\u00e9\\"]}]}, "facets": {"k": ['"']}}
+        body = json.dumps(tricky).encode("utf-8")
+        results = SearchStream(chunked(body, chunk_size))
+
+        papers = [paper async for paper in results]
+
+        assert [p.model_dump(exclude_none=True) for p in papers] == tricky["hits"]["hits"]
+        assert results.facets == tricky["facets"]
+
+
+    @pytest.mark.asyncio
+    async def test_large_value_is_decoded_once(self):
+
+        """ A hit spread over many chunks is not re-decoded after every chunk """
+
+        hit = {"id": "big", "abstract": ["word " * 20000]}
+        body = json.dumps({"hits": {"total": 1, "hits": [hit]}}).encode("utf-8")
+        results = SearchStream(chunked(body, 512))
+
+        decoder = results._json
+        calls = []
+
+        class CountingDecoder:
+            def raw_decode(self, s, idx=0):
+                calls.append(idx)
+                return decoder.raw_decode(s, idx)
+
+        results._json = CountingDecoder()
+        papers = [paper async for paper in results]
+
+        assert papers[0].abstract == hit["abstract"]
+        assert len(calls) < 20
+
+
+    @pytest.mark.asyncio
+    async def test_hits_yielded_before_stream_ends(self):
+
+        """ The first paper is available while later bytes are still unread """
+
+        body = json.dumps(PAYLOAD).encode("utf-8")
+        cut = body.index(b'{"id": "10419/2"')
+        sent = []
+
+        async def slow_chunks():
+            sent.append("head")
+            yield body[:cut]
+            sent.append("tail")
+            yield body[cut:]
+
+        results = SearchStream(slow_chunks())
+        async for paper in results:
+            assert paper.id == "10419/1"
+            assert sent == ["head"]
+            break
+
+
+    @pytest.mark.asyncio
+    async def test_empty_hits(self):
+
+        body = b'{"hits": {"total": 0, "hits": []}, "facets": {}}'
+        results = SearchStream(chunked(body, 5))
+
+        assert [paper async for paper in results] == []
+        assert results.total == 0
+
+
+    @pytest.mark.asyncio
+    async def test_truncated_body(self):
+
+        body = json.dumps(PAYLOAD).encode("utf-8")[:-40]
+
+        with pytest.raises(ValueError):
+            [paper async for paper in SearchStream(chunked(body, 16))]
+
+
+    @pytest.mark.asyncio
+    async def test_stream_search(self):
+
+        def handler(request):
+            assert request.url.params["size"] == "3"
+            return httpx.Response(200, content=json.dumps(PAYLOAD).encode("utf-8"))
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with stream_search("test", size=3, client=client) as results:
+                ids = [paper.id async for paper in results]
+
+        assert ids == ["10419/1", "10419/2", "10419/3"]
+        assert results.total == 12345
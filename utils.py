@@ -1,13 +1,53 @@
 import httpx
 import aiofiles
-import asyncio 
+import asyncio
+import os
+import time
 from pathlib import Path
-from typing import List, Optional
-from models import EconBizResponse
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Sized
+from models import EconBizResponse, SavedResponseEntry
+import storage
+from client import borrow_client, create_client
+from scheduler import DownloadScheduler, DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_PER_HOST
+from ratelimit import RateLimiter, RetryPolicy, DEFAULT_RETRY, with_retries
+from breaker import CircuitBreaker, CircuitOpenError
+from metrics import Metrics, RequestTimer, latency_summary, track_request
+from progress import ProgressSnapshot, ProgressTracker, DEFAULT_INTERVAL
+from pdfstore import PdfStore, link
+from layout import Layout, layout_for, resolve_layout
 import logging 
 
 logger = logging.getLogger(__name__)
 
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+PART_SUFFIX = ".part"
+
+# Next to a .part file: the ETag or Last-Modified of the response it was started from, sent back as If-Range
+VALIDATOR_SUFFIX = ".validator"
+
+# Seconds without a first byte before a hedged download also tries the paper's next URL
+DEFAULT_HEDGE_AFTER = 2.0
+SAVED_RESPONSES_INDEX = "index.jsonl"
+
+# Readers accept a PDF header anywhere in the first KiB, so look that far into the first chunk
+PDF_MAGIC = b"%PDF"
+PDF_MAGIC_WINDOW = 1024
+
+# Error and landing pages; PDFs also come as application/octet-stream and the like, so those are not rejected
+NON_PDF_CONTENT_TYPES = ("text/", "application/json", "application/xml", "application/xhtml+xml")
+
+
+class NotPdfError(Exception):
+
+    """ A download answered with something other than a PDF, typically an HTML error or landing page """
+
+    def __init__(self, url: str, detail: str):
+        super().__init__(f"{url} is not a PDF ({detail})")
+        self.url = url
+        self.detail = detail
+
+
 async def load_saved_responses(filepath: Path) -> Optional[EconBizResponse]:
     
     try:
@@ -21,78 +61,528 @@ async def load_saved_responses(filepath: Path) -> Optional[EconBizResponse]:
 
 def list_saved_responses(directory: Path = Path("saved_responses")) -> List[Path]:
 
+    """ Saved response files in directory, found through its layout and ordered by file name """
+
     if not directory.exists():
         return []
 
-    saved_files = list(directory.glob("response_*.json"))
-    return sorted(saved_files)
+    saved_files = [p for p in layout_for(directory).glob(directory, "response_*") if storage.is_saved_response(p)]
+    return sorted(saved_files, key=lambda p: p.name)
+
+
+async def index_saved_response(filepath: Path, response: EconBizResponse, directory: Optional[Path] = None) -> None:
+
+    """ Append one metadata line for a freshly saved response to the index of directory (default: the file's own) """
+
+    entry = SavedResponseEntry.from_response(filepath, response)
+    directory = directory if directory is not None else filepath.parent
+
+    async with aiofiles.open(directory / SAVED_RESPONSES_INDEX, "a", encoding="utf-8") as f:
+        await f.write(entry.model_dump_json() + "\n")
+
+
+async def list_saved_response_entries(directory: Path = Path("saved_responses")) -> List[SavedResponseEntry]:
+
+    """
+        Metadata for every saved response, read from the index instead of parsing each file
+
+        Files saved before the index existed are parsed once and appended to it. Entries whose
+        file has been deleted are skipped. Ordered like list_saved_responses.
+    """
+
+    saved_files = list_saved_responses(directory)
+    if not saved_files:
+        return []
+
+    entries = {}
+    index_path = directory / SAVED_RESPONSES_INDEX
+
+    if index_path.exists():
+        async with aiofiles.open(index_path, "r", encoding="utf-8") as f:
+            async for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = SavedResponseEntry.model_validate_json(line)
+                except Exception as e:
+                    logger.warning(f"Skipping corrupt index line in {index_path}: {e}")
+                    continue
+                entries[entry.path.name] = entry
+
+    for filepath in saved_files:
+        if filepath.name not in entries:
+            response = await load_saved_responses(filepath)
+            if response is not None:
+                await index_saved_response(filepath, response, directory)
+                entries[filepath.name] = SavedResponseEntry.from_response(filepath, response)
+
+    # Resolve against the directory actually listed, in case it was moved since indexing
+    return [entries[p.name].model_copy(update={"path": p}) for p in saved_files if p.name in entries]
+
+
+async def download_pdf(url: str, filename: str, timeout: int = 30, client: Optional[httpx.AsyncClient] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, rate_limiter: Optional[RateLimiter] = None, retry: RetryPolicy = DEFAULT_RETRY, breaker: Optional[CircuitBreaker] = None, metrics: Optional[Metrics] = None, on_chunk: Optional[Callable[[int], None]] = None, on_failure: Optional[Callable[[str], None]] = None) -> bool:
+
+    """
+        Stream a PDF to disk chunk by chunk, so memory use is bounded by chunk_size rather than file size
+
+        Bytes land in '<filename>.part' first. An interrupted download keeps its .part file and the next
+        call resumes it with a Range request; the file is renamed to filename only once complete. The
+        response's validator is kept beside the .part file and sent as If-Range, so a PDF that changed on
+        the server in between comes back whole instead of being appended to the old bytes. A .part file
+        without a validator (the server sent none) is not resumed but downloaded again.
+        Transient failures are retried per the retry policy, each retry resuming from the .part file.
+        With a breaker, every attempt goes through the host's circuit and a dead host fails fast.
+        With metrics, each attempt's phase timings (disk writes included), bytes and status are recorded under kind "download".
+        on_chunk is called with the size of every chunk written, for progress reporting.
+
+        Responses that are not PDFs are abandoned before their body is written: on an HTML/text/JSON
+        Content-Type as soon as the headers arrive, otherwise when the first chunk lacks the %PDF marker.
+        They are not retried. When returning False, on_failure is called with the reason: "not_pdf",
+        "timeout", "connection", "http_<status>", "circuit_open" or "error".
+    """
 
+    target = Path(filename)
+    part = target.with_name(target.name + PART_SUFFIX)
 
-async def download_pdf(url: str, filename: str, timeout: int = 30) -> bool:
+    def failed(reason: str) -> bool:
+        if on_failure is not None:
+            on_failure(reason)
+        return False
 
     try: 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(url, stream=True)
-            response.raise_for_status()
+        async with borrow_client(client, timeout=timeout) as client:
+
+            async def transfer() -> None:
+                with track_request(metrics, "download") as timer:
+                    return await _stream_to_part(client, url, part, chunk_size, timer, on_chunk)
+
+            async def attempt() -> None:
+                # The breaker goes outside the timer, so a fail-fast skip is not recorded as a request
+                if breaker is None:
+                    return await transfer()
+                return await breaker.call(url, transfer)
 
-            # Write file asynchronously
-            async with aiofiles.open(filename, "wb") as f:
-                await f.write(response.content)
-            return True
+            await with_retries(attempt, retry, rate_limiter, description=f"download {url}")
 
+        # Atomic on the same filesystem, so readers never see a half-written PDF
+        os.replace(part, target)
+        _remove(_validator_path(part))
+        return True
+
+    except NotPdfError as e:
+        logger.error(f"Error downloading {url}: not a PDF ({e.detail})")
+        return failed("not_pdf")
     except httpx.TimeoutException:
         logger.error(f"Error downloading {url}: Timeout after {timeout}s")
-        return False
+        return failed("timeout")
     except httpx.ConnectError:
         logger.error(f"Error downloading {url}: Connection error")
-        return False
+        return failed("connection")
     except httpx.HTTPStatusError as e:
         logger.error(f"Error downloading {url}: HTTP {e.response.status_code}")
-        return False
+        return failed(f"http_{e.response.status_code}")
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping {url}: {e}")
+        if metrics is not None:
+            metrics.inc("circuit_open_total", kind="download")
+        return failed("circuit_open")
     except Exception as e:
         logger.error(f"Error downloading {url}: {e}")
+        return failed("error")
+
+
+async def download_pdf_hedged(urls: Sequence[str], filename: str, hedge_after: float = DEFAULT_HEDGE_AFTER, client: Optional[httpx.AsyncClient] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, rate_limiter: Optional[RateLimiter] = None, retry: RetryPolicy = DEFAULT_RETRY, breaker: Optional[CircuitBreaker] = None, metrics: Optional[Metrics] = None, on_chunk: Optional[Callable[[int], None]] = None, on_failure: Optional[Callable[[str], None]] = None, scheduler: Optional[DownloadScheduler] = None) -> bool:
+
+    """
+        Download one PDF from whichever of several alternate URLs delivers it first
+
+        urls[0] is started alone. If no candidate has received its first byte within hedge_after seconds,
+        the next URL is started alongside it, and so on. A candidate that fails makes way for the next URL
+        at once. The first complete PDF wins and the other transfers are cancelled, so one slow mirror costs
+        at most hedge_after instead of setting the paper's latency.
+
+        The primary downloads to filename as download_pdf would (its .part file is kept for resuming if every
+        candidate fails); alternates use their own '<filename>.alt<i>' files, which are always cleaned up.
+        With metrics, every hedge started is counted in hedges_total{outcome="won"|"lost"}.
+        When every candidate fails, on_failure gets the primary's reason.
+
+        Inside a DownloadScheduler job, pass the scheduler: each alternate then needs a free slot on its own
+        host (see DownloadScheduler.try_claim) and is skipped when that host is at its cap.
+    """
+
+    target = Path(filename)
+    paths = [target] + [target.with_name(f"{target.name}.alt{i}") for i in range(1, len(urls))]
+
+    progressed = asyncio.Event()
+    reasons: Dict[int, str] = {}
+    pending: Dict["asyncio.Task[bool]", int] = {}
+    launched: List[int] = []
+    started = 0
+    winner: Optional[int] = None
+
+    def chunk_received(size: int) -> None:
+        progressed.set()
+        if on_chunk is not None:
+            on_chunk(size)
+
+    def start_next() -> None:
+        nonlocal started
+
+        while started < len(urls):
+            i = started
+            started += 1
+
+            # The primary runs in the scheduler job's own slot; alternates need one on their host
+            claimed = bool(i) and scheduler is not None
+            if claimed and not scheduler.try_claim(urls[i]):
+                logger.debug(f"Not hedging {urls[0]} with {urls[i]}: host at its limit")
+                continue
+
+            if i:
+                logger.debug(f"Hedging {urls[0]} with {urls[i]}")
+
+            task = asyncio.ensure_future(download_pdf(urls[i], str(paths[i]), client=client, chunk_size=chunk_size, rate_limiter=rate_limiter, retry=retry, breaker=breaker, metrics=metrics, on_chunk=chunk_received, on_failure=lambda reason, i=i: reasons.__setitem__(i, reason)))
+            if claimed:
+                # A done callback runs even when the task is cancelled before it starts
+                task.add_done_callback(lambda _, url=urls[i]: scheduler.release(url))
+
+            pending[task] = i
+            launched.append(i)
+            return
+
+    start_next()
+
+    try:
+        while pending and winner is None:
+            can_hedge = started < len(urls) and not progressed.is_set()
+            done, _ = await asyncio.wait(pending, timeout=hedge_after if can_hedge else None, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # Budget spent - hedge unless a first byte arrived meanwhile
+                if not progressed.is_set():
+                    start_next()
+                continue
+
+            for task in done:
+                i = pending.pop(task)
+                if task.result() and winner is None:
+                    winner = i
+
+            if winner is None and not pending and started < len(urls):
+                start_next()
+
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        hedges = [i for i in launched if i]
+        for i in hedges:
+            if i != winner:
+                _remove(paths[i])
+            _remove_part(paths[i].with_name(paths[i].name + PART_SUFFIX))
+
+        if metrics is not None:
+            for i in hedges:
+                metrics.inc("hedges_total", outcome="won" if i == winner else "lost")
+
+    if winner is None:
+        if on_failure is not None:
+            on_failure(reasons.get(0, "error"))
         return False
 
-async def download_pdfs_batch(pdf_urls: List[tuple], output_dir: Path = Path(".")) -> dict:
+    if winner:
+        # The primary's partial file is stale now that another mirror delivered the paper
+        _remove_part(target.with_name(target.name + PART_SUFFIX))
+        os.replace(paths[winner], target)
+        logger.debug(f"{urls[winner]} beat {urls[0]}")
+
+    return True
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _remove_part(part: Path) -> None:
+    _remove(part)
+    _remove(_validator_path(part))
+
+
+def _validator_path(part: Path) -> Path:
+    return part.with_name(part.name + VALIDATOR_SUFFIX)
+
+
+def _validator(response: httpx.Response) -> Optional[str]:
+
+    """ Value for If-Range identifying this version of the file; weak ETags are not allowed there """
+
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+async def _stream_to_part(client: httpx.AsyncClient, url: str, part: Path, chunk_size: int, timer: RequestTimer, on_chunk: Optional[Callable[[int], None]] = None) -> None:
+
+    """ Append the remaining bytes of url to the .part file, falling back to a full download when Range is not honoured """
+
+    offset = part.stat().st_size if part.exists() else 0
+    validator_path = _validator_path(part)
+    headers = {}
+
+    if offset and not validator_path.exists():
+        # Nothing proves the server still has the file these bytes came from (an older .part file, or a
+        # server that sends no ETag / Last-Modified), so a 206 could splice two versions together
+        logger.debug(f"No validator for {part}, downloading {url} from byte zero")
+        part.unlink()
+        offset = 0
+
+    if offset:
+        # A changed file fails the condition and is sent whole (200) rather than as a range of the new bytes
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator_path.read_text(encoding="utf-8")
+
+    async with client.stream("GET", url, headers=headers, extensions=timer.extensions) as response:
+        timer.status = response.status_code
+
+        if offset and (response.status_code == 416 or (response.status_code == 206 and _range_start(response) != offset)):
+            # Stale .part file or a range we did not ask for - start again from byte zero
+            logger.debug(f"Cannot resume {url} from byte {offset}, restarting download")
+            _remove_part(part)
+            return await _stream_to_part(client, url, part, chunk_size, timer, on_chunk)
+
+        response.raise_for_status()
+
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type.startswith(NON_PDF_CONTENT_TYPES):
+            # Leaving the block closes the stream, so the body is never read
+            raise NotPdfError(url, f"Content-Type {content_type}")
+
+        chunks = response.aiter_bytes(chunk_size)
+        head = b""
+
+        if offset and response.status_code == 206:
+            logger.debug(f"Resuming {url} from byte {offset}")
+            mode = "ab"
+        else:
+            # Server ignored Range (plain 200), so the body is the whole file - check it starts like one
+            mode = "wb"
+            head = await _first_chunk(chunks)
+            if PDF_MAGIC not in head[:PDF_MAGIC_WINDOW]:
+                raise NotPdfError(url, f"body starts with {head[:16]!r}")
+
+            validator = _validator(response)
+            if validator is not None:
+                validator_path.write_text(validator, encoding="utf-8")
+            else:
+                _remove(validator_path)
+
+        # Write each chunk asynchronously as it arrives
+        async with aiofiles.open(part, mode) as f:
+            if head:
+                with timer.disk_write():
+                    await f.write(head)
+                if on_chunk is not None:
+                    on_chunk(len(head))
+
+            async for chunk in chunks:
+                with timer.disk_write():
+                    await f.write(chunk)
+                if on_chunk is not None:
+                    on_chunk(len(chunk))
+
+        timer.response_received(response)
+
+
+async def _first_chunk(chunks: AsyncIterator[bytes]) -> bytes:
+
+    """ First non-empty chunk of a body, leaving the rest unread; empty for an empty body """
+
+    async for chunk in chunks:
+        if chunk:
+            return chunk
+    return b""
+
+
+def _range_start(response: httpx.Response) -> Optional[int]:
+
+    """ First byte position from a 'Content-Range: bytes start-end/total' header """
+
+    content_range = response.headers.get("Content-Range", "")
+    try:
+        return int(content_range.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def query_slug(query: str) -> str:
+    return query.replace(" ", "_").replace("/", "_")
+
+
+def pdf_filename(paper_id: str) -> str:
+
+    """ File name a paper's PDF is saved under; handle-style ids ('10419/12345') would otherwise point into a subdirectory """
+
+    return f"{paper_id.replace('/', '_')}.pdf"
+
+
+def legacy_pdf_path(output_dir: Path, paper_id: str) -> Optional[Path]:
+
+    """ Where a PDF saved before pdf_filename existed would be ('<dir>/10419/12345.pdf'), if there is one """
+
+    if "/" not in paper_id:
+        return None
+
+    path = output_dir / f"{paper_id}.pdf"
+    return path if path.is_file() else None
+
+
+async def download_pdfs_batch(pdf_urls: Iterable[tuple], output_dir: Path = Path("."), client: Optional[httpx.AsyncClient] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_per_host: int = DEFAULT_MAX_PER_HOST, chunk_size: int = DEFAULT_CHUNK_SIZE, rate_limiter: Optional[RateLimiter] = None, retry: RetryPolicy = DEFAULT_RETRY, breaker: Optional[CircuitBreaker] = None, metrics: Optional[Metrics] = None, progress: Optional[Callable[[ProgressSnapshot], None]] = None, progress_interval: float = DEFAULT_INTERVAL, store: Optional[PdfStore] = None, layout: Optional[Layout] = None, alternates: Optional[Dict[str, Sequence[str]]] = None, hedge_after: Optional[float] = None) -> dict:
     output_dir.mkdir(parents = True, exist_ok = True)
 
     """
-        Download multiple PDFs concurrently
+        Download multiple PDFs concurrently through a bounded worker pool
+
+        PDFs are saved as pdf_filename(paper_id). One still under its older name, with the id's '/' kept
+        ('10419/12345.pdf'), is moved to the current name instead of being fetched again.
         
         Args:
-            pdf_urls: List of tuples containing (paper_id, pdf_url)
+            pdf_urls: List (or any iterable) of tuples containing (paper_id, pdf_url)
             output_dir: Directory to save downloaded PDFs
+            client: Shared pooled client; a batch-scoped one is created when omitted
+            max_concurrency: Number of downloads in flight across all hosts
+            max_per_host: Number of downloads in flight against any single host
+            chunk_size: Bytes buffered per download before writing to disk
+            rate_limiter: Shared limiter pacing every download attempt
+            retry: Backoff policy for transient failures
+            breaker: Per-host circuit breaker; a batch-scoped one is created when omitted
+            metrics: Records timings, bytes and status of every download attempt
+            progress: Called with a ProgressSnapshot at most every progress_interval seconds and once at the end
+            progress_interval: Minimum seconds between progress callbacks
+            store: Content-addressed store; papers already in it are linked instead of fetched, new ones are added
+            layout: Sharded layout for output_dir; defaults to the one recorded in it (flat if none)
+            alternates: paper_id -> further URLs of the same PDF, tried after the one in pdf_urls
+            hedge_after: With alternates, seconds without a first byte before the next URL is also tried (see download_pdf_hedged); alternates are ignored when None. Hedges count against max_per_host of their own host
             
         Returns: 
-                Dict with 'successful' 'failed' paper IDs
+                Dict with 'successful' 'failed' paper IDs, 'failure_reasons' mapping each failed paper ID
+                to why (see download_pdf; "not_pdf" for HTML or other non-PDF responses), and 'latency' with
+                the count, p50, p95, p99 and max seconds of the successful downloads (store links excluded)
     """
 
-    results = {'successful': [], 'failed': []}
+    if client is None:
+        # One pool for the whole batch so connections are reused across papers. A hedged paper holds a
+        # connection per candidate while its primary stalls, so leave room for all of them
+        hedged = 1 + max((len(urls) for urls in alternates.values()), default=0) if alternates and hedge_after is not None else 1
+        async with create_client(max_connections=max_concurrency * hedged) as batch_client:
+            return await download_pdfs_batch(pdf_urls, output_dir, client=batch_client, max_concurrency=max_concurrency, max_per_host=max_per_host, chunk_size=chunk_size, rate_limiter=rate_limiter, retry=retry, breaker=breaker, metrics=metrics, progress=progress, progress_interval=progress_interval, store=store, layout=layout, alternates=alternates, hedge_after=hedge_after)
 
-    logger.info(f"Downloading {len(pdf_urls)} PDFs...")
-    
-    tasks = []
-    for paper_id, url in pdf_urls:
-        filename = output_dir / f"{paper_id}.pdf"
-        task = download_pdf(url, str(filename)) # Create the async download task 
-        tasks.append((paper_id, url, filename, task))
-
-    download_results = await asyncio.gather(*[task for _, _, _, task in tasks], return_exceptions=True)
-
-    for (paper_id, url, filename, _), success in zip(tasks, download_results):
-        if isinstance(success, Exception):
-            logger.warning(f"Failed to download {paper_id}: {success}")
-            results['failed'].append(paper_id)
-        elif success:
-            logger.debug(f"Saved {paper_id} as {filename}")
-            results['successful'].append(paper_id)
+    if breaker is None:
+        breaker = CircuitBreaker()
+
+    layout = resolve_layout(output_dir, layout)
+
+    results = {'successful': [], 'failed': [], 'failure_reasons': {}}
+    reused = []
+    renamed = []
+    durations = []
+    total = len(pdf_urls) if isinstance(pdf_urls, Sized) else None
+    tracker = ProgressTracker(progress, total=total, interval=progress_interval) if progress is not None else None
+
+    if isinstance(pdf_urls, Sized):
+        logger.info(f"Downloading {len(pdf_urls)} PDFs...")
+    else:
+        logger.info("Downloading PDFs...")
+
+    scheduler = DownloadScheduler(max_concurrency=max_concurrency, max_per_host=max_per_host)
+
+    async def download_one(paper_id: str, url: str) -> None:
+        filename = layout.path(output_dir, pdf_filename(paper_id))
+        filename.parent.mkdir(parents=True, exist_ok=True)
+
+        if tracker is not None:
+            tracker.start()
+
+        # Consult the store and earlier downloads before touching the network
+        stored = store.lookup(paper_id) if store is not None else None
+        legacy = legacy_pdf_path(output_dir, paper_id) if stored is None else None
+        reason = "error"
+
+        def on_failure(why: str) -> None:
+            nonlocal reason
+            reason = why
+
+        try:
+            if stored is not None:
+                link(stored, filename)
+                reused.append(paper_id)
+                success = True
+            elif legacy is not None:
+                os.replace(legacy, filename)
+                try:
+                    legacy.parent.rmdir()
+                except OSError:
+                    pass  # still holds other papers' PDFs
+                renamed.append(paper_id)
+                success = True
+            else:
+                urls = [url, *alternates.get(paper_id, ())] if alternates and hedge_after is not None else [url]
+                on_chunk = tracker.add_bytes if tracker is not None else None
+                started = time.perf_counter()
+
+                if len(urls) > 1:
+                    success = await download_pdf_hedged(urls, str(filename), hedge_after, client=client, chunk_size=chunk_size, rate_limiter=rate_limiter, retry=retry, breaker=breaker, metrics=metrics, on_chunk=on_chunk, on_failure=on_failure, scheduler=scheduler)
+                else:
+                    success = await download_pdf(url, str(filename), client=client, chunk_size=chunk_size, rate_limiter=rate_limiter, retry=retry, breaker=breaker, metrics=metrics, on_chunk=on_chunk, on_failure=on_failure)
+
+                if success:
+                    durations.append(time.perf_counter() - started)
+                    if metrics is not None:
+                        metrics.observe("paper_download_seconds", durations[-1])
+
+                if success and store is not None:
+                    await store.add(paper_id, filename)
+        except Exception as e:
+            logger.warning(f"Failed to download {paper_id}: {e}")
+            success = False
         else:
-            logger.warning(f"Failed to download {paper_id}")
-            results['failed'].append(paper_id)
+            if success:
+                logger.debug(f"Saved {paper_id} as {filename}")
+            else:
+                logger.warning(f"Failed to download {paper_id}")
+
+        results['successful' if success else 'failed'].append(paper_id)
+        if not success:
+            results['failure_reasons'][paper_id] = reason
+
+        if tracker is not None:
+            tracker.finish(success)
+
+    try:
+        await scheduler.run(pdf_urls, download_one)
+    finally:
+        if tracker is not None:
+            tracker.close()
 
     logger.info(f"Download Summary:")
     logger.info(f"Successful: {len(results['successful'])}")
     logger.info(f"Failed: {len(results['failed'])}")
+    not_pdf = sum(reason == "not_pdf" for reason in results['failure_reasons'].values())
+    if not_pdf:
+        logger.info(f"Not a PDF: {not_pdf}")
+
+    results['latency'] = latency_summary(durations)
+    if durations:
+        latency = results['latency']
+        logger.info(f"Latency: p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s, p99 {latency['p99']:.2f}s, max {latency['max']:.2f}s")
+    if store is not None:
+        logger.info(f"Linked from PDF store: {len(reused)}")
+    if renamed:
+        logger.info(f"Renamed from old file names: {len(renamed)}")
 
     return results
 